@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Measure the hit rate of the condition simplifier cache.
+
+Converts every .pro file of a project tree, records the conditions that
+are passed to simplify_condition, and reports how many of them could be
+served from the cache when it is keyed by the raw condition and when it
+is keyed by the canonical condition. Without a path, a synthetic tree
+with scopes typical for Qt modules is generated.
+
+With --write-corpus, the recorded conditions and their simplified forms
+are written to a file, one tab separated pair per line. That is how
+tests/data/condition_corpus.txt, which the native condition simplifier
+is tested against, was created:
+
+    benchmark_condition_cache.py --projects 300 --write-corpus ../tests/data/condition_corpus.txt ../tests/data
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from qmake2cmake import pro2cmake  # noqa: E402
+from qmake2cmake.condition_simplifier import canonicalize_condition  # noqa: E402
+
+_scope_conditions = [
+    "win32",
+    "unix",
+    "macos",
+    "unix:!macos",
+    "!macos:unix",
+    "linux",
+    "android",
+    "ios",
+    "qnx",
+    "!win32",
+    "qtConfig(opengl)",
+    "qtConfig(vulkan)",
+    "qtConfig(dbus)",
+    "qtConfig(ssl)",
+    "!qtConfig(opengl)",
+    "static",
+    "!static",
+    "win32:!winrt",
+    "darwin",
+    "linux|android",
+    "android|linux",
+]
+
+
+def _parse_commandline():
+    parser = argparse.ArgumentParser(
+        description="Measure the hit rate of the condition simplifier cache."
+    )
+    parser.add_argument(
+        "--projects",
+        type=int,
+        help="Number of projects in the generated tree. Default is 300 if no path is given.",
+    )
+    parser.add_argument(
+        "--write-corpus",
+        dest="write_corpus",
+        type=str,
+        help="Write the simplified conditions to this file.",
+    )
+    parser.add_argument(
+        "paths", metavar="<path>", type=str, nargs="*", help="Project trees to convert."
+    )
+    return parser.parse_args()
+
+
+def generate_scopes(rng: random.Random, depth: int) -> List[str]:
+    result = []
+    for i in range(rng.randint(1, 4)):
+        condition = rng.choice(_scope_conditions)
+        result.append(f"{condition} {{")
+        result.append(f"    SOURCES += file{depth}_{i}.cpp")
+        if depth < 2 and rng.random() < 0.5:
+            result += ["    " + line for line in generate_scopes(rng, depth + 1)]
+        if rng.random() < 0.3:
+            result.append("} else {")
+            result.append(f"    SOURCES += other{depth}_{i}.cpp")
+        result.append("}")
+    return result
+
+
+def generate_tree(path: str, projects: int) -> None:
+    rng = random.Random(0)
+    for i in range(projects):
+        project_dir = os.path.join(path, f"module{i}")
+        os.makedirs(project_dir)
+        contents = [f"TARGET = Module{i}", "QT = core", "SOURCES += main.cpp"]
+        contents += generate_scopes(rng, 0)
+        contents.append("load(qt_module)")
+        with open(os.path.join(project_dir, f"module{i}.pro"), "w") as project_file:
+            project_file.write("\n".join(contents) + "\n")
+
+
+def main() -> None:
+    args = _parse_commandline()
+
+    conditions: List[str] = []
+    simplified_conditions: Dict[str, str] = {}
+    simplify_condition = pro2cmake.simplify_condition
+
+    def record_condition(condition: str) -> str:
+        conditions.append(condition)
+        simplified_conditions[condition] = simplify_condition(condition)
+        return simplified_conditions[condition]
+
+    pro2cmake.simplify_condition = record_condition
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i, path in enumerate(args.paths):
+            shutil.copytree(path, os.path.join(temp_dir, str(i)))
+        if args.projects or not args.paths:
+            generate_tree(os.path.join(temp_dir, "generated"), args.projects or 300)
+
+        files = sorted(glob.glob(os.path.join(temp_dir, "**", "*.pro"), recursive=True))
+        current_dir = os.getcwd()
+        for file in files:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    pro2cmake.main(["--min-qt-version", "6.2", "--ignore-skip-marker", file])
+            except Exception as e:
+                print(f"Failed to convert {file}: {e}")
+            os.chdir(current_dir)
+
+    if not conditions:
+        print("No conditions were simplified.")
+        return
+
+    if args.write_corpus:
+        with open(args.write_corpus, "w") as corpus_file:
+            for condition, simplified in simplified_conditions.items():
+                # Empty conditions and multi-line ones from the project
+                # files are not useful for testing.
+                if condition.strip() and "\n" not in condition:
+                    corpus_file.write(f"{condition}\t{simplified}\n")
+
+    raw_keys = len(set(conditions))
+    canonical_keys = len(set(map(canonicalize_condition, conditions)))
+    print(f"Converted {len(files)} projects, {len(conditions)} condition lookups.")
+    print(
+        f"  {'keyed by raw condition':<30} {raw_keys:6} entries, hit rate {1 - raw_keys / len(conditions):.1%}"
+    )
+    print(
+        f"  {'keyed by canonical condition':<30} {canonical_keys:6} entries, hit rate {1 - canonical_keys / len(conditions):.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Benchmark the memory used by the scopes of a large project tree.
+
+Generates a subdirs project with many subprojects, each with nested
+conditional scopes, else branches and an included .pri file, like the
+Qt modules, builds and includes the scopes of all of them and reports the
+peak memory allocated while doing so, as measured by tracemalloc.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from qmake2cmake.conversion_context import get_conversion_context  # noqa: E402
+from qmake2cmake.pro2cmake import Scope, do_include  # noqa: E402
+from qmake2cmake.qmake_parser_cache import parseProFileStatements  # noqa: E402
+
+
+def _parse_commandline():
+    parser = argparse.ArgumentParser(description="Benchmark the memory used by scopes.")
+    parser.add_argument(
+        "--projects",
+        type=int,
+        default=200,
+        help="Number of subprojects in the generated tree.",
+    )
+    return parser.parse_args()
+
+
+def generate_tree(path: str, projects: int) -> None:
+    subdirs = [f"sub{i}" for i in range(projects)]
+    with open(os.path.join(path, "tree.pro"), "w") as project_file:
+        project_file.write("TEMPLATE = subdirs\nSUBDIRS = \\\n    " + " \\\n    ".join(subdirs))
+        project_file.write("\n")
+    for i, subdir in enumerate(subdirs):
+        os.makedirs(os.path.join(path, subdir))
+        contents = [f"TARGET = Sub{i}", "QT = core", "include(common.pri)"]
+        for j in range(20):
+            contents += [
+                f"qtConfig(feature{j}) {{",
+                f"    SOURCES += feature{j}.cpp",
+                "    unix {",
+                f"        SOURCES += feature{j}_unix.cpp",
+                "    } else {",
+                f"        SOURCES += feature{j}_win.cpp",
+                "    }",
+                "} else {",
+                f"    DEFINES += QT_NO_FEATURE{j}",
+                "}",
+            ]
+        with open(os.path.join(path, subdir, f"{subdir}.pro"), "w") as project_file:
+            project_file.write("\n".join(contents) + "\n")
+        with open(os.path.join(path, subdir, "common.pri"), "w") as pri_file:
+            pri_file.write("HEADERS += common.h\nwin32: LIBS += -luser32\n")
+
+
+def load_scopes(path: str) -> List[Scope]:
+    current_dir = os.getcwd()
+    scopes = []
+    try:
+        for root, _, files in sorted(os.walk(path)):
+            for file in sorted(files):
+                if not file.endswith(".pro"):
+                    continue
+                os.chdir(root)
+                statements, contents = parseProFileStatements(file)
+                scope = Scope.FromDict(None, file, statements, project_file_content=contents)
+                do_include(scope)
+                scopes.append(scope)
+    finally:
+        os.chdir(current_dir)
+    return scopes
+
+
+def measure_scopes(path: str) -> Tuple[int, int]:
+    """Returns the peak memory in bytes while loading the scopes of the
+    tree at path, and the number of scopes."""
+    # Parse once up front, so that neither the parser nor its caches are
+    # part of the measurement.
+    load_scopes(path)
+    start_id = get_conversion_context().next_scope_id
+    tracemalloc.start()
+    try:
+        scopes = load_scopes(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert scopes
+    return peak, get_conversion_context().next_scope_id - start_id
+
+
+def main() -> None:
+    args = _parse_commandline()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        generate_tree(temp_dir, args.projects)
+        peak, scope_count = measure_scopes(temp_dir)
+    print(f"Loaded {scope_count} scopes of {args.projects + 1} projects.")
+    print(f"  Peak memory: {peak / 1024 / 1024:.1f} MiB ({peak // scope_count} bytes per scope)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Benchmark the qmake parser.
+
+Compares building a new grammar for every parsed file with reusing the
+process-wide parser, parsing with and without pyparsing's packrat
+memoization, and the hand-written parser in qmake_fast_parser.py. Without
+arguments, a synthetic large project file and a set of small include
+files are generated; otherwise the given files are parsed.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pyparsing as pp  # type: ignore # noqa: E402
+
+from qmake2cmake.qmake_fast_parser import parseProFileContentsFast  # noqa: E402
+from qmake2cmake.qmake_parser import QmakeParser, get_qmake_parser  # noqa: E402
+
+
+def _parse_commandline():
+    parser = argparse.ArgumentParser(description="Benchmark the qmake parser.")
+    parser.add_argument(
+        "--statements",
+        type=int,
+        default=2000,
+        help="Number of statements in the generated large project file.",
+    )
+    parser.add_argument(
+        "--small-files",
+        type=int,
+        default=200,
+        help="Number of generated small include files.",
+    )
+    parser.add_argument(
+        "--packrat-cache-size",
+        type=int,
+        action="append",
+        default=None,
+        help="Packrat cache size to measure, may be given multiple times (0 means unbounded).",
+    )
+    parser.add_argument(
+        "files", metavar="<.pro/.pri file>", type=str, nargs="*", help="Files to parse."
+    )
+    return parser.parse_args()
+
+
+def generate_large_contents(statements: int) -> str:
+    result = []
+    i = 0
+    while len(result) < statements:
+        result.append(f"SOURCES += src/file{i}.cpp \\\n    src/other{i}.cpp $$PWD/x{i}.cpp")
+        if i % 5 == 0:
+            result.append(
+                f"win32|linux:!static:qtConfig(feature{i}) {{\n"
+                f"    DEFINES += FOO{i}=1\n"
+                f"    LIBS += -lfoo{i}\n"
+                f"}} else: unix {{\n"
+                f"    QT += core{i}\n"
+                f"}}"
+            )
+        if i % 7 == 0:
+            result.append(f"contains(QT_CONFIG, opengl{i}): HEADERS += gl{i}.h")
+        i += 1
+    return "\n".join(result) + "\n"
+
+
+def generate_small_contents(index: int) -> str:
+    return (
+        f"HEADERS += $$PWD/include{index}.h\n"
+        f"SOURCES += $$PWD/include{index}.cpp\n"
+        f"qtConfig(feature{index}): DEFINES += FEATURE{index}\n"
+    )
+
+
+def measure(label: str, contents: List[str], parse: Callable[[str], None]) -> float:
+    start = time.perf_counter()
+    for c in contents:
+        parse(c)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed:8.3f}s")
+    return elapsed
+
+
+def main() -> None:
+    args = _parse_commandline()
+
+    if args.files:
+        contents = []
+        for file in args.files:
+            with open(file, "r") as file_fd:
+                contents.append(file_fd.read())
+        large_contents = [max(contents, key=len)]
+        small_contents = contents
+    else:
+        large_contents = [generate_large_contents(args.statements)]
+        small_contents = [generate_small_contents(i) for i in range(args.small_files)]
+
+    print(f"Parsing {len(small_contents)} small files:")
+    fresh = measure(
+        "  new grammar per file", small_contents, lambda c: QmakeParser().parseFileContents(c)
+    )
+    shared = measure(
+        "  shared parser", small_contents, lambda c: get_qmake_parser().parseFileContents(c)
+    )
+    print(f"  speedup: {fresh / shared:.1f}x")
+
+    print(f"Parsing a file of {large_contents[0].count(chr(10))} lines:")
+    baseline = measure(
+        "  without packrat", large_contents, lambda c: get_qmake_parser().parseFileContents(c)
+    )
+    fast = measure("  fast parser", large_contents, parseProFileContentsFast)
+    print(f"  speedup: {baseline / fast:.1f}x")
+    for cache_size in args.packrat_cache_size or [128, 0]:
+        # Packrat memoization is global to pyparsing, so it is measured
+        # last.
+        pp.ParserElement.enablePackrat(cache_size or None)
+        elapsed = measure(
+            f"  with packrat (cache size {cache_size or 'unbounded'})",
+            large_contents,
+            lambda c: get_qmake_parser().parseFileContents(c),
+        )
+        print(f"  relative to no packrat: {baseline / elapsed:.2f}x")
+        disable_memoization = getattr(pp.ParserElement, "disable_memoization", None)
+        if disable_memoization is None:
+            # pyparsing 2 cannot switch packrat off again.
+            break
+        disable_memoization()
+
+
+if __name__ == "__main__":
+    main()
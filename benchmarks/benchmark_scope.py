@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Benchmark building scopes from parse results.
+
+Generates a large .pri file with one assignment per line, like the ones
+produced by code generators, and measures the line number lookups that
+Scope.FromDict does for every operation, with pp.lineno() and with
+LineOffsetIndex, and the construction of the scope tree itself.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pyparsing as pp  # type: ignore # noqa: E402
+
+from qmake2cmake.pro2cmake import Scope  # noqa: E402
+from qmake2cmake.qmake_fast_parser import parseProFileContentsFast  # noqa: E402
+from qmake2cmake.qmake_parser import LineOffsetIndex  # noqa: E402
+
+
+def _parse_commandline():
+    parser = argparse.ArgumentParser(description="Benchmark building scopes from parse results.")
+    parser.add_argument(
+        "--lines",
+        type=int,
+        default=50000,
+        help="Number of lines in the generated .pri file.",
+    )
+    return parser.parse_args()
+
+
+def generate_contents(lines: int) -> str:
+    result = []
+    for i in range(lines):
+        if i % 100 == 99:
+            result.append(f"include($$PWD/generated{i}.pri)")
+        else:
+            result.append(f"SOURCES += $$PWD/generated/file{i}.cpp")
+    return "\n".join(result) + "\n"
+
+
+def main() -> None:
+    args = _parse_commandline()
+
+    contents = generate_contents(args.lines)
+    statements, massaged_contents = parseProFileContentsFast(contents)
+    assert statements is not None
+    locations = [
+        (s.get("operation") or s.get("included"))["locn_start"]
+        for s in statements
+        if isinstance(s, dict)
+    ]
+    print(f"Looking up the line numbers of {len(locations)} statements:")
+
+    start = time.perf_counter()
+    index = LineOffsetIndex(massaged_contents)
+    indexed = [index.lineno(loc) for loc in locations]
+    indexed_elapsed = time.perf_counter() - start
+    print(f"  {'LineOffsetIndex':<30} {indexed_elapsed:8.3f}s")
+
+    start = time.perf_counter()
+    scanned = [pp.lineno(loc, massaged_contents) for loc in locations]
+    scanned_elapsed = time.perf_counter() - start
+    print(f"  {'pp.lineno()':<30} {scanned_elapsed:8.3f}s")
+
+    assert indexed == scanned
+    print(f"  speedup: {scanned_elapsed / indexed_elapsed:.1f}x")
+
+    start = time.perf_counter()
+    Scope.FromDict(None, "generated.pri", statements, project_file_content=massaged_contents)
+    print(f"Scope.FromDict: {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Benchmark the startup time of qmake2cmake.
+
+Imports qmake2cmake.pro2cmake in fresh interpreters with -X importtime and
+reports the median import time, the modules that take the longest to
+import, and whether sympy was imported. Bytecode is written to a temporary
+directory by a first run, so that compiling the sources is not measured.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from typing import Dict, List, Tuple
+
+_src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def _parse_commandline():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of qmake2cmake.")
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=5,
+        help="Number of interpreters to start.",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of slowest imports to list.",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=0.0,
+        help="Exit with an error if the median import time exceeds this many seconds.",
+    )
+    return parser.parse_args()
+
+
+def import_once(pycache_path: str) -> Tuple[Dict[str, float], bool]:
+    """Returns the cumulative import time in seconds of every module
+    imported by qmake2cmake.pro2cmake, and whether sympy was imported."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.abspath(_src_path), env.get("PYTHONPATH", "")])
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-X",
+            f"pycache_prefix={pycache_path}",
+            "-c",
+            "import sys, qmake2cmake.pro2cmake; print('sympy' in sys.modules)",
+        ],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[1]) / 1000000
+    return times, result.stdout.strip() == "True"
+
+
+def measure_startup(runs: int) -> Tuple[float, List[Dict[str, float]], bool]:
+    """Returns the median import time of qmake2cmake.pro2cmake in seconds,
+    the import times of all runs and whether sympy was imported."""
+    with tempfile.TemporaryDirectory() as pycache_path:
+        import_once(pycache_path)
+        results = [import_once(pycache_path) for _ in range(runs)]
+    all_times = [times for times, _ in results]
+    median = statistics.median(times["qmake2cmake.pro2cmake"] for times in all_times)
+    return median, all_times, any(imports_sympy for _, imports_sympy in results)
+
+
+def main() -> None:
+    args = _parse_commandline()
+    median, all_times, imports_sympy = measure_startup(args.runs)
+    print(f"Importing qmake2cmake.pro2cmake: {median * 1000:.1f} ms (median of {args.runs} runs)")
+    print(f"  sympy imported: {'yes' if imports_sympy else 'no'}")
+    print(f"  Slowest imports (cumulative):")
+    modules = {module for times in all_times for module in times}
+    module_times = {
+        module: statistics.median(times.get(module, 0.0) for times in all_times)
+        for module in modules
+    }
+    for module in sorted(modules, key=lambda m: -module_times[m])[: args.top]:
+        print(f"    {module_times[module] * 1000:8.1f} ms  {module}")
+    if args.budget and median > args.budget:
+        sys.exit(f"Import time exceeds the budget of {args.budget * 1000:.0f} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Helpers shared by the on-disk caches of the converter.
+
+The parse cache, the project analysis cache and the conversion manifests
+all store JSON files that are only valid while the converter and some
+input files are unchanged. This module hashes those files and the
+converter sources, and reads and writes the records.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+
+# Maps absolute file paths to the stat signature of the file and the hash
+# of its contents, so that files shared by many projects are only read
+# once while they don't change.
+_file_hashes: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+
+RecordType = TypeVar("RecordType", bound="CacheRecord")
+
+
+def get_file_hash(path: str) -> Optional[str]:
+    """Returns the hash of the contents of the file at path, or None if it
+    can't be read."""
+    try:
+        stat = os.stat(path)
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = _file_hashes.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(path, "rb") as file:
+            file_hash = hashlib.sha256(file.read()).hexdigest()
+    except OSError:
+        return None
+    _file_hashes[path] = (signature, file_hash)
+    return file_hash
+
+
+@lru_cache(maxsize=None)
+def get_sources_checksum(prefix: str, modules: Optional[Tuple[str, ...]] = None) -> str:
+    """Returns a checksum of prefix and the given modules of this package, or
+    of all of its modules if modules is None."""
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    if modules is None:
+        modules = tuple(
+            module for module in sorted(os.listdir(module_dir)) if module.endswith(".py")
+        )
+    content = prefix.encode("utf-8")
+    for module in modules:
+        with open(os.path.join(module_dir, module), "rb") as module_file:
+            content += module_file.read()
+    return hashlib.md5(content).hexdigest()
+
+
+def write_file_atomically(file_path: str, contents: str) -> None:
+    """Writes contents to a temporary file first and then replaces the file
+    at file_path with it, so that concurrent readers never see a partially
+    written file. Raises OSError on failure."""
+    dir_path = os.path.dirname(file_path)
+    os.makedirs(dir_path, exist_ok=True)
+    fd, temp_file_path = tempfile.mkstemp(dir=dir_path, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as temp_file:
+            temp_file.write(contents)
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        os.remove(temp_file_path)
+        raise
+
+
+class CacheRecord:
+    """A JSON serializable record that is only valid while the converter,
+    as identified by get_converter_checksum, is unchanged."""
+
+    # The names of the constructor arguments, in order. They are the keys
+    # of to_dict besides "checksum".
+    fields: Tuple[str, ...] = ()
+
+    def __init__(self) -> None:
+        self.checksum = self.get_converter_checksum()
+
+    @staticmethod
+    def get_converter_checksum() -> str:
+        raise NotImplementedError
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls: Type[RecordType], values: Dict[str, Any]) -> RecordType:
+        record = cls(*(values[field] for field in cls.fields))  # type: ignore
+        record.checksum = values["checksum"]
+        return record
+
+    def files_are_up_to_date(self, file_hashes: Dict[str, Optional[str]]) -> bool:
+        return self.checksum == self.get_converter_checksum() and all(
+            get_file_hash(path) == file_hash for path, file_hash in file_hashes.items()
+        )
+
+
+def read_record(record_class: Type[RecordType], file_path: str) -> Optional[RecordType]:
+    """Returns the record stored at file_path, or None if it is missing or
+    invalid."""
+    try:
+        with open(file_path, "r") as record_file:
+            return record_class.from_dict(json.load(record_file))
+    except (IOError, ValueError, KeyError, TypeError):
+        return None
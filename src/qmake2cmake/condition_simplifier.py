@@ -2,9 +2,127 @@
 # Copyright (C) 2021 The Qt Company Ltd.
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
+import contextlib
 import re
-from sympy import simplify_logic, And, Or, Not, SympifyError  # type: ignore
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from qmake2cmake.conversion_context import get_conversion_context
 from qmake2cmake.condition_simplifier_cache import simplify_condition_memoize
+from qmake2cmake.condition_simplifier_native import (
+    UnsupportedConditionError,
+    androids,
+    apples,
+    bsds,
+    simplify_condition_native,
+    unixes,
+)
+
+# "sympy" is the reference implementation, "native" the truth table based
+# minimizer in condition_simplifier_native.py.
+condition_simplifier_engines = ["sympy", "native"]
+condition_simplifier_engine = "sympy"
+
+# Conditions with more distinct atoms than this, or that take longer than
+# this many seconds to simplify with sympy, are left unsimplified, so that a
+# single generated condition can't stall a conversion. 0 means no limit.
+default_condition_simplifier_max_atoms = 32
+default_condition_simplifier_timeout = 30.0
+condition_simplifier_max_atoms = default_condition_simplifier_max_atoms
+condition_simplifier_timeout = default_condition_simplifier_timeout
+
+# The "deadline" attribute is when the current sympy simplification of the
+# thread has to be given up, as returned by time.monotonic().
+_simplification_state = threading.local()
+
+_condition_token_re = re.compile(r"\(|\)|[^\s()]+")
+_condition_identifier_re = re.compile(r"[A-Za-z0-9_-]+")
+
+_ConditionNode = Tuple[str, str, Dict[str, "_ConditionNode"]]
+
+
+class ConditionBudgetExceededError(Exception):
+    """Raised when a condition is too complex to be simplified with sympy."""
+
+
+class _ConditionCanonicalizer:
+    """Parses a condition made of identifiers, parentheses, AND, OR and NOT
+    with the precedence sympy gives them (NOT, then AND, then OR).
+
+    Every node is returned as a tuple of its canonical text, its top-level
+    operator ("" for identifiers and negations) and, for AND and OR, the
+    canonical texts of its operands. Nested operands of the same operator
+    are flattened, duplicates removed, the rest sorted, and only the
+    parentheses the precedence requires are kept."""
+
+    def __init__(self, tokens: List[str]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def parse(self) -> Optional[str]:
+        node = self.parse_binary("OR")
+        if node is None or self.pos != len(self.tokens):
+            return None
+        return node[0]
+
+    def parse_binary(self, op: str) -> Optional[_ConditionNode]:
+        nodes = []
+        while True:
+            node = self.parse_binary("AND") if op == "OR" else self.parse_unary()
+            if node is None:
+                return None
+            nodes.append(node)
+            if self.peek() != op:
+                break
+            self.pos += 1
+
+        operands: Dict[str, _ConditionNode] = {}
+        for node in nodes:
+            text, node_op, node_operands = node
+            if node_op == op:
+                operands.update(node_operands)
+            elif node_op == "OR":
+                operands[f"({text})"] = node
+            else:
+                operands[text] = node
+        if len(operands) == 1:
+            return next(iter(operands.values()))
+        return f" {op} ".join(sorted(operands)), op, operands
+
+    def parse_unary(self) -> Optional[_ConditionNode]:
+        token = self.peek()
+        self.pos += 1
+        if token == "NOT":
+            node = self.parse_unary()
+            if node is None:
+                return None
+            text, node_op, _ = node
+            return (f"NOT ({text})" if node_op else f"NOT {text}"), "", {}
+        if token == "(":
+            node = self.parse_binary("OR")
+            if node is None or self.peek() != ")":
+                return None
+            self.pos += 1
+            return node
+        if token is None or token in ("AND", "OR") or not _condition_identifier_re.fullmatch(token):
+            return None
+        return token, "", {}
+
+
+def canonicalize_condition(condition: str) -> str:
+    """Returns a canonical form of condition, so that equivalent spellings
+    like "(B) AND (A)" and "A AND B" share a simplifier cache entry.
+
+    The canonical form parses to the same sympy expression as the
+    original condition, which is what makes the simplification results
+    identical. Conditions with anything besides identifiers, parentheses,
+    AND, OR and NOT are returned unchanged."""
+    canonical = _ConditionCanonicalizer(_condition_token_re.findall(condition)).parse()
+    return canonical if canonical is not None else condition
 
 
 def _iterate_expr_tree(expr, op, matches):
@@ -48,6 +166,8 @@ def _simplify_expressions(expr, op, matches, replacement):
 def _simplify_flavors_in_condition(base: str, flavors, expr):
     """Simplify conditions based on the knowledge of which flavors
     belong to which OS."""
+    from sympy import simplify_logic, And, Or, Not  # type: ignore
+
     base_expr = simplify_logic(base)
     false_expr = simplify_logic("false")
     for flavor in flavors:
@@ -59,6 +179,8 @@ def _simplify_flavors_in_condition(base: str, flavors, expr):
 
 
 def _simplify_os_families(expr, family_members, other_family_members):
+    from sympy import simplify_logic, And, Not  # type: ignore
+
     for family in family_members:
         for other in other_family_members:
             if other in family_members:
@@ -76,27 +198,15 @@ def _simplify_os_families(expr, family_members, other_family_members):
 def _recursive_simplify(expr):
     """Simplify the expression as much as possible based on
     domain knowledge."""
+    from sympy import simplify_logic, And, Or, Not  # type: ignore
+
     input_expr = expr
 
-    # Simplify even further, based on domain knowledge:
-    # windowses = ('WIN32', 'WINRT')
-    apples = ("MACOS", "UIKIT", "IOS", "TVOS", "WATCHOS")
-    bsds = ("FREEBSD", "OPENBSD", "NETBSD")
-    androids = ("ANDROID",)
-    unixes = (
-        "APPLE",
-        *apples,
-        "BSD",
-        *bsds,
-        "LINUX",
-        *androids,
-        "HAIKU",
-        "INTEGRITY",
-        "VXWORKS",
-        "QNX",
-        "WASM",
-    )
+    deadline = getattr(_simplification_state, "deadline", None)
+    if deadline is not None and time.monotonic() > deadline:
+        raise ConditionBudgetExceededError(f"took longer than {condition_simplifier_timeout}s")
 
+    # Simplify even further, based on domain knowledge:
     unix_expr = simplify_logic("UNIX")
     win_expr = simplify_logic("WIN32")
     false_expr = simplify_logic("false")
@@ -133,8 +243,88 @@ def _recursive_simplify(expr):
     return expr
 
 
-@simplify_condition_memoize
+def set_condition_simplifier_engine(value: str):
+    global condition_simplifier_engine
+    assert value in condition_simplifier_engines
+    condition_simplifier_engine = value
+
+
+def set_condition_simplifier_max_atoms(value: int):
+    global condition_simplifier_max_atoms
+    condition_simplifier_max_atoms = value
+
+
+def set_condition_simplifier_timeout(value: float):
+    global condition_simplifier_timeout
+    condition_simplifier_timeout = value
+
+
+@contextlib.contextmanager
+def _simplification_time_budget():
+    """Limits the time spent in the body to condition_simplifier_timeout.
+
+    The deadline is checked cooperatively between the passes of
+    _recursive_simplify, no signals or timers are used. A single
+    simplify_logic call is kept short by the atom limit instead."""
+    if not condition_simplifier_timeout:
+        yield
+        return
+
+    _simplification_state.deadline = time.monotonic() + condition_simplifier_timeout
+    try:
+        yield
+    finally:
+        _simplification_state.deadline = None
+
+
+def _count_atoms(condition: str) -> int:
+    tokens = set(_condition_token_re.findall(condition))
+    return len(tokens - {"(", ")", "AND", "OR", "NOT"})
+
+
 def simplify_condition(condition: str) -> str:
+    canonical_condition = canonicalize_condition(condition)
+    try:
+        if condition_simplifier_engine == "native":
+            simplified = _simplify_condition_native(canonical_condition)
+        else:
+            simplified = _simplify_canonical_condition(canonical_condition)
+    except ConditionBudgetExceededError as e:
+        # Only the structural simplification of canonicalize_condition is
+        # applied.
+        location = get_conversion_context().project_file_path or "<unknown>"
+        print(f"{location}: Not simplifying condition that {e}: {condition.strip()}")
+        simplified = canonical_condition.strip()
+    # An empty result means that sympy could not handle the condition, so
+    # it is kept the way it was written.
+    return simplified or condition.strip() or "ON"
+
+
+@lru_cache(maxsize=None)
+def _simplify_condition_native(condition: str) -> str:
+    # The native engine is fast enough not to need the persistent cache.
+    try:
+        return simplify_condition_native(condition)
+    except UnsupportedConditionError:
+        # Conditions with function calls or quotes are not simplified by
+        # the sympy path either, but the ones with many atoms are.
+        return _simplify_canonical_condition(condition)
+
+
+@simplify_condition_memoize
+def _simplify_canonical_condition(condition: str) -> str:
+    # Conditions over the budget raise instead of returning, so that they
+    # are not cached and can be simplified with a larger budget later.
+    atoms = _count_atoms(condition)
+    if condition_simplifier_max_atoms and atoms > condition_simplifier_max_atoms:
+        raise ConditionBudgetExceededError(
+            f"has {atoms} atoms, more than {condition_simplifier_max_atoms}"
+        )
+
+    # sympy takes longer to import than most conversions take when their
+    # conditions are cached, so it's only imported once a condition is not.
+    from sympy import simplify_logic, SympifyError  # type: ignore
+
     input_condition = condition.strip()
 
     # Map to sympy syntax:
@@ -185,8 +375,9 @@ def simplify_condition(condition: str) -> str:
 
     try:
         # Generate and simplify condition using sympy:
-        condition_expr = simplify_logic(condition)
-        condition = str(_recursive_simplify(condition_expr))
+        with _simplification_time_budget():
+            condition_expr = simplify_logic(condition)
+            condition = str(_recursive_simplify(condition_expr))
 
         # Restore the target conditions.
         for symbol_name in target_symbol_mapping:
@@ -205,6 +396,6 @@ def simplify_condition(condition: str) -> str:
         condition = condition.replace("_dash_", "-")
     except (SympifyError, TypeError, AttributeError):
         # sympy did not like our input, so leave this condition alone:
-        condition = input_condition
+        return ""
 
-    return condition or "ON"
+    return condition
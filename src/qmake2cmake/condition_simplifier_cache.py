@@ -3,21 +3,38 @@
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
 import atexit
+import contextlib
 import hashlib
 import json
 import os
+import sqlite3
 import sys
+import threading
 import time
-import platformdirs
 
-from typing import Any, Callable, Dict
+from typing import Callable, Dict, List, Optional
 
-condition_simplifier_cache_enabled = True
+from qmake2cmake.conversion_context import get_conversion_context
 
+# The least recently used entries are removed when the cache grows beyond
+# this many conditions. 0 means no limit.
+default_condition_simplifier_cache_max_entries = 100000
+condition_simplifier_cache_max_entries = default_condition_simplifier_cache_max_entries
 
-def set_condition_simplified_cache_enabled(value: bool):
-    global condition_simplifier_cache_enabled
-    condition_simplifier_cache_enabled = value
+# Functions that write the in-memory caches back to disk. They are
+# registered with atexit, but processes that don't run atexit handlers
+# (like multiprocessing pool workers) need to call them explicitly.
+_cache_file_writers: List[Callable[[], None]] = []
+
+
+def set_condition_simplifier_cache_max_entries(value: int):
+    global condition_simplifier_cache_max_entries
+    condition_simplifier_cache_max_entries = value
+
+
+def flush_condition_simplifier_cache() -> None:
+    for write_cache_file in _cache_file_writers:
+        write_cache_file()
 
 
 def get_current_file_path() -> str:
@@ -30,11 +47,18 @@ def get_current_file_path() -> str:
 
 
 def get_cache_location() -> str:
+    import platformdirs  # Only needed once the cache is opened.
+
     temp_path = platformdirs.user_cache_dir()
-    cache_path = os.path.join(temp_path, ".pro2cmake_cache", "cache.json")
+    cache_path = os.path.join(temp_path, ".pro2cmake_cache", "cache.sqlite")
     return cache_path
 
 
+def get_legacy_cache_location() -> str:
+    """Location of the JSON cache used by older versions."""
+    return os.path.join(os.path.dirname(get_cache_location()), "cache.json")
+
+
 def get_file_checksum(file_path: str) -> str:
     try:
         with open(file_path, "r") as content_file:
@@ -48,106 +72,313 @@ def get_file_checksum(file_path: str) -> str:
 def get_condition_simplifier_checksum() -> str:
     current_file_path = get_current_file_path()
     dir_name = os.path.dirname(current_file_path)
-    condition_simplifier_path = os.path.join(dir_name, "condition_simplifier.py")
-    return get_file_checksum(condition_simplifier_path)
-
-
-def init_cache_dict():
-    return {
-        "checksum": get_condition_simplifier_checksum(),
-        "schema_version": "1",
-        "cache": {"conditions": {}},
-    }
-
-
-def merge_dicts_recursive(a: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
-    """Merges values of "other" into "a", mutates a."""
-    for key in other:
-        if key in a:
-            if isinstance(a[key], dict) and isinstance(other[key], dict):
-                merge_dicts_recursive(a[key], other[key])
-            elif a[key] == other[key]:
-                pass
-        else:
-            a[key] = other[key]
-    return a
-
-
-def open_file_safe(file_path: str, mode: str = "r+"):
-    # Use portalocker package for file locking if available,
-    # otherwise print a message to install the package.
-    try:
-        import portalocker  # type: ignore
-
-        return portalocker.Lock(file_path, mode=mode, flags=portalocker.LOCK_EX)
-    except ImportError:
-        print(
-            "The conversion script is missing a required package: portalocker. Please run "
-            "python -m pip install -r requirements.txt to install the missing dependency."
+    return "".join(
+        get_file_checksum(os.path.join(dir_name, file_name))
+        for file_name in ["condition_simplifier.py", "condition_simplifier_native.py"]
+    )
+
+
+class ConditionCacheDatabase:
+    """SQLite store for simplified conditions.
+
+    The database runs in WAL mode, so any number of converter processes can
+    read it while another one writes. Conditions are looked up one at a
+    time when they are first needed, and new results are buffered and added
+    with INSERT OR IGNORE when the cache is flushed, instead of merging and
+    rewriting the whole cache file.
+
+    Entries are only valid for the condition_simplifier.py they were
+    computed with, so the database is emptied when its checksum changes.
+
+    Every entry records when it was last used and how often it was found,
+    and the meta table accumulates the hits and misses of all processes.
+    The meta table also keeps the number of conditions, so that a flush
+    doesn't need to count them. When a flush leaves more than max_entries
+    conditions, the least recently used ones are removed.
+    """
+
+    schema_version = "3"
+
+    def __init__(self, path: str, checksum: str) -> None:
+        self.path = path
+        self.checksum = checksum
+        self._connection: Optional[sqlite3.Connection] = None
+        # The process that opened the connection. SQLite connections must
+        # not be used across fork(), so forked pool workers open their own.
+        self._connection_pid = -1
+        self._lock = threading.Lock()
+        self._pending: Dict[str, str] = {}
+        self._hits: Dict[str, int] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+                )
+                meta = dict(connection.execute("SELECT key, value FROM meta"))
+                if meta.get("schema_version") != self.schema_version:
+                    connection.execute("DROP TABLE IF EXISTS conditions")
+                    connection.execute("DELETE FROM meta")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS conditions (condition TEXT PRIMARY KEY, "
+                    "simplified TEXT NOT NULL, last_used REAL NOT NULL, "
+                    "hits INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID"
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS conditions_last_used ON conditions (last_used)"
+                )
+                if (
+                    meta.get("checksum") != self.checksum
+                    or meta.get("schema_version") != self.schema_version
+                ):
+                    connection.execute("DELETE FROM conditions")
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        [("checksum", self.checksum), ("schema_version", self.schema_version)],
+                    )
+                    self._import_legacy_cache(connection)
+                    self._count_entries(connection)
+                elif "entries" not in meta:
+                    self._count_entries(connection)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        return connection
+
+    def _count_entries(self, connection: sqlite3.Connection) -> int:
+        """Counts the conditions, and stores their number in the meta table."""
+        (entries,) = connection.execute("SELECT COUNT(*) FROM conditions").fetchone()
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('entries', ?)", (str(entries),)
         )
-        exit(1)
+        return entries
 
+    def _add_entries(self, connection: sqlite3.Connection, count: int) -> int:
+        """Adds count to the number of conditions in the meta table, and returns the new
+        number."""
+        connection.execute(
+            "UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE key = 'entries'", (count,)
+        )
+        (entries,) = connection.execute(
+            "SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'entries'"
+        ).fetchone()
+        return entries
 
-def simplify_condition_memoize(f: Callable[[str], str]):
-    cache_path = get_cache_location()
-    cache_file_content: Dict[str, Any] = {}
-
-    if os.path.exists(cache_path):
+    def _import_legacy_cache(self, connection: sqlite3.Connection) -> None:
+        legacy_path = get_legacy_cache_location()
         try:
-            with open_file_safe(cache_path, mode="r") as cache_file:
-                cache_file_content = json.load(cache_file)
+            with open(legacy_path, "r") as legacy_file:
+                legacy_content = json.load(legacy_file)
         except (IOError, ValueError):
-            print(f"Invalid pro2cmake cache file found at: {cache_path}. Removing it.")
-            os.remove(cache_path)
-
-    if not cache_file_content:
-        cache_file_content = init_cache_dict()
-
-    current_checksum = get_condition_simplifier_checksum()
-    if cache_file_content["checksum"] != current_checksum:
-        cache_file_content = init_cache_dict()
-
-    def update_cache_file():
-        if not os.path.exists(cache_path):
-            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-            # Create the file if it doesn't exist, but don't override
-            # it.
-            with open(cache_path, "a"):
-                pass
-
-        updated_cache = cache_file_content
-
-        with open_file_safe(cache_path, "r+") as cache_file_write_handle:
-            # Read any existing cache content, and truncate the file.
-            cache_file_existing_content = cache_file_write_handle.read()
-            cache_file_write_handle.seek(0)
-            cache_file_write_handle.truncate()
-
-            # Merge the new cache into the old cache if it exists.
-            if cache_file_existing_content:
-                possible_cache = json.loads(cache_file_existing_content)
-                if (
-                    "checksum" in possible_cache
-                    and "schema_version" in possible_cache
-                    and possible_cache["checksum"] == cache_file_content["checksum"]
-                    and possible_cache["schema_version"] == cache_file_content["schema_version"]
-                ):
-                    updated_cache = merge_dicts_recursive(dict(possible_cache), updated_cache)
-
-            json.dump(updated_cache, cache_file_write_handle, indent=4)
+            return
+        if isinstance(legacy_content, dict) and legacy_content.get("checksum") == self.checksum:
+            conditions = legacy_content.get("cache", {}).get("conditions", {})
+            now = time.time()
+            connection.executemany(
+                "INSERT OR IGNORE INTO conditions (condition, simplified, last_used) "
+                "VALUES (?, ?, ?)",
+                [(condition, simplified, now) for condition, simplified in conditions.items()],
+            )
+            print(f"Migrated {len(conditions)} conditions from pro2cmake cache file {legacy_path}.")
+        with contextlib.suppress(OSError):
+            os.remove(legacy_path)
+
+    def _get_connection(self) -> Optional[sqlite3.Connection]:
+        if self._connection_pid == os.getpid():
+            return self._connection
+        self._connection_pid = os.getpid()
+        self._connection = None
+        try:
+            self._connection = self._connect()
+        except sqlite3.OperationalError as e:
+            # The file is locked or can't be opened, but it can still be in use by other
+            # processes, so it is kept and only the in-process cache is used.
+            print(f"Failed to open pro2cmake cache file {self.path}: {e}")
+        except sqlite3.DatabaseError:
+            print(f"Invalid pro2cmake cache file found at: {self.path}. Removing it.")
+            for suffix in ["", "-wal", "-shm"]:
+                with contextlib.suppress(OSError):
+                    os.remove(self.path + suffix)
+            try:
+                self._connection = self._connect()
+            except sqlite3.Error as e:
+                print(f"Failed to open pro2cmake cache file {self.path}: {e}")
+        except (sqlite3.Error, OSError) as e:
+            print(f"Failed to open pro2cmake cache file {self.path}: {e}")
+        return self._connection
+
+    def get(self, condition: str) -> Optional[str]:
+        with self._lock:
+            connection = self._get_connection()
+            if connection is None:
+                return None
+            try:
+                row = connection.execute(
+                    "SELECT simplified FROM conditions WHERE condition = ?", (condition,)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        return row[0] if row else None
+
+    def add(self, condition: str, simplified: str) -> None:
+        with self._lock:
+            self._pending[condition] = simplified
+
+    def record_hit(self, condition: str) -> None:
+        with self._lock:
+            self._hits[condition] = self._hits.get(condition, 0) + 1
+
+    def _prune(self, connection: sqlite3.Connection, entries: int, max_entries: int) -> int:
+        if not max_entries or entries <= max_entries:
+            return 0
+        removed = connection.execute(
+            "DELETE FROM conditions WHERE condition IN "
+            "(SELECT condition FROM conditions ORDER BY last_used, hits LIMIT ?)",
+            (entries - max_entries,),
+        ).rowcount
+        self._add_entries(connection, -removed)
+        return removed
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending and not self._hits:
+                return
+            connection = self._get_connection()
+            if connection is None:
+                return
+            now = time.time()
+            misses = len(self._pending)
+            hits = sum(self._hits.values())
+            try:
+                with connection:
+                    inserted = connection.executemany(
+                        "INSERT OR IGNORE INTO conditions (condition, simplified, last_used) "
+                        "VALUES (?, ?, ?)",
+                        [
+                            (condition, simplified, now)
+                            for condition, simplified in self._pending.items()
+                        ],
+                    ).rowcount
+                    entries = self._add_entries(connection, inserted)
+                    connection.executemany(
+                        "UPDATE conditions SET hits = hits + ?, last_used = ? WHERE condition = ?",
+                        [(count, now, condition) for condition, count in self._hits.items()],
+                    )
+                    for key, value in [("hits", hits), ("misses", misses)]:
+                        connection.execute(
+                            "INSERT OR IGNORE INTO meta (key, value) VALUES (?, '0')", (key,)
+                        )
+                        connection.execute(
+                            "UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE key = ?",
+                            (value, key),
+                        )
+                    self._prune(connection, entries, condition_simplifier_cache_max_entries)
+            except sqlite3.Error as e:
+                print(f"Failed to write pro2cmake cache file {self.path}: {e}")
+            self._pending.clear()
+            self._hits.clear()
+
+    def prune(self, max_entries: int) -> int:
+        """Remove the least recently used entries beyond max_entries and
+        compact the file. Returns the number of removed entries."""
+        with self._lock:
+            connection = self._get_connection()
+            if connection is None:
+                return 0
+            with connection:
+                # Count the conditions again, in case the number in the meta table went wrong.
+                removed = self._prune(connection, self._count_entries(connection), max_entries)
+            connection.execute("VACUUM")
+        return removed
+
+    def statistics(self) -> Dict[str, int]:
+        with self._lock:
+            connection = self._get_connection()
+            if connection is None:
+                return {}
+            (entries,) = connection.execute("SELECT COUNT(*) FROM conditions").fetchone()
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+        size = 0
+        for suffix in ["", "-wal"]:
+            with contextlib.suppress(OSError):
+                size += os.path.getsize(self.path + suffix)
+        return {
+            "entries": entries,
+            "size": size,
+            "hits": int(meta.get("hits", 0)),
+            "misses": int(meta.get("misses", 0)),
+        }
+
+
+def get_condition_simplifier_cache_database() -> ConditionCacheDatabase:
+    return ConditionCacheDatabase(get_cache_location(), get_condition_simplifier_checksum())
+
+
+def print_condition_simplifier_cache_statistics() -> None:
+    database = get_condition_simplifier_cache_database()
+    statistics = database.statistics()
+    if not statistics:
+        return
+    lookups = statistics["hits"] + statistics["misses"]
+    hit_rate = f"{100 * statistics['hits'] / lookups:.1f}%" if lookups else "n/a"
+    max_entries = condition_simplifier_cache_max_entries or "unlimited"
+    print(f"Condition simplifier cache: {database.path}")
+    print(f"  Entries: {statistics['entries']} (maximum {max_entries})")
+    print(f"  Size: {statistics['size']} bytes")
+    print(f"  Hits: {statistics['hits']}")
+    print(f"  Misses: {statistics['misses']}")
+    print(f"  Hit rate: {hit_rate}")
+
+
+def prune_condition_simplifier_cache() -> None:
+    database = get_condition_simplifier_cache_database()
+    removed = database.prune(condition_simplifier_cache_max_entries)
+    print(f"Removed {removed} entries from the condition simplifier cache.")
 
-            # Flush any buffered writes.
-            cache_file_write_handle.flush()
-            os.fsync(cache_file_write_handle.fileno())
 
-    atexit.register(update_cache_file)
+def simplify_condition_memoize(f: Callable[[str], str]):
+    # The database is only created on the first lookup, since computing the
+    # checksum of the simplifier sources slows down the startup of every
+    # process, including those that don't simplify any condition.
+    database: Optional[ConditionCacheDatabase] = None
+    database_lock = threading.Lock()
+    # Conditions seen by this process, so that each one is looked up in
+    # the database at most once.
+    conditions: Dict[str, str] = {}
+
+    def get_database() -> ConditionCacheDatabase:
+        nonlocal database
+        with database_lock:
+            if database is None:
+                database = get_condition_simplifier_cache_database()
+            return database
+
+    def flush() -> None:
+        if database is not None:
+            database.flush()
+
+    atexit.register(flush)
+    _cache_file_writers.append(flush)
 
     def helper(condition: str) -> str:
-        if (
-            condition not in cache_file_content["cache"]["conditions"]
-            or not condition_simplifier_cache_enabled
-        ):
-            cache_file_content["cache"]["conditions"][condition] = f(condition)
-        return cache_file_content["cache"]["conditions"][condition]
+        if not get_conversion_context().condition_simplifier_cache_enabled:
+            conditions[condition] = f(condition)
+            get_database().add(condition, conditions[condition])
+        elif condition in conditions:
+            get_database().record_hit(condition)
+        else:
+            simplified = get_database().get(condition)
+            if simplified is None:
+                simplified = f(condition)
+                get_database().add(condition, simplified)
+            else:
+                get_database().record_hit(condition)
+            conditions[condition] = simplified
+        return conditions[condition]
 
     return helper
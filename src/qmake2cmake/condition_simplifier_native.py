@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Boolean simplification of CMake conditions without sympy.
+
+The sympy based simplifier in condition_simplifier.py rewrites the
+expression with one substitution pass per pair of operating systems and
+then minimizes it with simplify_logic. This module encodes the same
+domain knowledge as constraints between the platform atoms (UNIX is
+NOT WIN32, every flavor implies its base, the OS families exclude each
+other) and minimizes the condition directly with the Quine-McCluskey
+algorithm, treating the platform combinations that cannot occur as
+don't-cares. Truth tables are represented as Python integers with one
+bit per assignment of the atoms.
+
+The results are equivalent to the ones of the sympy path for every
+possible platform, but they are not always spelled the same way.
+"""
+
+import re
+
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+windows = ("WIN32", "WINRT")
+apples = ("MACOS", "UIKIT", "IOS", "TVOS", "WATCHOS")
+bsds = ("FREEBSD", "OPENBSD", "NETBSD")
+androids = ("ANDROID",)
+unixes = (
+    "APPLE",
+    *apples,
+    "BSD",
+    *bsds,
+    "LINUX",
+    *androids,
+    "HAIKU",
+    "INTEGRITY",
+    "VXWORKS",
+    "QNX",
+    "WASM",
+)
+
+# Conditions with more atoms than this are left to the sympy path. The
+# truth tables have 2**atoms bits, and the number of prime implicants can
+# grow exponentially. Beyond 10 atoms, the minimization can take as long as
+# the sympy path.
+max_atoms = 10
+
+_token_re = re.compile(r"\(|\)|[^\s()]+")
+_operators = ("AND", "OR", "NOT", "(", ")")
+_constants = {"ON": True, "true": True, "True": True, "OFF": False, "false": False, "False": False}
+
+# An expression is a constant, an atom name, or an operator with operands.
+Expression = Union[bool, str, Tuple[str, List["Expression"]]]
+
+# A literal is an atom name and whether it is negated.
+Literal = Tuple[str, bool]
+
+
+class UnsupportedConditionError(Exception):
+    """Raised for conditions that this module cannot simplify."""
+
+
+class _ConditionParser:
+    """Parses CMake conditions made of AND, OR, NOT, parentheses and atoms.
+
+    Consecutive words form a single atom, so "TARGET Foo::Bar" and
+    "a STREQUAL b" are atoms. Function calls and quoted strings are not
+    supported."""
+
+    def __init__(self, condition: str) -> None:
+        if '"' in condition:
+            raise UnsupportedConditionError(condition)
+        self.tokens = _token_re.findall(condition)
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def parse(self) -> Expression:
+        expr = self.parse_binary("OR")
+        if self.pos != len(self.tokens):
+            raise UnsupportedConditionError(" ".join(self.tokens))
+        return expr
+
+    def parse_binary(self, op: str) -> Expression:
+        operands = [self.parse_binary("AND") if op == "OR" else self.parse_unary()]
+        while self.peek() == op:
+            self.pos += 1
+            operands.append(self.parse_binary("AND") if op == "OR" else self.parse_unary())
+        return operands[0] if len(operands) == 1 else (op, operands)
+
+    def parse_unary(self) -> Expression:
+        token = self.peek()
+        if token == "NOT":
+            self.pos += 1
+            return ("NOT", [self.parse_unary()])
+        if token == "(":
+            self.pos += 1
+            expr = self.parse_binary("OR")
+            if self.peek() != ")":
+                raise UnsupportedConditionError(" ".join(self.tokens))
+            self.pos += 1
+            return expr
+
+        words = []
+        while self.peek() is not None and self.peek() not in _operators:
+            words.append(self.tokens[self.pos])
+            self.pos += 1
+        if not words or self.peek() == "(":
+            raise UnsupportedConditionError(" ".join(self.tokens))
+        atom = " ".join(words)
+        if atom in _constants:
+            return _constants[atom]
+        # UNIX and WIN32 are complementary, so only UNIX is used as a
+        # variable.
+        if atom == "WIN32":
+            return ("NOT", ["UNIX"])
+        return atom
+
+
+def _collect_atoms(expr: Expression, atoms: Set[str]) -> None:
+    if isinstance(expr, str):
+        atoms.add(expr)
+    elif isinstance(expr, tuple):
+        for operand in expr[1]:
+            _collect_atoms(operand, atoms)
+
+
+def _variable_table(index: int, size: int) -> int:
+    """Truth table of the variable with the given index over 2**size
+    assignments, where bit m is set if bit index of m is set."""
+    block = 1 << index
+    pattern = ((1 << block) - 1) << block
+    all_bits = (1 << (1 << size)) - 1
+    return pattern * (all_bits // ((1 << (2 * block)) - 1))
+
+
+def _evaluate(expr: Expression, tables: Dict[str, int], all_bits: int) -> int:
+    if isinstance(expr, bool):
+        return all_bits if expr else 0
+    if isinstance(expr, str):
+        return tables[expr]
+    op, operands = expr
+    if op == "NOT":
+        return all_bits & ~_evaluate(operands[0], tables, all_bits)
+    values = [_evaluate(operand, tables, all_bits) for operand in operands]
+    result = values[0]
+    for value in values[1:]:
+        result = result & value if op == "AND" else result | value
+    return result
+
+
+@lru_cache(maxsize=None)
+def _domain_clauses() -> FrozenSet[Tuple[Literal, Literal]]:
+    """All two-literal clauses that follow from the platform rules.
+
+    The rules are the ones that the sympy path applies by substitution.
+    Because they are 2-SAT clauses, the clauses derivable by resolution
+    describe exactly the possible platform combinations of any subset of
+    the atoms."""
+    clauses: List[Tuple[Literal, Literal]] = [
+        (("UNIX", True), ("WIN32", True)),
+        (("UNIX", False), ("WIN32", False)),
+    ]
+
+    def implies(flavor: str, base: str) -> None:
+        clauses.append(((flavor, False), (base, True)))
+
+    def excludes(a: str, b: str) -> None:
+        clauses.append(((a, False), (b, False)))
+
+    implies("WINRT", "WIN32")
+    for flavors, base in [(apples, "APPLE"), (bsds, "BSD"), (unixes, "UNIX")]:
+        for flavor in flavors:
+            implies(flavor, base)
+
+    families: List[Tuple[str, ...]] = [windows, androids, ("BSD", *bsds)]
+    families += [(family,) for family in ("HAIKU", "QNX", "INTEGRITY", "LINUX", "VXWORKS")]
+    for family in families:
+        for member in family:
+            for other in unixes:
+                if other not in family:
+                    excludes(member, other)
+
+    # Implication graph: the clause (x OR y) means NOT x -> y and NOT y -> x.
+    graph: Dict[Literal, Set[Literal]] = {}
+    for x, y in clauses:
+        graph.setdefault((x[0], not x[1]), set()).add(y)
+        graph.setdefault((y[0], not y[1]), set()).add(x)
+
+    result = set()
+    for start in list(graph):
+        reachable: Set[Literal] = set()
+        pending = [start]
+        while pending:
+            literal = pending.pop()
+            for successor in graph.get(literal, ()):
+                if successor not in reachable:
+                    reachable.add(successor)
+                    pending.append(successor)
+        negated_start = (start[0], not start[1])
+        for literal in reachable:
+            if literal[0] != start[0]:
+                result.add(tuple(sorted((negated_start, literal))))
+    return frozenset(result)  # type: ignore
+
+
+def _care_table(tables: Dict[str, int], all_bits: int) -> int:
+    """Truth table of the platform combinations that can occur."""
+    care = all_bits
+    for x, y in _domain_clauses():
+        if x[0] in tables and y[0] in tables:
+            x_table = tables[x[0]] if x[1] else all_bits & ~tables[x[0]]
+            y_table = tables[y[0]] if y[1] else all_bits & ~tables[y[0]]
+            care &= x_table | y_table
+    return care
+
+
+# A cube is a product term: the bits of the assignment in "value" that are
+# not in the don't-care mask "mask".
+Cube = Tuple[int, int]
+
+
+def _prime_implicants(minterms: List[int], size: int) -> List[Cube]:
+    current = {(m, 0) for m in minterms}
+    primes: Set[Cube] = set()
+    while current:
+        combined: Set[Cube] = set()
+        next_cubes: Set[Cube] = set()
+        for value, mask in current:
+            for i in range(size):
+                bit = 1 << i
+                if mask & bit or value & bit:
+                    continue
+                partner = (value | bit, mask)
+                if partner in current:
+                    combined.add((value, mask))
+                    combined.add(partner)
+                    next_cubes.add((value, mask | bit))
+        primes.update(current - combined)
+        current = next_cubes
+    return sorted(primes)
+
+
+def _cube_covers(cube: Cube, minterm: int) -> bool:
+    value, mask = cube
+    return (minterm & ~mask) == value
+
+
+def _cube_cost(cube: Cube, size: int) -> int:
+    return size - bin(cube[1]).count("1")
+
+
+def _minimum_cover(minterms: List[int], size: int, dont_cares: List[int]) -> List[Cube]:
+    """Selects prime implicants of minterms plus dont_cares that cover all
+    minterms, with as few literals as possible."""
+    if not minterms:
+        return []
+    primes = _prime_implicants(minterms + dont_cares, size)
+    coverage = {p: frozenset(m for m in minterms if _cube_covers(p, m)) for p in primes}
+    primes = [p for p in primes if coverage[p]]
+
+    cover: List[Cube] = []
+    uncovered = set(minterms)
+    # Essential prime implicants are the only ones covering some minterm.
+    for m in minterms:
+        covering = [p for p in primes if m in coverage[p]]
+        if len(covering) == 1 and covering[0] not in cover:
+            cover.append(covering[0])
+            uncovered -= coverage[covering[0]]
+
+    candidates = [p for p in primes if p not in cover and coverage[p] & uncovered]
+    best: List[Optional[List[Cube]]] = [None]
+
+    def cost(cubes: List[Cube]) -> Tuple[int, int]:
+        return sum(_cube_cost(c, size) for c in cubes), len(cubes)
+
+    def search(chosen: List[Cube], remaining: FrozenSet[int], budget: List[int]):
+        if best[0] is not None and cost(chosen) >= cost(best[0]):
+            return
+        if not remaining:
+            best[0] = list(chosen)
+            return
+        budget[0] -= 1
+        if budget[0] < 0:
+            return
+        # Branch on the candidates covering the first uncovered minterm.
+        m = min(remaining)
+        for p in sorted(
+            (p for p in candidates if m in coverage[p]),
+            key=lambda p: (-len(coverage[p] & remaining), _cube_cost(p, size)),
+        ):
+            chosen.append(p)
+            search(chosen, remaining - coverage[p], budget)
+            chosen.pop()
+
+    search([], frozenset(uncovered), [2000])
+    if best[0] is not None:
+        return cover + best[0]
+
+    # The search ran out of budget before finding any cover, so cover the
+    # rest greedily.
+    while uncovered:
+        p = max(candidates, key=lambda p: (len(coverage[p] & uncovered), -_cube_cost(p, size)))
+        cover.append(p)
+        uncovered -= coverage[p]
+    return cover
+
+
+def _literal_text(atom: str, positive: bool) -> str:
+    if atom == "UNIX" and not positive:
+        return "WIN32"
+    return atom if positive else f"NOT {atom}"
+
+
+def _literal_sort_key(text: str) -> Tuple[int, str]:
+    return (1, text[4:]) if text.startswith("NOT ") else (0, text)
+
+
+def _format(terms: List[List[str]], inner: str, outer: str) -> str:
+    """Formats the terms like sympy prints them: literals before compound
+    terms, positive literals before negated ones, then by atom name."""
+    formatted: List[Tuple[Tuple[int, Any], str]] = []
+    for literals in terms:
+        literals = sorted(literals, key=_literal_sort_key)
+        text = f" {inner} ".join(literals)
+        if len(literals) == 1:
+            formatted.append((_literal_sort_key(text), text))
+        elif len(terms) > 1:
+            formatted.append(((2, [_literal_sort_key(t) for t in literals]), f"({text})"))
+        else:
+            formatted.append(((2, []), text))
+    return f" {outer} ".join(text for _, text in sorted(formatted))
+
+
+def _cube_literals(cube: Cube, atoms: List[str], positive: bool) -> List[str]:
+    value, mask = cube
+    return [
+        _literal_text(atom, bool(value >> i & 1) == positive)
+        for i, atom in enumerate(atoms)
+        if not mask >> i & 1
+    ]
+
+
+def parse_condition(condition: str) -> Expression:
+    return _ConditionParser(condition).parse()
+
+
+def _truth_tables(expressions: List[Expression]) -> Tuple[List[int], int, int, List[str]]:
+    """Returns the truth tables of the expressions, the care table, the
+    mask of all assignments and the atoms in variable order."""
+    atom_set: Set[str] = set()
+    for expr in expressions:
+        _collect_atoms(expr, atom_set)
+    atoms = sorted(atom_set)
+    if len(atoms) > max_atoms:
+        raise UnsupportedConditionError(f"{len(atoms)} atoms")
+    all_bits = (1 << (1 << len(atoms))) - 1
+    tables = {atom: _variable_table(i, len(atoms)) for i, atom in enumerate(atoms)}
+    values = [_evaluate(expr, tables, all_bits) for expr in expressions]
+    return values, _care_table(tables, all_bits), all_bits, atoms
+
+
+def simplify_condition_native(condition: str) -> str:
+    """Returns the simplified condition, or raises UnsupportedConditionError."""
+    (value,), care, all_bits, atoms = _truth_tables([parse_condition(condition)])
+    on = value & care
+    off = ~value & care
+    if not on:
+        return "OFF"
+    if not off:
+        return "ON"
+
+    size = len(atoms)
+    on_set = [m for m in range(1 << size) if on >> m & 1]
+    off_set = [m for m in range(1 << size) if off >> m & 1]
+    dont_cares = [m for m in range(1 << size) if not care >> m & 1]
+
+    sop = [_cube_literals(c, atoms, True) for c in _minimum_cover(on_set, size, dont_cares)]
+    pos = [_cube_literals(c, atoms, False) for c in _minimum_cover(off_set, size, dont_cares)]
+    sop_cost = sum(len(t) for t in sop)
+    pos_cost = sum(len(t) for t in pos)
+    # Like sympy, prefer the sum of products when the condition is true for
+    # at least half of the assignments.
+    if sop_cost < pos_cost or sop_cost == pos_cost and len(on_set) >= len(off_set):
+        return _format(sop, "AND", "OR")
+    return _format(pos, "OR", "AND")
+
+
+def conditions_equivalent(a: str, b: str) -> bool:
+    """Whether the conditions have the same value on every possible
+    platform. Conditions that cannot be parsed are compared as text."""
+    try:
+        (a_value, b_value), care, _, _ = _truth_tables([parse_condition(a), parse_condition(b)])
+    except UnsupportedConditionError:
+        return a.strip() == b.strip()
+    return (a_value ^ b_value) & care == 0
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Settings and state of a conversion.
+
+A ConversionContext carries the settings of a conversion, like the minimum
+Qt version, and the counters that make the generated names unique. It also
+holds the directory that relative paths are resolved against, so that
+converting a project doesn't change the working directory of the process.
+
+The context of the running conversion is kept in a context variable, so
+threads and asyncio tasks can each convert a project with their own
+context. A context must only be used by one conversion at a time.
+Conversions that don't set a context use a process-wide default one.
+"""
+
+import contextlib
+import os
+
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Set, Union
+
+from packaging import version
+
+
+class ConversionContext:
+    def __init__(
+        self,
+        *,
+        directory: str = "",
+        min_qt_version: Union[str, version.Version] = "1.0.0",
+        cmake_api_version: int = 3,
+        condition_simplifier_cache_enabled: bool = True,
+    ) -> None:
+        # The directory relative paths are resolved against. When empty,
+        # the working directory of the process.
+        self.directory = os.path.abspath(directory) if directory else ""
+        if isinstance(min_qt_version, str):
+            min_qt_version = version.parse(min_qt_version)
+        if not isinstance(min_qt_version, version.Version):
+            raise ValueError("Specified minimum Qt version is invalid.")
+        self.min_qt_version = min_qt_version
+        self.cmake_api_version = cmake_api_version
+        self.condition_simplifier_cache_enabled = condition_simplifier_cache_enabled
+        # The absolute path of the project file being converted, mentioned
+        # in messages.
+        self.project_file_path = ""
+
+        # The id of the next created scope, as shown in the generated
+        # "Keys ignored in scope" comments.
+        self.next_scope_id = 1
+        # The number of expanded resource globs, which name the generated
+        # variables.
+        self.resource_file_expansion_counter = 0
+        # The recorders of the scope evaluations in progress, innermost
+        # last. See Scope._evaluate_cached.
+        self.evaluation_recorders: List[Any] = []
+        # The absolute paths of the files the conversion read or looked
+        # for, and of the directories whose entries it looked up. See
+        # conversion_manifest.py.
+        self.input_files: Set[str] = set()
+        self.input_directories: Set[str] = set()
+        # The listings of the directories whose entries were looked up, by
+        # absolute path. See directory_cache.py.
+        self.directory_listings: Dict[str, Any] = {}
+
+    def resolve_path(self, path: str) -> str:
+        """Returns path, relative to the directory of the context if it is
+        relative."""
+        if not self.directory:
+            return path
+        return os.path.join(self.directory, path)
+
+    def current_directory(self) -> str:
+        return self.directory or os.getcwd()
+
+
+_default_context = ConversionContext()
+_current_context = ContextVar(
+    "qmake2cmake_conversion_context", default=_default_context
+)  # type: ContextVar[ConversionContext]
+
+
+def get_conversion_context() -> ConversionContext:
+    """Returns the context of the running conversion."""
+    return _current_context.get()
+
+
+@contextlib.contextmanager
+def use_conversion_context(context: ConversionContext) -> Iterator[ConversionContext]:
+    """Make context the context of the conversions in the with block."""
+    token = _current_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_context.reset(token)
+
+
+def resolve_path(path: str) -> str:
+    """Returns path, relative to the directory of the running conversion
+    if it is relative."""
+    return _current_context.get().resolve_path(path)
+
+
+def absolute_path(path: str) -> str:
+    """os.path.abspath, relative to the directory of the running
+    conversion."""
+    return os.path.abspath(_current_context.get().resolve_path(path))
+
+
+def current_directory() -> str:
+    """os.getcwd for the running conversion."""
+    return _current_context.get().current_directory()
+
+
+def record_input_file(path: str) -> None:
+    """Record that the running conversion depends on the contents of the
+    file at path, or on it not existing."""
+    _current_context.get().input_files.add(absolute_path(path))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Manifests of the inputs of converted projects.
+
+For incremental conversions, a manifest is written next to every
+generated CMakeLists.txt, in the .qmake2cmake directory. It records the
+hashes of everything the conversion depended on: the project file, the
+included .pri files, the .qrc and qmldir files, the files of the analyzed
+subprojects, the listings of the directories in which files were looked
+up, and the generated file itself. It also records a checksum of the
+converter and the command line options that change the output.
+
+A project only needs to be converted again when its manifest is missing
+or any of these changed.
+"""
+
+import hashlib
+import json
+import os
+
+from typing import Any, Dict, Optional
+
+import pyparsing as pp  # type: ignore
+
+from qmake2cmake.cache_records import (
+    CacheRecord,
+    get_file_hash,
+    get_sources_checksum,
+    read_record,
+    write_file_atomically,
+)
+from qmake2cmake.conversion_context import ConversionContext
+from qmake2cmake.helper import get_library_mappings_checksum
+
+# Entries of directories that the conversions themselves create or
+# replace. They don't change the generated files, so they are left out of
+# the directory listings.
+_generated_directory_entries = {
+    ".qmake2cmake",
+    "CMakeLists.txt",
+    "CMakeLists.gen.txt",
+    ".prev_CMakeLists.txt",
+    "CMakeLists-post-merge.txt",
+    "CMakeLists.no-special.txt",
+    "tmp_repo",
+}
+
+
+class ConversionManifest(CacheRecord):
+    fields = ("options", "files", "directories")
+
+    def __init__(
+        self,
+        options: Dict[str, Any],
+        files: Dict[str, Optional[str]],
+        directories: Dict[str, Optional[str]],
+    ) -> None:
+        super().__init__()
+        # The command line options that change the output, including
+        # whether the project is a subproject of a SUBDIRS project.
+        self.options = options
+        # The hashes of the input files and of the output file, by
+        # absolute path, as returned by get_file_hash.
+        self.files = files
+        # The hashes of the directory listings, by absolute path, as
+        # returned by get_directory_hash.
+        self.directories = directories
+
+    @staticmethod
+    def get_converter_checksum() -> str:
+        return get_converter_checksum()
+
+    def is_up_to_date(self, options: Dict[str, Any]) -> bool:
+        return (
+            self.options == options
+            and self.files_are_up_to_date(self.files)
+            and all(
+                get_directory_hash(path) == directory_hash
+                for path, directory_hash in self.directories.items()
+            )
+        )
+
+
+def get_directory_hash(path: str) -> Optional[str]:
+    """Returns the hash of the names and kinds of the entries of the
+    directory at path, or None if it can't be listed."""
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(
+                f"{entry.name}/" if entry.is_dir() else entry.name
+                for entry in it
+                if entry.name not in _generated_directory_entries
+                and not entry.name.endswith(".tmp")
+            )
+    except OSError:
+        return None
+    return hashlib.sha256("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+def get_converter_checksum() -> str:
+    return get_sources_checksum(pp.__version__) + get_library_mappings_checksum()
+
+
+def get_manifest_path(output_file_path: str) -> str:
+    """Returns the path of the manifest of the generated file at the
+    absolute output_file_path."""
+    output_dir_path, output_file_name = os.path.split(output_file_path)
+    return os.path.join(output_dir_path, ".qmake2cmake", output_file_name + ".manifest.json")
+
+
+def create_conversion_manifest(
+    context: ConversionContext, output_file_path: str, options: Dict[str, Any]
+) -> ConversionManifest:
+    """Returns the manifest of the conversion that ran in context and wrote
+    the file at the absolute output_file_path."""
+    files = {path: get_file_hash(path) for path in sorted(context.input_files)}
+    files[output_file_path] = get_file_hash(output_file_path)
+    # Whether the project is a subproject is recorded in the options, and
+    # the manifests themselves are in the .qmake2cmake directories.
+    directories = {
+        path: get_directory_hash(path)
+        for path in sorted(context.input_directories)
+        if os.path.basename(path) != ".qmake2cmake"
+    }
+    return ConversionManifest(options, files, directories)
+
+
+def read_conversion_manifest(output_file_path: str) -> Optional[ConversionManifest]:
+    return read_record(ConversionManifest, get_manifest_path(output_file_path))
+
+
+def write_conversion_manifest(output_file_path: str, manifest: ConversionManifest) -> None:
+    manifest_path = get_manifest_path(output_file_path)
+    try:
+        write_file_atomically(
+            manifest_path, json.dumps(manifest.to_dict(), indent=1, sort_keys=True)
+        )
+    except OSError as e:
+        print(f"Failed to write the conversion manifest {manifest_path}: {e}")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Cache of directory listings for file existence checks.
+
+Converting a project checks whether source files exist, in the project
+directory and in every VPATH entry, and whether SUBDIRS entries are
+directories or files. Instead of one stat call per check, every directory
+is listed once with os.scandir, and the checks are answered from the
+listing. On network-mounted source trees, this saves most of the system
+calls of a conversion.
+
+The listings are kept in the ConversionContext of the running conversion,
+so conversions don't share them and every conversion starts with none.
+They are not updated when files change, so invalidate_directory must be
+called after creating files that are checked later.
+
+Names that are only spelled differently from an entry, which can be the
+same file on case-insensitive file systems, are checked with os.path.
+
+Relative paths are relative to the directory of the running conversion.
+"""
+
+import os
+import re
+
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+from qmake2cmake.conversion_context import (
+    absolute_path,
+    current_directory,
+    get_conversion_context,
+    resolve_path,
+)
+
+
+class _DirectoryListing(NamedTuple):
+    # The entries of the directory, each with whether it is a directory,
+    # whether it is a file and whether it is a symbolic link.
+    entries: Dict[str, Tuple[bool, bool, bool]]
+    # The case folded names of the entries. On case-insensitive file
+    # systems, a name that only matches one of these exists too.
+    folded_names: Set[str]
+
+
+_separator_re = re.compile(r"[\\/]")
+
+
+def _get_directory_listings() -> Dict[str, Optional[_DirectoryListing]]:
+    """Returns the listings of the running conversion, or None for the
+    directories that don't exist, by absolute path."""
+    return get_conversion_context().directory_listings
+
+
+def clear_directory_cache() -> None:
+    _get_directory_listings().clear()
+
+
+def invalidate_directory(path: str) -> None:
+    """Forget the listing of the directory at path."""
+    _get_directory_listings().pop(absolute_path(path), None)
+
+
+def _list_directory(directory: str) -> Optional[_DirectoryListing]:
+    directory_listings = _get_directory_listings()
+    if directory in directory_listings:
+        return directory_listings[directory]
+    listing: Optional[_DirectoryListing] = None
+    try:
+        with os.scandir(directory) as it:
+            entries = {}
+            for entry in it:
+                try:
+                    entries[entry.name] = (entry.is_dir(), entry.is_file(), entry.is_symlink())
+                except OSError:
+                    entries[entry.name] = (False, False, False)
+        listing = _DirectoryListing(entries, {name.casefold() for name in entries})
+    except OSError:
+        pass
+    directory_listings[directory] = listing
+    return listing
+
+
+def _is_symlink(path: str) -> bool:
+    directory, name = os.path.split(path)
+    listing = _list_directory(directory) if name else None
+    return listing is not None and name in listing.entries and listing.entries[name][2]
+
+
+def _physical_path(path: str) -> str:
+    """Returns the absolute path of path. Like the file system, and unlike
+    os.path.abspath, a .. after a symbolic link leads to the parent of its
+    target."""
+    path = resolve_path(path)
+    if not os.path.isabs(path):
+        path = os.path.join(current_directory(), path)
+    if ".." not in _separator_re.split(path):
+        return os.path.abspath(path)
+    drive, rest = os.path.splitdrive(path)
+    result = drive + os.sep
+    for part in _separator_re.split(rest):
+        if part in ("", "."):
+            continue
+        if part == "..":
+            if _is_symlink(result):
+                result = os.path.realpath(result)
+            result = os.path.dirname(result)
+        else:
+            result = os.path.join(result, part)
+    return result
+
+
+def _lookup(path: str) -> Optional[Tuple[bool, bool]]:
+    """Returns whether path is a directory and whether it is a file, or
+    None if it doesn't exist."""
+    if not path:
+        return None
+    path_absolute = _physical_path(path)
+    directory, name = os.path.split(path_absolute)
+    if not name:
+        # The root directory.
+        return (True, False) if os.path.isdir(path_absolute) else None
+    get_conversion_context().input_directories.add(directory)
+    listing = _list_directory(directory)
+    if listing is None:
+        return None
+    if name not in listing.entries:
+        if name.casefold() not in listing.folded_names:
+            return None
+        # The entry is spelled differently, which only the file system
+        # knows how to compare.
+        path_absolute += os.sep if path.endswith(("/", os.sep)) else ""
+        if not os.path.exists(path_absolute):
+            return None
+        return os.path.isdir(path_absolute), os.path.isfile(path_absolute)
+    is_dir, is_file, _ = listing.entries[name]
+    if path.endswith(("/", os.sep)) and not is_dir:
+        return None
+    return is_dir, is_file
+
+
+def path_exists(path: str) -> bool:
+    """Cached os.path.exists."""
+    kind = _lookup(path)
+    if kind is None:
+        return False
+    # Entries that are neither files nor directories, like broken
+    # symbolic links, are rare enough to check directly.
+    return kind != (False, False) or os.path.exists(resolve_path(path))
+
+
+def path_isdir(path: str) -> bool:
+    """Cached os.path.isdir."""
+    kind = _lookup(path)
+    return kind is not None and kind[0]
+
+
+def path_isfile(path: str) -> bool:
+    """Cached os.path.isfile."""
+    kind = _lookup(path)
+    return kind is not None and kind[1]
@@ -1,6 +1,8 @@
 # Copyright (C) 2021 The Qt Company Ltd.
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
+import hashlib
+import json
 import re
 import typing
 
@@ -583,7 +585,7 @@ _library_map = [
 ]
 
 
-def _adjust_library_map():
+def _adjust_library_mapping(mapping: LibraryMapping) -> None:
     # Assign a Linux condition on all wayland related packages.
     # Assign platforms that have X11 condition on all X11 related packages.
     # We don't want to get pages of package not found messages on
@@ -591,28 +593,156 @@ def _adjust_library_map():
     # those platforms.
     linux_package_prefixes = ["wayland"]
     x11_package_prefixes = ["xcb", "x11", "xkb", "xrender", "xlib"]
-    for i, _ in enumerate(_library_map):
-        if any([_library_map[i].soName.startswith(p) for p in linux_package_prefixes]):
-            _library_map[i].emit_if = "config.linux"
-        if any([_library_map[i].soName.startswith(p) for p in x11_package_prefixes]):
-            _library_map[i].emit_if = "X11_SUPPORTED"
+    if any([mapping.soName.startswith(p) for p in linux_package_prefixes]):
+        mapping.emit_if = "config.linux"
+    if any([mapping.soName.startswith(p) for p in x11_package_prefixes]):
+        mapping.emit_if = "X11_SUPPORTED"
+
+
+def _adjust_library_map():
+    for mapping in _library_map:
+        _adjust_library_mapping(mapping)
 
 
 _adjust_library_map()
 
 
+# Indexes of the library maps, by soName, targetName and no_link_so_name.
+# Mappings registered with register_library_mappings come first, followed
+# by the built-in ones. Like the linear searches they replace, the indexes
+# return the first mapping with a given name.
+_library_map_by_so_name: typing.Dict[str, LibraryMapping] = {}
+_library_map_by_target_name: typing.Dict[str, LibraryMapping] = {}
+_library_map_by_no_link_so_name: typing.Dict[str, LibraryMapping] = {}
+_qt_library_map_by_so_name: typing.Dict[str, LibraryMapping] = {}
+_qt_library_map_by_target_name: typing.Dict[str, LibraryMapping] = {}
+
+# Mappings registered with register_library_mappings, by soName.
+_registered_library_map: typing.Dict[str, LibraryMapping] = {}
+_registered_qt_library_map: typing.Dict[str, LibraryMapping] = {}
+
+# Incremented whenever the indexes are rebuilt, so that results computed
+# from the mappings can be cached per generation.
+_library_mappings_generation = 0
+
+
+def _build_library_map_indexes() -> None:
+    global _library_mappings_generation
+    _library_mappings_generation += 1
+    for index in [
+        _library_map_by_so_name,
+        _library_map_by_target_name,
+        _library_map_by_no_link_so_name,
+        _qt_library_map_by_so_name,
+        _qt_library_map_by_target_name,
+    ]:
+        index.clear()
+
+    for mapping in [*_registered_library_map.values(), *_library_map]:
+        _library_map_by_so_name.setdefault(mapping.soName, mapping)
+        if mapping.targetName:
+            _library_map_by_target_name.setdefault(mapping.targetName, mapping)
+        if mapping.no_link_so_name:
+            _library_map_by_no_link_so_name.setdefault(mapping.no_link_so_name, mapping)
+
+    for mapping in [*_registered_qt_library_map.values(), *_qt_library_map]:
+        _qt_library_map_by_so_name.setdefault(mapping.soName, mapping)
+        if mapping.targetName:
+            _qt_library_map_by_target_name.setdefault(mapping.targetName, mapping)
+
+
+_build_library_map_indexes()
+
+
+def register_library_mappings(
+    mappings: typing.Iterable[LibraryMapping], *, qt: bool = False
+) -> None:
+    """Add library mappings to the 3rd party or, with qt set, the Qt
+    library map. They take precedence over the built-in mappings and over
+    previously registered ones with the same soName.
+
+    Like the built-in ones, 3rd party wayland and X11 mappings without an
+    emit_if condition are only emitted on the platforms that have them."""
+    registered_map = _registered_qt_library_map if qt else _registered_library_map
+    for mapping in mappings:
+        if not qt and not mapping.emit_if:
+            _adjust_library_mapping(mapping)
+        registered_map.pop(mapping.soName, None)
+        registered_map[mapping.soName] = mapping
+    _build_library_map_indexes()
+
+
+def clear_registered_library_mappings() -> None:
+    _registered_library_map.clear()
+    _registered_qt_library_map.clear()
+    _build_library_map_indexes()
+
+
+def get_library_mappings_generation() -> int:
+    """Returns a number that changes whenever the library mappings change."""
+    return _library_mappings_generation
+
+
+def get_library_mappings_checksum() -> str:
+    """Returns a checksum of the registered library mappings."""
+    registered = [
+        [vars(mapping) for mapping in registered_map.values()]
+        for registered_map in [_registered_library_map, _registered_qt_library_map]
+    ]
+    if not any(registered):
+        return ""
+    content = json.dumps(registered, sort_keys=True)
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+
+def _read_library_mapping_file(path: str) -> typing.Dict[str, typing.Any]:
+    if path.endswith(".toml"):
+        try:
+            import tomllib  # type: ignore
+        except ImportError:
+            try:
+                import tomli as tomllib  # type: ignore
+            except ImportError:
+                raise ValueError(
+                    f"{path}: Reading TOML files requires Python 3.11 or later, or tomli."
+                )
+        with open(path, "rb") as mapping_file:
+            return tomllib.load(mapping_file)
+    with open(path, "r") as mapping_file:
+        return json.load(mapping_file)
+
+
+def load_library_mappings(path: str) -> None:
+    """Register the library mappings of a JSON or TOML file.
+
+    The file contains a "libraries" and a "qt_libraries" list of 3rd party
+    and Qt library mappings. Each mapping is a table with the arguments of
+    LibraryMapping, for example:
+
+        {"libraries": [{"soName": "foo", "packageName": "Foo",
+                        "targetName": "Foo::Foo", "extra": ["REQUIRED"]}]}
+    """
+    contents = _read_library_mapping_file(path)
+    if not isinstance(contents, dict) or not set(contents) <= {"libraries", "qt_libraries"}:
+        raise ValueError(
+            f'{path}: Expected a table with "libraries" and "qt_libraries" lists of mappings.'
+        )
+    for key, qt in [("libraries", False), ("qt_libraries", True)]:
+        mappings = []
+        for entry in contents.get(key, []):
+            try:
+                mappings.append(LibraryMapping(**entry))
+            except TypeError as e:
+                raise ValueError(f"{path}: Invalid library mapping {entry}: {e}")
+        register_library_mappings(mappings, qt=qt)
+
+
 def find_3rd_party_library_mapping(soName: str) -> typing.Optional[LibraryMapping]:
-    for i in _library_map:
-        if i.soName == soName:
-            return i
-    return None
+    return _library_map_by_so_name.get(soName)
 
 
 def find_qt_library_mapping(soName: str) -> typing.Optional[LibraryMapping]:
-    for i in _qt_library_map:
-        if i.soName == soName:
-            return i
-    return None
+    return _qt_library_map_by_so_name.get(soName)
 
 
 def find_library_info_for_target(targetName: str) -> typing.Optional[LibraryMapping]:
@@ -620,23 +750,18 @@ def find_library_info_for_target(targetName: str) -> typing.Optional[LibraryMapp
     if targetName.endswith("Private"):
         qt_target = qt_target[:-7]
 
-    for i in _qt_library_map:
-        if i.targetName == qt_target:
-            return i
-
-    for i in _library_map:
-        if i.targetName == targetName:
-            return i
-
-    return None
+    mapping = _qt_library_map_by_target_name.get(qt_target)
+    if mapping:
+        return mapping
+    return _library_map_by_target_name.get(targetName)
 
 
 # For a given qmake library (e.g. 'openssl_headers'), check whether this is a fake library used
 # for the /nolink annotation, and return the actual annotated qmake library ('openssl/nolink').
 def find_annotated_qmake_lib_name(lib: str) -> str:
-    for entry in _library_map:
-        if entry.no_link_so_name == lib:
-            return entry.soName + "/nolink"
+    entry = _library_map_by_no_link_so_name.get(lib)
+    if entry:
+        return entry.soName + "/nolink"
     return lib
 
 
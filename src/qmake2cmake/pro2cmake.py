@@ -16,14 +16,29 @@ import io
 import itertools
 import glob
 import fnmatch
-
-from qmake2cmake.condition_simplifier import simplify_condition
-from qmake2cmake.condition_simplifier_cache import set_condition_simplified_cache_enabled
+import stat
+import threading
+
+from qmake2cmake.condition_simplifier import (
+    condition_simplifier_engines,
+    default_condition_simplifier_max_atoms,
+    default_condition_simplifier_timeout,
+    set_condition_simplifier_engine,
+    set_condition_simplifier_max_atoms,
+    set_condition_simplifier_timeout,
+    simplify_condition,
+)
+from qmake2cmake.condition_simplifier_cache import (
+    default_condition_simplifier_cache_max_entries,
+    print_condition_simplifier_cache_statistics,
+    prune_condition_simplifier_cache,
+    set_condition_simplifier_cache_max_entries,
+)
 
 import pyparsing as pp  # type: ignore
 import xml.etree.ElementTree as ET
 
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 from textwrap import dedent
 from functools import lru_cache
 from shutil import copyfile
@@ -41,10 +56,46 @@ from typing import (
     FrozenSet,
     Tuple,
     Match,
+    Sequence,
     Type,
 )
 
-from qmake2cmake.qmake_parser import parseProFile, parseProFileContents
+from qmake2cmake.cache_records import get_file_hash
+from qmake2cmake.conversion_context import (
+    ConversionContext,
+    absolute_path,
+    current_directory,
+    get_conversion_context,
+    record_input_file,
+    resolve_path,
+    use_conversion_context,
+)
+from qmake2cmake.conversion_manifest import (
+    create_conversion_manifest,
+    read_conversion_manifest,
+    write_conversion_manifest,
+)
+from qmake2cmake.directory_cache import (
+    clear_directory_cache,
+    invalidate_directory,
+    path_exists,
+    path_isdir,
+    path_isfile,
+)
+from qmake2cmake.project_analysis_cache import (
+    ProjectAnalysis,
+    lookup_project_analysis,
+    set_persistent_analysis_cache_enabled,
+    store_project_analysis,
+)
+from qmake2cmake.qmake_parser import LineOffsetIndex, parseProFile
+from qmake2cmake.qmake_parser_cache import (
+    parseProFileStatements,
+    parser_backends,
+    parseProFileContentsStatements,
+    set_parse_cache_enabled,
+    set_parser_backend,
+)
 from qmake2cmake.special_case_helper import SpecialCaseHandler
 from qmake2cmake.helper import (
     map_qt_library,
@@ -54,12 +105,12 @@ from qmake2cmake.helper import (
     map_platform,
     find_library_info_for_target,
     generate_find_package_info,
+    get_library_mappings_generation,
+    load_library_mappings,
     LibraryMapping,
 )
 
 cmake_version_string = "3.16"
-cmake_api_version = 3
-min_qt_version = version.parse("1.0.0")
 
 
 def _parse_commandline(command_line_args: Optional[List[str]] = None):
@@ -110,7 +161,7 @@ def _parse_commandline(command_line_args: Optional[List[str]] = None):
         "--debug-special-case-preservation",
         dest="debug_special_case_preservation",
         action="store_true",
-        help="Show all git commands and file copies.",
+        help="Show all merge steps, git commands and file copies.",
     )
 
     parser.add_argument(
@@ -118,7 +169,15 @@ def _parse_commandline(command_line_args: Optional[List[str]] = None):
         "--enable-special-case-preservation",
         dest="enable_special_case_preservation",
         action="store_true",
-        help="Enables special case modifications (requires git in PATH)",
+        help="Enables special case modifications",
+    )
+    parser.add_argument(
+        "--special-case-merge",
+        dest="special_case_merge",
+        choices=["builtin", "git"],
+        default="builtin",
+        help="How special case modifications are reapplied. 'builtin' merges in memory. "
+        "'git' merges in a temporary git repository, which requires git in PATH.",
     )
     parser.add_argument(
         "-k",
@@ -137,6 +196,101 @@ def _parse_commandline(command_line_args: Optional[List[str]] = None):
         help="Don't use condition simplifier cache (conversion speed may decrease).",
     )
 
+    parser.add_argument(
+        "--condition-simplifier",
+        dest="condition_simplifier",
+        choices=condition_simplifier_engines,
+        default="sympy",
+        help="How conditions are simplified. 'sympy' is the reference implementation. "
+        "'native' minimizes conditions without sympy, which is much faster; the results are "
+        "equivalent, but not always spelled the same way.",
+    )
+
+    parser.add_argument(
+        "--condition-max-atoms",
+        dest="condition_max_atoms",
+        type=int,
+        default=default_condition_simplifier_max_atoms,
+        help="Don't simplify conditions with more distinct atoms than this with sympy. "
+        f"0 means no limit. Default is {default_condition_simplifier_max_atoms}.",
+    )
+
+    parser.add_argument(
+        "--condition-timeout",
+        dest="condition_timeout",
+        type=float,
+        default=default_condition_simplifier_timeout,
+        help="Give up simplifying a condition with sympy after this many seconds. "
+        f"0 means no limit. Default is {default_condition_simplifier_timeout}.",
+    )
+
+    parser.add_argument(
+        "--library-mapping",
+        dest="library_mappings",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="Read additional library mappings from a JSON or TOML file. "
+        "Can be passed multiple times.",
+    )
+
+    parser.add_argument(
+        "--cache-max-entries",
+        dest="cache_max_entries",
+        type=int,
+        default=None,
+        help="Maximum number of conditions in the condition simplifier cache. The least "
+        "recently used ones are removed when the cache grows beyond that. 0 means no limit. "
+        "Can also be set with the environment variable QMAKE2CMAKE_CACHE_MAX_ENTRIES. "
+        f"Default is {default_condition_simplifier_cache_max_entries}.",
+    )
+
+    parser.add_argument(
+        "--cache-stats",
+        dest="cache_stats",
+        action="store_true",
+        help="Print the size and hit rate of the condition simplifier cache.",
+    )
+
+    parser.add_argument(
+        "--cache-prune",
+        dest="cache_prune",
+        action="store_true",
+        help="Shrink the condition simplifier cache to its maximum number of entries.",
+    )
+
+    parser.add_argument(
+        "--scope-cache-stats",
+        dest="scope_cache_stats",
+        action="store_true",
+        help="Print the hit rate of the cache of evaluated variables for every converted project.",
+    )
+
+    parser.add_argument(
+        "--skip-parse-cache",
+        dest="skip_parse_cache",
+        action="store_true",
+        help="Don't use the cache of parsed .pro/.pri files (conversion speed may decrease).",
+    )
+
+    parser.add_argument(
+        "--persistent-analysis-cache",
+        dest="persistent_analysis_cache",
+        action="store_true",
+        help="Keep the analysis of the subprojects of SUBDIRS projects in the user cache "
+        "directory, so that later runs don't parse unchanged subprojects again.",
+    )
+
+    parser.add_argument(
+        "--parser",
+        dest="parser",
+        choices=parser_backends,
+        default="pyparsing",
+        help="Which .pro/.pri file parser to use. 'pyparsing' is the reference parser. "
+        "'fast' is a hand-written parser that falls back to 'pyparsing' for unsupported "
+        "constructs. 'compare' parses with both and reports any difference.",
+    )
+
     parser.add_argument(
         "--skip-subdirs-project",
         dest="skip_subdirs_project",
@@ -161,14 +315,43 @@ def _parse_commandline(command_line_args: Optional[List[str]] = None):
         "Default is to write to CMakeLists.txt in the same directory as the .pro file.",
     )
 
+    parser.add_argument(
+        "--incremental",
+        dest="incremental",
+        action="store_true",
+        help="Skip projects that didn't change since they were converted with this option. "
+        "A manifest of the files each conversion depends on is written to the .qmake2cmake "
+        "directory next to the output file.",
+    )
+
+    parser.add_argument(
+        "--write-if-changed",
+        dest="write_if_changed",
+        action="store_true",
+        help="Only replace the output file if its contents change, so that its modification "
+        "time, and the CMake configuration depending on it, stays valid otherwise. The file "
+        "is replaced atomically.",
+    )
+
     parser.add_argument(
         "files",
         metavar="<.pro/.pri file>",
         type=str,
-        nargs="+",
+        nargs="*",
         help="The .pro/.pri file to process",
     )
-    return parser.parse_args(command_line_args)
+    args = parser.parse_args(command_line_args)
+    if not args.files and not (args.cache_stats or args.cache_prune):
+        parser.error("the following arguments are required: <.pro/.pri file>")
+    cache_max_entries = os.getenv("QMAKE2CMAKE_CACHE_MAX_ENTRIES")
+    if args.cache_max_entries is None and cache_max_entries:
+        try:
+            args.cache_max_entries = int(cache_max_entries)
+        except ValueError:
+            parser.error(
+                f"invalid int value in QMAKE2CMAKE_CACHE_MAX_ENTRIES: '{cache_max_entries}'"
+            )
+    return args
 
 
 def get_top_level_repo_project_path(project_file_path: str = "") -> str:
@@ -247,21 +430,27 @@ def is_manual_test_project(project_file_path: str = "") -> bool:
 
 
 @lru_cache(maxsize=None)
-def find_file_walking_parent_dirs(file_name: str, project_file_path: str = "") -> str:
+def _find_file_walking_parent_dirs(
+    file_name: str, project_file_path: str
+) -> Tuple[str, Tuple[str, ...]]:
+    """Returns the path of the nearest file_name in the parent directories of
+    project_file_path, or "", and all the paths that were looked at."""
     assert file_name
     if not os.path.isabs(project_file_path):
         print(
             f"Warning: could not find {file_name} file, given path is not an "
             f"absolute path: {project_file_path}"
         )
-        return ""
+        return "", ()
 
     cwd = os.path.dirname(project_file_path)
+    looked_up_paths: List[str] = []
 
     while os.path.isdir(cwd):
         maybe_file = posixpath.join(cwd, file_name)
+        looked_up_paths.append(maybe_file)
         if os.path.isfile(maybe_file):
-            return maybe_file
+            return maybe_file, tuple(looked_up_paths)
         else:
             last_cwd = cwd
             cwd = os.path.dirname(cwd)
@@ -269,7 +458,11 @@ def find_file_walking_parent_dirs(file_name: str, project_file_path: str = "") -
                 # reached the top level directory, stop looking
                 break
 
-    return ""
+    return "", tuple(looked_up_paths)
+
+
+def find_file_walking_parent_dirs(file_name: str, project_file_path: str = "") -> str:
+    return _find_file_walking_parent_dirs(file_name, project_file_path)[0]
 
 
 def find_qmake_conf(project_file_path: str = "") -> str:
@@ -281,11 +474,14 @@ def find_cmake_conf(project_file_path: str = "") -> str:
 
 
 def find_qmake_or_cmake_conf(project_file_path: str = "") -> str:
-    qmake_conf = find_qmake_conf(project_file_path)
-    if qmake_conf:
-        return qmake_conf
-    cmake_conf = find_cmake_conf(project_file_path)
-    return cmake_conf
+    for file_name in [".qmake.conf", ".cmake.conf"]:
+        conf_path, looked_up_paths = _find_file_walking_parent_dirs(file_name, project_file_path)
+        # Creating a nearer conf file, or one where there was none, changes the result too.
+        for path in looked_up_paths:
+            record_input_file(path)
+        if conf_path:
+            return conf_path
+    return ""
 
 
 def parse_qt_repo_module_version_from_qmake_conf(qmake_conf_path: str = "") -> str:
@@ -370,8 +566,7 @@ cmake_api_calls = set_up_cmake_api_calls()
 
 def get_cmake_api_call(api_name: str, api_version: Optional[int] = None) -> str:
     if not api_version:
-        global cmake_api_version
-        api_version = cmake_api_version
+        api_version = get_conversion_context().cmake_api_version
     if not cmake_api_calls[api_version][api_name]:
         raise RuntimeError(f"No CMake API call {api_name} of version {api_version} found.")
 
@@ -432,12 +627,13 @@ def read_qrc_file(
     dir_name = os.path.dirname(filepath)
     base_dir = posixpath.join("" if base_dir == "." else base_dir, dir_name)
 
+    record_input_file(filepath)
     # Small not very thorough check to see if this a shared qrc resource
     # pattern is mostly used by the tests.
-    if not os.path.isfile(filepath):
+    if not os.path.isfile(resolve_path(filepath)):
         raise RuntimeError(f"Invalid file path given to process_qrc_file: {filepath}")
 
-    tree = ET.parse(filepath)
+    tree = ET.parse(resolve_path(filepath))
     root = tree.getroot()
     assert root.tag == "RCC"
 
@@ -662,7 +858,8 @@ class QmlDir:
             self.handle_line(line)
 
     def from_file(self, path: str):
-        f = open(path, "r")
+        record_input_file(path)
+        f = open(resolve_path(path), "r")
         if not f:
             raise RuntimeError(f"Failed to open qmldir file at: {path}")
         for line in f:
@@ -751,7 +948,7 @@ def handle_vpath(source: str, base_dir: str, vpath: List[str]) -> str:
     if not vpath:
         return source
 
-    if os.path.exists(os.path.join(base_dir, source)):
+    if path_exists(os.path.join(base_dir, source)):
         return source
 
     variable_pattern = re.compile(r"\$\{[A-Za-z0-9_]+\}")
@@ -763,7 +960,7 @@ def handle_vpath(source: str, base_dir: str, vpath: List[str]) -> str:
 
     for v in vpath:
         fullpath = posixpath.join(v, source)
-        if os.path.exists(fullpath):
+        if path_exists(fullpath):
             return trim_leading_dot(posixpath.relpath(fullpath, base_dir))
 
     print(f"    XXXX: Source {source}: Not found.")
@@ -771,6 +968,8 @@ def handle_vpath(source: str, base_dir: str, vpath: List[str]) -> str:
 
 
 class Operation:
+    __slots__ = ("_value", "_line_no")
+
     def __init__(self, value: Union[List[str], str], line_no: int = -1) -> None:
         if isinstance(value, list):
             self._value = value
@@ -803,6 +1002,8 @@ class Operation:
 
 
 class AddOperation(Operation):
+    __slots__ = ()
+
     def process(
         self, key: str, sinput: List[str], transformer: Callable[[List[str]], List[str]]
     ) -> List[str]:
@@ -813,6 +1014,8 @@ class AddOperation(Operation):
 
 
 class UniqueAddOperation(Operation):
+    __slots__ = ()
+
     def process(
         self, key: str, sinput: List[str], transformer: Callable[[List[str]], List[str]]
     ) -> List[str]:
@@ -827,6 +1030,8 @@ class UniqueAddOperation(Operation):
 
 
 class ReplaceOperation(Operation):
+    __slots__ = ()
+
     def process(
         self, key: str, sinput: List[str], transformer: Callable[[List[str]], List[str]]
     ) -> List[str]:
@@ -860,6 +1065,8 @@ class ReplaceOperation(Operation):
 
 
 class SetOperation(Operation):
+    __slots__ = ()
+
     def process(
         self, key: str, sinput: List[str], transformer: Callable[[List[str]], List[str]]
     ) -> List[str]:
@@ -877,6 +1084,8 @@ class SetOperation(Operation):
 
 
 class RemoveOperation(Operation):
+    __slots__ = ()
+
     def process(
         self, key: str, sinput: List[str], transformer: Callable[[List[str]], List[str]]
     ) -> List[str]:
@@ -900,36 +1109,114 @@ class RemoveOperation(Operation):
         return f"-({self._dump()})"
 
 
-# Helper class that stores a list of tuples, representing a scope id and
-# a line number within that scope's project file. The whole list
-# represents the full path location for a certain operation while
-# traversing include()'d scopes. Used for sorting when determining
+# Immutable tuple of (scope id, line number) pairs, one for each scope
+# from the evaluated scope down to the one containing a certain
+# operation, which represents the full path location of the operation
+# while traversing include()'d scopes. Used for sorting when determining
 # operation order when evaluating operations.
-class OperationLocation(object):
-    def __init__(self):
-        self.list_of_scope_ids_and_line_numbers = []
-
-    def clone_and_append(self, scope_id: int, line_number: int) -> OperationLocation:
-        new_location = OperationLocation()
-        new_location.list_of_scope_ids_and_line_numbers = list(
-            self.list_of_scope_ids_and_line_numbers
-        )
-        new_location.list_of_scope_ids_and_line_numbers.append((scope_id, line_number))
-        return new_location
+class OperationLocation(tuple):
+    __slots__ = ()
 
-    def __lt__(self, other: OperationLocation) -> Any:
-        return self.list_of_scope_ids_and_line_numbers < other.list_of_scope_ids_and_line_numbers
+    def append(self, scope_id: int, line_number: int) -> OperationLocation:
+        return OperationLocation((*self, (scope_id, line_number)))
 
     def __repr__(self) -> str:
-        s = ""
-        for t in self.list_of_scope_ids_and_line_numbers:
-            s += f"s{t[0]}:{t[1]} "
-        s = s.strip(" ")
-        return s
+        return " ".join(f"s{scope_id}:{line_number}" for scope_id, line_number in self)
+
+
+# Hits and misses of the Scope evaluation cache for the current conversion.
+scope_evaluation_cache_statistics = {"hits": 0, "misses": 0}
+
+
+def reset_scope_evaluation_cache_statistics() -> None:
+    scope_evaluation_cache_statistics["hits"] = 0
+    scope_evaluation_cache_statistics["misses"] = 0
+
+
+def print_scope_evaluation_cache_statistics(project_file: str) -> None:
+    hits = scope_evaluation_cache_statistics["hits"]
+    lookups = hits + scope_evaluation_cache_statistics["misses"]
+    hit_rate = f"{100 * hits / lookups:.1f}%" if lookups else "n/a"
+    print(f"Scope evaluation cache for {project_file}: {hits}/{lookups} hits ({hit_rate})")
+
+
+# What the evaluation of a variable depended on: the scopes whose operations
+# it read, with their generation at that time, and the (scope, key) pairs
+# it marked as visited, so that a cache hit can mark them again.
+class EvaluationRecord(object):
+    __slots__ = ("dependencies", "visits")
+
+    def __init__(
+        self,
+        dependencies: Tuple[Tuple[Scope, int], ...],
+        visits: Tuple[Tuple[Scope, str], ...],
+    ) -> None:
+        self.dependencies = dependencies
+        self.visits = visits
+
+    def is_current(self) -> bool:
+        return all(
+            scope._operations_generation == generation for scope, generation in self.dependencies
+        )
+
+
+# Collects the EvaluationRecord of an evaluation in progress.
+class EvaluationRecorder(object):
+    __slots__ = ("dependencies", "visits")
+
+    def __init__(self) -> None:
+        self.dependencies: Dict[Scope, int] = {}
+        self.visits: Set[Tuple[Scope, str]] = set()
+
+    def update(self, record: EvaluationRecord) -> None:
+        for scope, generation in record.dependencies:
+            self.dependencies.setdefault(scope, generation)
+        self.visits.update(record.visits)
+
+    def finish(self) -> EvaluationRecord:
+        return EvaluationRecord(tuple(self.dependencies.items()), tuple(self.visits))
+
+
+# Operations in the order they are processed, with the scope each one
+# belongs to.
+IndexedOperations = List[Tuple[Operation, "Scope"]]
+
+
+# Operations that every scope starts with. The dict and the operations are
+# shared by all scopes and must not be modified; _append_operation copies
+# the dict, and replaces the tuple of a key with a list of its own, the
+# first time a scope changes them.
+_default_operations: Dict[str, Sequence[Operation]] = {
+    "QT_SOURCE_TREE": (SetOperation(["${QT_SOURCE_TREE}"]),),
+    "QT_BUILD_TREE": (SetOperation(["${PROJECT_BINARY_DIR}"]),),
+    "QTRO_SOURCE_TREE": (SetOperation(["${CMAKE_SOURCE_DIR}"]),),
+}
+_default_qt_operations: Sequence[Operation] = (SetOperation(["core", "gui"]),)
 
 
 class Scope(object):
-    SCOPE_ID: int = 1
+    __slots__ = (
+        "_operations",
+        "_parent",
+        "_basedir",
+        "_currentdir",
+        "_scope_id",
+        "_file",
+        "_file_absolute_path",
+        "_condition",
+        "_children",
+        "_included_children",
+        "_including_scope",
+        "_visited_keys",
+        "_operations_generation",
+        "_evaluation_cache",
+        "_operation_index",
+        "_total_condition",
+        "_parent_include_line_no",
+        "_is_public_module",
+        "_has_private_module",
+        "_is_internal_qt_app",
+    )
 
     def __init__(
         self,
@@ -941,14 +1228,11 @@ class Scope(object):
         operations: Union[Dict[str, List[Operation]], None] = None,
         parent_include_line_no: int = -1,
     ) -> None:
-        if not operations:
-            operations = {
-                "QT_SOURCE_TREE": [SetOperation(["${QT_SOURCE_TREE}"])],
-                "QT_BUILD_TREE": [SetOperation(["${PROJECT_BINARY_DIR}"])],
-                "QTRO_SOURCE_TREE": [SetOperation(["${CMAKE_SOURCE_DIR}"])],
-            }
-
-        self._operations: Dict[str, List[Operation]] = copy.deepcopy(operations)
+        self._operations: Dict[str, Sequence[Operation]]
+        if operations:
+            self._operations = copy.deepcopy(operations)  # type: ignore
+        else:
+            self._operations = _default_operations
         if parent_scope:
             parent_scope._add_child(self)
         else:
@@ -956,7 +1240,7 @@ class Scope(object):
             # Only add the  "QT = core gui" Set operation once, on the
             # very top-level .pro scope, aka it's basedir is empty.
             if not base_dir:
-                self._operations["QT"] = [SetOperation(["core", "gui"])]
+                self._operations = {**self._operations, "QT": _default_qt_operations}
 
         self._basedir = base_dir
         if qmake_file:
@@ -964,15 +1248,24 @@ class Scope(object):
         if not self._basedir:
             self._basedir = self._currentdir
 
-        self._scope_id = Scope.SCOPE_ID
-        Scope.SCOPE_ID += 1
+        context = get_conversion_context()
+        self._scope_id = context.next_scope_id
+        context.next_scope_id += 1
         self._file = qmake_file
-        self._file_absolute_path = os.path.abspath(qmake_file)
+        self._file_absolute_path = absolute_path(qmake_file)
         self._condition = map_condition(condition)
         self._children = []  # type: List[Scope]
         self._included_children = []  # type: List[Scope]
         self._including_scope = None  # type: Optional[Scope]
         self._visited_keys = set()  # type: Set[str]
+        # Incremented whenever the operations or includes of this scope
+        # change, which makes cached evaluations that read them stale.
+        self._operations_generation = 0
+        # Maps (key, transformer kind, inherit) to the result and record
+        # of an evaluation.
+        self._evaluation_cache: Dict[Tuple[str, Any, bool], Tuple[List[str], EvaluationRecord]] = {}
+        # Maps keys to the operations of this scope and its included scopes.
+        self._operation_index: Dict[str, Tuple[IndexedOperations, EvaluationRecord]] = {}
         self._total_condition = None  # type: Optional[str]
         self._parent_include_line_no = parent_include_line_no
         self._is_public_module = False
@@ -992,6 +1285,11 @@ class Scope(object):
         assert self != other
         other._including_scope = self
         self._included_children.append(other)
+        self.operations_changed()
+
+    def operations_changed(self) -> None:
+        """Must be called after modifying operations outside of Scope."""
+        self._operations_generation += 1
 
     @property
     def scope_debug(self) -> bool:
@@ -1074,6 +1372,7 @@ class Scope(object):
             base_dir=base_dir,
             parent_include_line_no=parent_include_line_no,
         )
+        line_index = LineOffsetIndex(project_file_content)
         for statement in statements:
             if isinstance(statement, list):  # Handle skipped parts...
                 assert not statement
@@ -1087,7 +1386,7 @@ class Scope(object):
 
                 op_location_start = operation["locn_start"]
                 operation = operation["value"]
-                op_line_no = pp.lineno(op_location_start, project_file_content)
+                op_line_no = line_index.lineno(op_location_start)
 
                 if operation == "=":
                     scope._append_operation(key, SetOperation(value, line_no=op_line_no))
@@ -1128,7 +1427,7 @@ class Scope(object):
             if included:
                 included_location_start = included["locn_start"]
                 included = included["value"]
-                included_line_no = pp.lineno(included_location_start, project_file_content)
+                included_line_no = line_index.lineno(included_location_start)
                 scope._append_operation(
                     "_INCLUDED", UniqueAddOperation(included, line_no=included_line_no)
                 )
@@ -1154,10 +1453,16 @@ class Scope(object):
         return scope
 
     def _append_operation(self, key: str, op: Operation) -> None:
-        if key in self._operations:
-            self._operations[key].append(op)
+        if self._operations is _default_operations:
+            self._operations = dict(_default_operations)
+        operations = self._operations.get(key)
+        if operations is None:
+            self._operations[sys.intern(key)] = [op]
+        elif isinstance(operations, list):
+            operations.append(op)
         else:
-            self._operations[key] = [op]
+            self._operations[key] = [*operations, op]
+        self.operations_changed()
 
     @property
     def file(self) -> str:
@@ -1211,7 +1516,7 @@ class Scope(object):
             print(f"{ind}    -- NONE --")
         else:
             for k in sorted(keys):
-                print(f'{ind}    {k} = "{self._operations.get(k, [])}"')
+                print(f'{ind}    {k} = "{list(self._operations.get(k, []))}"')
         print(f"{ind}  Children:")
         if not self._children:
             print(f"{ind}    -- NONE --")
@@ -1240,33 +1545,91 @@ class Scope(object):
     def visited_keys(self):
         return self._visited_keys
 
+    def _visit_key(self, key: str) -> None:
+        self._visited_keys.add(key)
+        for recorder in get_conversion_context().evaluation_recorders:
+            recorder.visits.add((self, key))
+
+    def _read_operations(self) -> None:
+        for recorder in get_conversion_context().evaluation_recorders:
+            recorder.dependencies.setdefault(self, self._operations_generation)
+
+    # Returns the result of evaluate(), which must only depend on the
+    # operations of the scopes, from the cache if possible.
+    def _evaluate_cached(
+        self, cache_key: Tuple[str, Any, bool], evaluate: Callable[[], List[str]]
+    ) -> List[str]:
+        entry = self._evaluation_cache.get(cache_key)
+        if entry is not None and entry[1].is_current():
+            scope_evaluation_cache_statistics["hits"] += 1
+            result, record = entry
+            for scope, key in record.visits:
+                scope._visited_keys.add(key)
+            for recorder in get_conversion_context().evaluation_recorders:
+                recorder.update(record)
+            return list(result)
+
+        scope_evaluation_cache_statistics["misses"] += 1
+        recorders = get_conversion_context().evaluation_recorders
+        recorder = EvaluationRecorder()
+        recorders.append(recorder)
+        try:
+            result = evaluate()
+        finally:
+            recorders.pop()
+        record = recorder.finish()
+        if record.is_current():
+            self._evaluation_cache[cache_key] = (list(result), record)
+        return result
+
     # Traverses a scope and its children, and collects operations
     # that need to be processed for a certain key.
     def _gather_operations_from_scope(
         self,
-        operations_result: List[Dict[str, Any]],
+        operations_result: List[Tuple[OperationLocation, Operation, Scope]],
         current_scope: Scope,
         op_key: str,
         current_location: OperationLocation,
     ):
+        current_scope._read_operations()
         for op in current_scope._operations.get(op_key, []):
-            new_op_location = current_location.clone_and_append(
-                current_scope._scope_id, op._line_no
-            )
-            op_info: Dict[str, Any] = {}
-            op_info["op"] = op
-            op_info["scope"] = current_scope
-            op_info["location"] = new_op_location
-            operations_result.append(op_info)
+            new_op_location = current_location.append(current_scope._scope_id, op._line_no)
+            operations_result.append((new_op_location, op, current_scope))
 
         for included_child in current_scope._included_children:
-            new_scope_location = current_location.clone_and_append(
+            new_scope_location = current_location.append(
                 current_scope._scope_id, included_child._parent_include_line_no
             )
             self._gather_operations_from_scope(
                 operations_result, included_child, op_key, new_scope_location
             )
 
+    # Returns the operations for a certain key in the order they need to be
+    # processed, from the index as long as none of the included scopes
+    # changed.
+    def _get_indexed_operations(self, key: str) -> IndexedOperations:
+        entry = self._operation_index.get(key)
+        if entry is not None and entry[1].is_current():
+            for recorder in get_conversion_context().evaluation_recorders:
+                recorder.update(entry[1])
+            return entry[0]
+
+        operations: List[Tuple[OperationLocation, Operation, Scope]] = []
+        recorders = get_conversion_context().evaluation_recorders
+        recorder = EvaluationRecorder()
+        recorders.append(recorder)
+        try:
+            self._gather_operations_from_scope(operations, self, key, OperationLocation())
+        finally:
+            recorders.pop()
+
+        # Sorts the operations based on the location of each operation.
+        # Technically compares two tuples of tuples.
+        operations.sort(key=lambda o: o[0])
+        indexed_operations = [(op, scope) for _, op, scope in operations]
+        self._operation_index[key] = (indexed_operations, recorder.finish())
+        return indexed_operations
+
     # Partially applies a scope argument to a given transformer.
     @staticmethod
     def _create_transformer_for_operation(
@@ -1293,7 +1656,7 @@ class Scope(object):
         *,
         inherit: bool = False,
     ) -> List[str]:
-        self._visited_keys.add(key)
+        self._visit_key(key)
 
         # Inherit values from parent scope.
         # This is a strange edge case which is wrong in principle, because
@@ -1303,21 +1666,14 @@ class Scope(object):
         if self._parent and inherit:
             result = self._parent._evalOps(key, transformer, result)
 
-        operations_to_run: List[Dict[str, Any]] = []
-        starting_location = OperationLocation()
-        starting_scope = self
-        self._gather_operations_from_scope(
-            operations_to_run, starting_scope, key, starting_location
-        )
-
-        # Sorts the operations based on the location of each operation. Technically compares two
-        # lists of tuples.
-        operations_to_run = sorted(operations_to_run, key=lambda o: o["location"])
-
         # Process the operations.
-        for op_info in operations_to_run:
-            op_transformer = self._create_transformer_for_operation(transformer, op_info["scope"])
-            result = op_info["op"].process(key, result, op_transformer)
+        op_transformers: Dict[Scope, Callable[[List[str]], List[str]]] = {}
+        for op, op_scope in self._get_indexed_operations(key):
+            op_transformer = op_transformers.get(op_scope)
+            if op_transformer is None:
+                op_transformer = self._create_transformer_for_operation(transformer, op_scope)
+                op_transformers[op_scope] = op_transformer
+            result = op.process(key, result, op_transformer)
         return result
 
     def get(self, key: str, *, ignore_includes: bool = False, inherit: bool = False) -> List[str]:
@@ -1326,9 +1682,10 @@ class Scope(object):
             relative_path = posixpath.relpath(self.currentdir, self.basedir)
 
         if key == "QQC2_SOURCE_TREE":
-            qmake_or_cmake_conf_path = find_qmake_or_cmake_conf(os.path.abspath(self.currentdir))
+            current_dir_path = absolute_path(self.currentdir)
+            qmake_or_cmake_conf_path = find_qmake_or_cmake_conf(current_dir_path)
             qmake_or_cmake_conf_dir_path = os.path.dirname(qmake_or_cmake_conf_path)
-            project_relative_path = os.path.relpath(qmake_or_cmake_conf_dir_path, self.currentdir)
+            project_relative_path = os.path.relpath(qmake_or_cmake_conf_dir_path, current_dir_path)
             return ["${CMAKE_CURRENT_SOURCE_DIR}/" + project_relative_path]
 
         if key == "QT_ARCH":
@@ -1354,13 +1711,18 @@ class Scope(object):
         # broken.
         # Looking at you qmltyperegistrar.pro.
         eval_ops_transformer = None
+        transformer_kind = None
         if key.endswith("SOURCES") or key.endswith("HEADERS"):
 
             def file_transformer(scope, files):
                 return scope._map_files(files)
 
             eval_ops_transformer = file_transformer
-        return self._evalOps(key, eval_ops_transformer, [], inherit=inherit)
+            transformer_kind = "files"
+        return self._evaluate_cached(
+            (key, transformer_kind, inherit),
+            lambda: self._evalOps(key, eval_ops_transformer, [], inherit=inherit),
+        )
 
     def get_string(self, key: str, default: str = "", inherit: bool = False) -> str:
         v = self.get(key, inherit=inherit)
@@ -1382,13 +1744,9 @@ class Scope(object):
             map(lambda f: map_to_file(f, self, is_include=is_include), expanded_files)
         )
 
-        if use_vpath:
-            result = list(
-                map(
-                    lambda f: handle_vpath(f, self.basedir, self.get("VPATH", inherit=True)),
-                    mapped_files,
-                )
-            )
+        if use_vpath and mapped_files:
+            vpath = self.get("VPATH", inherit=True)
+            result = [handle_vpath(f, self.basedir, vpath) for f in mapped_files]
         else:
             result = mapped_files
 
@@ -1408,7 +1766,10 @@ class Scope(object):
         def transformer(scope, files):
             return scope._map_files(files, use_vpath=use_vpath, is_include=is_include)
 
-        return list(self._evalOps(key, transformer, []))
+        return self._evaluate_cached(
+            (key, ("files", use_vpath, is_include), False),
+            lambda: list(self._evalOps(key, transformer, [])),
+        )
 
     @staticmethod
     def _replace_env_var_value(value: Any) -> Any:
@@ -1522,130 +1883,179 @@ def unwrap_if(input_string):
     return output_string
 
 
-def map_condition(condition: str) -> str:
-    # Some hardcoded cases that are too bothersome to generalize.
-    condition = re.sub(
-        r"qtConfig\(opengles\.\)",
+# Conditions made of these characters only, and without any of the
+# constructs matched by _condition_rewrite_trigger_re, are not changed by
+# _rewrite_condition except for the "!" and "|" operators.
+_plain_condition_re = re.compile(r"[\w\s!|()-]*")
+_condition_rewrite_trigger_re = re.compile(
+    # Function calls, except for the qtConfig() and qtHaveModule() calls
+    # that are mapped token by token, and if().
+    r"\b(?!(?:qtConfig|qtHaveModule)\()\w+\s*\("
+    r"|^no-png$|x86|arm64-v8a|armeabi-v7a|___contains___"
+)
+
+_hardcoded_condition_replacements = [
+    (
+        re.compile(r"qtConfig\(opengles\.\)"),
         r"(QT_FEATURE_opengles2 OR QT_FEATURE_opengles3 OR QT_FEATURE_opengles31 OR QT_FEATURE_opengles32)",
-        condition,
-    )
-    condition = re.sub(
-        r"qtConfig\(opengl\(es1\|es2\)\?\)",
+    ),
+    (
+        re.compile(r"qtConfig\(opengl\(es1\|es2\)\?\)"),
         r"(QT_FEATURE_opengl OR QT_FEATURE_opengles2 OR QT_FEATURE_opengles3)",
-        condition,
-    )
-    condition = re.sub(r"qtConfig\(opengl\.\*\)", r"QT_FEATURE_opengl", condition)
-    condition = re.sub(r"^win\*$", r"win", condition)
-    condition = re.sub(r"^no-png$", r"NOT QT_FEATURE_png", condition)
-    condition = re.sub(r"contains\(CONFIG, static\)", r"NOT QT_BUILD_SHARED_LIBS", condition)
-    condition = re.sub(r"contains\(QT_CONFIG,\w*shared\)", r"QT_BUILD_SHARED_LIBS", condition)
-    condition = re.sub(r"CONFIG\(osx\)", r"MACOS", condition)
-
-    def gcc_version_handler(match_obj: Match):
-        operator = match_obj.group(1)
-        version_type = match_obj.group(2)
-        if operator == "equals":
-            operator = "STREQUAL"
-        elif operator == "greaterThan":
-            operator = "STRGREATER"
-        elif operator == "lessThan":
-            operator = "STRLESS"
-
-        version = match_obj.group(3)
-        return f"(QT_COMPILER_VERSION_{version_type} {operator} {version})"
-
-    # TODO: Possibly fix for other compilers.
-    pattern = r"(equals|greaterThan|lessThan)\(QT_GCC_([A-Z]+)_VERSION,[ ]*([0-9]+)\)"
-    condition = re.sub(pattern, gcc_version_handler, condition)
-
-    def windows_sdk_version_handler(match_obj: Match):
-        operator = match_obj.group(1)
-        if operator == "equals":
-            operator = "STREQUAL"
-        elif operator == "greaterThan":
-            operator = "STRGREATER"
-        elif operator == "lessThan":
-            operator = "STRLESS"
-
-        version = match_obj.group(2)
-        return f"(QT_WINDOWS_SDK_VERSION {operator} {version})"
-
-    pattern = r"(equals|greaterThan|lessThan)\(WINDOWS_SDK_VERSION,[ ]*([0-9]+)\)"
-    condition = re.sub(pattern, windows_sdk_version_handler, condition)
-
-    def qt_version_handler(match_obj: Match):
-        operator = match_obj.group(1)
-        if operator == "equals":
-            operator = "EQUAL"
-        elif operator == "greaterThan":
-            operator = "GREATER"
-        elif operator == "lessThan":
-            operator = "LESS"
-
-        operator_prefix = "VERSION_"
-        version_variable = "QT_VERSION"
-        version_flavor = match_obj.group(2)
-        if version_flavor:
-            version_variable += "_" + version_flavor[:-1]
-            operator_prefix = ""
-
-        version = match_obj.group(3)
-        return f"({version_variable} {operator_prefix}{operator} {version})"
-
-    pattern = r"(equals|greaterThan|lessThan)\(QT_(MAJOR_|MINOR_|PATCH_)?VERSION,[ ]*([0-9.]+)\)"
-    condition = re.sub(pattern, qt_version_handler, condition)
-
-    # Generic lessThan|equals|lessThan()
-
-    def generic_version_handler(match_obj: Match):
-        operator = match_obj.group(1)
-        if operator == "equals":
-            operator = "EQUAL"
-        elif operator == "greaterThan":
-            operator = "GREATER"
-        elif operator == "lessThan":
-            operator = "LESS"
-
-        variable = match_obj.group(2)
-        version = match_obj.group(3)
-        return f"({variable} {operator} {version})"
-
-    pattern = r"(equals|greaterThan|lessThan)\(([^,]+?),[ ]*([0-9]+)\)"
-    condition = re.sub(pattern, generic_version_handler, condition)
+    ),
+    (re.compile(r"qtConfig\(opengl\.\*\)"), r"QT_FEATURE_opengl"),
+    (re.compile(r"^win\*$"), r"win"),
+    (re.compile(r"^no-png$"), r"NOT QT_FEATURE_png"),
+    (re.compile(r"contains\(CONFIG, static\)"), r"NOT QT_BUILD_SHARED_LIBS"),
+    (re.compile(r"contains\(QT_CONFIG,\w*shared\)"), r"QT_BUILD_SHARED_LIBS"),
+    (re.compile(r"CONFIG\(osx\)"), r"MACOS"),
+]
+
+# TODO: Possibly fix for other compilers.
+_gcc_version_re = re.compile(
+    r"(equals|greaterThan|lessThan)\(QT_GCC_([A-Z]+)_VERSION,[ ]*([0-9]+)\)"
+)
+_windows_sdk_version_re = re.compile(
+    r"(equals|greaterThan|lessThan)\(WINDOWS_SDK_VERSION,[ ]*([0-9]+)\)"
+)
+_qt_version_re = re.compile(
+    r"(equals|greaterThan|lessThan)\(QT_(MAJOR_|MINOR_|PATCH_)?VERSION,[ ]*([0-9.]+)\)"
+)
+_generic_version_re = re.compile(r"(equals|greaterThan|lessThan)\(([^,]+?),[ ]*([0-9]+)\)")
+
+_function_condition_replacements = [
+    (re.compile(r"\bisEmpty\s*\((.*?)\)"), r"\1_ISEMPTY"),
+    (
+        re.compile(r"\bcontains\s*\(\s*(?:QT_)?CONFIG\s*,\s*c\+\+(\d+)\)"),
+        r"cxx_std_\1 IN_LIST CMAKE_CXX_COMPILE_FEATURES",
+    ),
+    (re.compile(r'\bcontains\s*\((.*?),\s*"?(.*?)"?\)'), r"\1___contains___\2"),
+    (re.compile(r'\bequals\s*\((.*?),\s*"?(.*?)"?\)'), r"\1___equals___\2"),
+    (re.compile(r'\bisEqual\s*\((.*?),\s*"?(.*?)"?\)'), r"\1___equals___\2"),
+    (re.compile(r"\s*==\s*"), "___STREQUAL___"),
+    (re.compile(r"\bexists\s*\((.*?)\)"), r"EXISTS \1"),
+]
+
+# checking mkspec, predating gcc scope in qmake, will then be replaced by platform_mapping in helper.py
+_mkspec_condition_replacements = [
+    ("*-g++*", "GCC"),
+    ("*g++*", "GCC"),
+    ("aix-g++*", "AIX"),
+    ("*-icc*", "ICC"),
+    ("*-clang*", "CLANG"),
+    ("*-llvm", "CLANG"),
+    ("win32-*", "WIN32"),
+]
+
+_build_type_re = re.compile(r"CONFIG\((debug|release),debug\|release\)")
+
+_late_condition_replacements = [
+    # new conditions added by the android multi arch qmake build
+    (re.compile(r"(^| )x86((?=[^\w])|$)"), "TEST_architecture_arch STREQUAL i386"),
+    (re.compile(r"(^| )x86_64"), " TEST_architecture_arch STREQUAL x86_64"),
+    (re.compile(r"(^| )arm64-v8a"), "TEST_architecture_arch STREQUAL arm64"),
+    (re.compile(r"(^| )armeabi-v7a"), "TEST_architecture_arch STREQUAL arm"),
+    # some defines replacements
+    (re.compile(r"DEFINES___contains___QT_NO_CURSOR"), r"(NOT QT_FEATURE_cursor)"),
+    (re.compile(r"DEFINES___contains___QT_NO_TRANSLATION"), r"(NOT QT_FEATURE_translation)"),
+    (re.compile(r"styles___contains___fusion"), r"QT_FEATURE_style_fusion"),
+    (re.compile(r"CONFIG___contains___largefile"), r"QT_FEATURE_largefile"),
+]
+
+_condition_feature_re = re.compile(r"(qtConfig|qtHaveModule)\(([a-zA-Z0-9_-]+)\)")
+
+# Features with a known 3rd party library that are nevertheless mapped to
+# QT_FEATURE_system_foo.
+_system_feature_prefixes = (
+    "system_jpeg",
+    "system_zlib",
+    "system_tiff",
+    "system_assimp",
+    "system_doubleconversion",
+    "system_sqlite",
+    "system_hunspell",
+    "system_libb2",
+    "system_webp",
+)
+
+
+def _version_operator(operator: str, operators: Tuple[str, str, str]) -> str:
+    if operator == "equals":
+        return operators[0]
+    elif operator == "greaterThan":
+        return operators[1]
+    elif operator == "lessThan":
+        return operators[2]
+    return operator
+
+
+_string_operators = ("STREQUAL", "STRGREATER", "STRLESS")
+_number_operators = ("EQUAL", "GREATER", "LESS")
+
+
+def _gcc_version_handler(match_obj: Match):
+    operator = _version_operator(match_obj.group(1), _string_operators)
+    version_type = match_obj.group(2)
+    version = match_obj.group(3)
+    return f"(QT_COMPILER_VERSION_{version_type} {operator} {version})"
+
+
+def _windows_sdk_version_handler(match_obj: Match):
+    operator = _version_operator(match_obj.group(1), _string_operators)
+    version = match_obj.group(2)
+    return f"(QT_WINDOWS_SDK_VERSION {operator} {version})"
+
+
+def _qt_version_handler(match_obj: Match):
+    operator = _version_operator(match_obj.group(1), _number_operators)
+    operator_prefix = "VERSION_"
+    version_variable = "QT_VERSION"
+    version_flavor = match_obj.group(2)
+    if version_flavor:
+        version_variable += "_" + version_flavor[:-1]
+        operator_prefix = ""
+
+    version = match_obj.group(3)
+    return f"({version_variable} {operator_prefix}{operator} {version})"
+
+
+# Generic lessThan|equals|lessThan()
+def _generic_version_handler(match_obj: Match):
+    operator = _version_operator(match_obj.group(1), _number_operators)
+    variable = match_obj.group(2)
+    version = match_obj.group(3)
+    return f"({variable} {operator} {version})"
+
+
+def _rewrite_condition(condition: str) -> str:
+    """Rewrites the qmake functions, mkspecs and operators in condition
+    into tokens that map_condition maps one by one."""
+    # Some hardcoded cases that are too bothersome to generalize.
+    for pattern, replacement in _hardcoded_condition_replacements:
+        condition = pattern.sub(replacement, condition)
+
+    condition = _gcc_version_re.sub(_gcc_version_handler, condition)
+    condition = _windows_sdk_version_re.sub(_windows_sdk_version_handler, condition)
+    condition = _qt_version_re.sub(_qt_version_handler, condition)
+    condition = _generic_version_re.sub(_generic_version_handler, condition)
 
     # Handle if(...) conditions.
     condition = unwrap_if(condition)
 
-    condition = re.sub(r"\bisEmpty\s*\((.*?)\)", r"\1_ISEMPTY", condition)
-    condition = re.sub(
-        r"\bcontains\s*\(\s*(?:QT_)?CONFIG\s*,\s*c\+\+(\d+)\)",
-        r"cxx_std_\1 IN_LIST CMAKE_CXX_COMPILE_FEATURES",
-        condition,
-    )
-    condition = re.sub(r'\bcontains\s*\((.*?),\s*"?(.*?)"?\)', r"\1___contains___\2", condition)
-    condition = re.sub(r'\bequals\s*\((.*?),\s*"?(.*?)"?\)', r"\1___equals___\2", condition)
-    condition = re.sub(r'\bisEqual\s*\((.*?),\s*"?(.*?)"?\)', r"\1___equals___\2", condition)
-    condition = re.sub(r"\s*==\s*", "___STREQUAL___", condition)
-    condition = re.sub(r"\bexists\s*\((.*?)\)", r"EXISTS \1", condition)
-
-    # checking mkspec, predating gcc scope in qmake, will then be replaced by platform_mapping in helper.py
-    condition = condition.replace("*-g++*", "GCC")
-    condition = condition.replace("*g++*", "GCC")
-    condition = condition.replace("aix-g++*", "AIX")
-    condition = condition.replace("*-icc*", "ICC")
-    condition = condition.replace("*-clang*", "CLANG")
-    condition = condition.replace("*-llvm", "CLANG")
-    condition = condition.replace("win32-*", "WIN32")
-
-    pattern = r"CONFIG\((debug|release),debug\|release\)"
-    match_result = re.match(pattern, condition)
+    for pattern, replacement in _function_condition_replacements:
+        condition = pattern.sub(replacement, condition)
+
+    for mkspec, replacement in _mkspec_condition_replacements:
+        condition = condition.replace(mkspec, replacement)
+
+    match_result = _build_type_re.match(condition)
     if match_result:
         build_type = match_result.group(1)
         if build_type == "debug":
             build_type = "Debug"
         elif build_type == "release":
             build_type = "Release"
-        condition = re.sub(pattern, f"(CMAKE_BUILD_TYPE STREQUAL {build_type})", condition)
+        condition = _build_type_re.sub(f"(CMAKE_BUILD_TYPE STREQUAL {build_type})", condition)
 
     condition = condition.replace("*", "_x_")
     condition = condition.replace(".$$", "__ss_")
@@ -1655,56 +2065,59 @@ def map_condition(condition: str) -> str:
     condition = condition.replace("&&", " AND ")
     condition = condition.replace("|", " OR ")
 
-    # new conditions added by the android multi arch qmake build
-    condition = re.sub(r"(^| )x86((?=[^\w])|$)", "TEST_architecture_arch STREQUAL i386", condition)
-    condition = re.sub(r"(^| )x86_64", " TEST_architecture_arch STREQUAL x86_64", condition)
-    condition = re.sub(r"(^| )arm64-v8a", "TEST_architecture_arch STREQUAL arm64", condition)
-    condition = re.sub(r"(^| )armeabi-v7a", "TEST_architecture_arch STREQUAL arm", condition)
+    for pattern, replacement in _late_condition_replacements:
+        condition = pattern.sub(replacement, condition)
+    return condition
 
-    # some defines replacements
-    condition = re.sub(r"DEFINES___contains___QT_NO_CURSOR", r"(NOT QT_FEATURE_cursor)", condition)
-    condition = re.sub(
-        r"DEFINES___contains___QT_NO_TRANSLATION", r"(NOT QT_FEATURE_translation)", condition
-    )
-    condition = re.sub(r"styles___contains___fusion", r"QT_FEATURE_style_fusion", condition)
-    condition = re.sub(r"CONFIG___contains___largefile", r"QT_FEATURE_largefile", condition)
+
+def _map_condition_part(part: str) -> str:
+    # some features contain e.g. linux, that should not be
+    # turned upper case
+    feature = _condition_feature_re.match(part)
+    if feature:
+        if feature.group(1) == "qtHaveModule":
+            part = f"TARGET {map_qt_library(feature.group(2))}"
+        else:
+            feature_name = featureName(feature.group(2))
+            if (
+                feature_name.startswith("system_")
+                and is_known_3rd_party_library(feature_name[7:])
+                and not feature_name.startswith(_system_feature_prefixes)
+            ):
+                part = "ON"
+            else:
+                part = "QT_FEATURE_" + feature_name
+    else:
+        part = map_platform(part)
+
+    part = part.replace("true", "ON")
+    part = part.replace("false", "OFF")
+    return part
+
+
+def map_condition(condition: str) -> str:
+    return _map_condition(condition, get_library_mappings_generation())
+
+
+# The generation of the library mappings is part of the key, because
+# qtConfig(system-foo) and qtHaveModule(foo) are mapped with them.
+@lru_cache(maxsize=4096)
+def _map_condition(condition: str, library_mappings_generation: int) -> str:
+    # Most conditions are plain platform or feature checks, for which the
+    # whole cascade of rewrites in _rewrite_condition can be skipped.
+    if _plain_condition_re.fullmatch(condition) and not _condition_rewrite_trigger_re.search(
+        condition
+    ):
+        condition = condition.replace("!", "NOT ")
+        condition = condition.replace("|", " OR ")
+    else:
+        condition = _rewrite_condition(condition)
 
     condition = condition.replace("cross_compile", "CMAKE_CROSSCOMPILING")
 
     cmake_condition = ""
     for part in condition.split():
-        # some features contain e.g. linux, that should not be
-        # turned upper case
-        feature = re.match(r"(qtConfig|qtHaveModule)\(([a-zA-Z0-9_-]+)\)", part)
-        if feature:
-            if feature.group(1) == "qtHaveModule":
-                part = f"TARGET {map_qt_library(feature.group(2))}"
-            else:
-                feature_name = featureName(feature.group(2))
-                if (
-                    feature_name.startswith("system_")
-                    and is_known_3rd_party_library(feature_name[7:])
-                    and not feature_name.startswith("system_jpeg")
-                    and not feature_name.startswith("system_zlib")
-                    and not feature_name.startswith("system_tiff")
-                    and not feature_name.startswith("system_assimp")
-                    and not feature_name.startswith("system_doubleconversion")
-                    and not feature_name.startswith("system_sqlite")
-                    and not feature_name.startswith("system_hunspell")
-                    and not feature_name.startswith("system_libb2")
-                    and not feature_name.startswith("system_webp")
-                ):
-                    part = "ON"
-                elif feature == "dlopen":
-                    part = "ON"
-                else:
-                    part = "QT_FEATURE_" + feature_name
-        else:
-            part = map_platform(part)
-
-        part = part.replace("true", "ON")
-        part = part.replace("false", "OFF")
-        cmake_condition += " " + part
+        cmake_condition += " " + _map_condition_part(part)
     return cmake_condition.strip()
 
 
@@ -1717,11 +2130,32 @@ _path_replacements = {
 }
 
 
+# The directories of the subprojects of SUBDIRS projects, by absolute path, mapped to the
+# absolute path of the SUBDIRS project file. When None, the relationships are kept in marker
+# files instead, so that later qmake2cmake processes find them.
+subdir_markers: Optional[Dict[str, str]] = None
+
+
+def set_subdir_markers(markers: Optional[Dict[str, str]]) -> None:
+    """Keep the subdir markers in the given dictionary instead of marker files."""
+    global subdir_markers
+    subdir_markers = markers
+
+
+def subdir_marker_key(path: str) -> str:
+    """Return the key of the subdir marker for the given path in subdir_markers.
+    Path can be a file or directory.
+    """
+    if path_isfile(path):
+        path = os.path.dirname(path)
+    return absolute_path(path)
+
+
 def subdir_marker_path(path):
     """Return the file path of the subdir marker file for the given path.
     Path can be a file or directory.
     """
-    if os.path.isfile(path):
+    if path_isfile(path):
         path = os.path.dirname(path)
     if path and not path.endswith("/"):
         path += "/"
@@ -1730,18 +2164,32 @@ def subdir_marker_path(path):
 
 def write_subdir_marker(path, content):
     """Write the subdir marker file for the given path (file or directory)."""
+    if subdir_markers is not None:
+        subdir_markers[subdir_marker_key(path)] = content
+        return
     file_path = subdir_marker_path(path)
     basedir = os.path.dirname(file_path)
-    if not os.path.exists(basedir):
-        os.makedirs(basedir)
-    f = open(file_path, "w")
+    # os.makedirs can create several levels. The cached listings of all parents up to the
+    # first existing one are stale afterwards.
+    created_dirs = []
+    missing_dir = basedir
+    while missing_dir and not os.path.exists(resolve_path(missing_dir)):
+        created_dirs.append(missing_dir)
+        missing_dir = os.path.dirname(missing_dir)
+    os.makedirs(resolve_path(basedir), exist_ok=True)
+    for created_dir in created_dirs:
+        invalidate_directory(os.path.dirname(created_dir) or ".")
+    f = open(resolve_path(file_path), "w")
     f.write(content + "\n")
     f.close()
+    invalidate_directory(basedir)
 
 
 def is_marked_as_subdir(path) -> bool:
     """Return True if the path (file or directory) has a subdir marker file."""
-    return os.path.isfile(subdir_marker_path(path))
+    if subdir_markers is not None:
+        return subdir_marker_key(path) in subdir_markers
+    return path_isfile(subdir_marker_path(path))
 
 
 def replace_path_constants(path: str, scope: Scope) -> str:
@@ -1756,6 +2204,62 @@ def replace_path_constants(path: str, scope: Scope) -> str:
     return path
 
 
+# Return the subdir with SUBDIRS modifiers applied.
+def apply_subdirs_modifiers(scope: Scope, sd: str):
+    sd_file = scope.get_string(sd + ".file")
+    sd_subdir = scope.get_string(sd + ".subdir")
+    if sd_file:
+        sd = sd_file
+    elif sd_subdir:
+        sd = sd_subdir
+    return sd
+
+
+def analyze_subproject(project_file_path: str) -> ProjectAnalysis:
+    """Parse the project, and retrieve the information needed for the top-level find_package
+    calls and its SUBDIRS. This does not actually convert the file.
+
+    The analysis is reused while the project file and its included files are unchanged."""
+    project_file_absolute_path = absolute_path(project_file_path)
+    analysis = lookup_project_analysis(project_file_absolute_path)
+    if analysis is not None:
+        print(f'Reusing analysis of "{project_file_path}".', flush=True)
+        return analysis
+
+    print(f'Analyzing "{project_file_path}"...', flush=True)
+    file_contents = ""
+    with open(resolve_path(project_file_path), "r") as file_fd:
+        file_contents = file_fd.read()
+    statements, project_file_content = parseProFileContentsStatements(file_contents)
+    scope = Scope.FromDict(None, project_file_path, statements)
+    included_files: List[str] = []
+    do_include(scope, included_files=included_files)
+    recursive_evaluate_scope(scope)
+    scopes = flatten_scopes(scope)
+    scopes = merge_scopes(scopes)
+    libdeps = extract_library_dependencies(scope, scopes)
+    all_subdirs: List[str] = []
+    if scope.TEMPLATE == "subdirs":
+        seen: Set[str] = set()
+        for s in scopes:
+            for d in s.get("SUBDIRS"):
+                if d.startswith("-"):
+                    d = d[1:]
+                if d not in seen:
+                    seen.add(d)
+                    all_subdirs.append(apply_subdirs_modifiers(scope, d))
+
+    file_hashes = {
+        file_path: get_file_hash(file_path)
+        for file_path in [project_file_absolute_path, *included_files]
+    }
+    analysis = ProjectAnalysis(
+        scope.TEMPLATE, all_subdirs, libdeps.required_libs, libdeps.optional_libs, file_hashes
+    )
+    store_project_analysis(project_file_absolute_path, analysis)
+    return analysis
+
+
 def handle_subdir(
     scope: Scope,
     cm_fh: IO[str],
@@ -1775,16 +2279,6 @@ def handle_subdir(
     # type hints.
     sub_dirs: Dict[str, Dict[str, Set[FrozenSet[str]]]] = {}
 
-    # Return the subdir with SUBDIRS modifiers applied.
-    def apply_subdirs_modifiers(scope: Scope, sd: str):
-        sd_file = scope.get_string(sd + ".file")
-        sd_subdir = scope.get_string(sd + ".subdir")
-        if sd_file:
-            sd = sd_file
-        elif sd_subdir:
-            sd = sd_subdir
-        return sd
-
     # Collects assignment conditions into global sub_dirs dict.
     def collect_subdir_info(
         sub_dir_assignment: str, *, current_conditions: Optional[FrozenSet[str]] = None
@@ -1808,43 +2302,23 @@ def handle_subdir(
         if subtractions:
             sub_dirs[subdir_name]["subtractions"] = subtractions
 
-    # Parse the sub-project, and retrieve the information needed for the top-level find_package
-    # calls.  This does not actually convert the file.
+    # Analyze the sub-project, and its sub-projects, for the top-level find_package calls.
     def extend_library_dependencies(subdir_path: str, current_pro_path: str):
         if is_sub_project or out_library_dependencies is None:
             return
         write_subdir_marker(subdir_path, current_pro_path)
-        if os.path.isdir(subdir_path):
+        if path_isdir(subdir_path):
             subdir_path = re.sub("/+$", "", subdir_path)
             subdir_path += "/" + os.path.basename(subdir_path) + ".pro"
-        print(f'Analyzing "{subdir_path}"...', flush=True)
-        file_contents = ""
-        with open(subdir_path, "r") as file_fd:
-            file_contents = file_fd.read()
-        parse_result, project_file_content = parseProFileContents(file_contents)
-        scope = Scope.FromDict(None, subdir_path, parse_result.asDict().get("statements"))
-        do_include(scope)
-        recursive_evaluate_scope(scope)
-        scopes = flatten_scopes(scope)
-        scopes = merge_scopes(scopes)
-        libdeps = extract_library_dependencies(scope, scopes)
-        out_library_dependencies.required_libs += libdeps.required_libs
-        out_library_dependencies.optional_libs += libdeps.optional_libs
-        if scope.TEMPLATE == "subdirs":
-            all_subdirs: List[str] = []
-            seen: Set[str] = set()
-            for s in scopes:
-                for d in s.get("SUBDIRS"):
-                    if d.startswith("-"):
-                        d = d[1:]
-                    if d not in seen:
-                        seen.add(d)
-                        all_subdirs.append(d)
-            for sd in all_subdirs:
-                sd = apply_subdirs_modifiers(scope, sd)
-                extend_library_dependencies(
-                    os.path.dirname(scope.file) + "/" + sd, scope.file_absolute_path
-                )
+        analysis = analyze_subproject(subdir_path)
+        for file_path in analysis.file_hashes:
+            record_input_file(file_path)
+        out_library_dependencies.required_libs += analysis.required_libs
+        out_library_dependencies.optional_libs += analysis.optional_libs
+        for sd in analysis.subdirs:
+            extend_library_dependencies(
+                os.path.dirname(subdir_path) + "/" + sd, absolute_path(subdir_path)
+            )
 
     # Recursive helper that collects subdir info for given scope,
     # and the children of the given scope.
@@ -1860,13 +2334,13 @@ def handle_subdir(
 
             # Collect info about conditions and SUBDIR assignments in the
             # current scope.
-            if os.path.isdir(sd) or sd.startswith("-"):
+            if path_isdir(sd) or sd.startswith("-"):
                 collect_subdir_info(sd, current_conditions=current_conditions)
                 if sd.startswith("-"):
                     sd = sd[1:]
                 extend_library_dependencies(sd, scope.file_absolute_path)
             # For the file case, directly write into the file handle.
-            elif os.path.isfile(sd):
+            elif path_isfile(sd):
                 # Handle cases with SUBDIRS += Foo/bar/z.pro. We want to be able
                 # to generate add_subdirectory(Foo/bar) instead of parsing the full
                 # .pro file in the current CMakeLists.txt. This causes issues
@@ -1876,11 +2350,12 @@ def handle_subdir(
                     collect_subdir_info(dirname, current_conditions=current_conditions)
                     extend_library_dependencies(sd, scope.file_absolute_path)
                 else:
-                    subdir_result, project_file_content = parseProFile(sd, debug=False)
+                    record_input_file(sd)
+                    subdir_statements, project_file_content = parseProFileStatements(sd)
                     subdir_scope = Scope.FromDict(
                         scope,
                         sd,
-                        subdir_result.asDict().get("statements"),
+                        subdir_statements,
                         "",
                         scope.basedir,
                         project_file_content=project_file_content,
@@ -2507,11 +2982,9 @@ def map_to_cmake_condition(condition: str = "") -> str:
     return condition
 
 
-resource_file_expansion_counter = 0
-
-
 def expand_resource_glob(cm_fh: IO[str], expression: str) -> str:
-    global resource_file_expansion_counter
+    context = get_conversion_context()
+    resource_file_expansion_counter = context.resource_file_expansion_counter
     r = expression.replace('"', "")
 
     cm_fh.write(
@@ -2526,7 +2999,7 @@ def expand_resource_glob(cm_fh: IO[str], expression: str) -> str:
     )
 
     expanded_var = f"${{resource_glob_{resource_file_expansion_counter}}}"
-    resource_file_expansion_counter += 1
+    context.resource_file_expansion_counter += 1
     return expanded_var
 
 
@@ -3189,6 +3662,7 @@ def handle_source_subtractions(scopes: List[Scope]):
                 continue
             if file in op._value:
                 op._value.remove(file)
+                scope.operations_changed()
                 file_removed = True
         for include_child_scope in scope._included_children:
             file_removed = file_removed or remove_file_from_operation(
@@ -3966,7 +4440,7 @@ project({project_name} VERSION {project_version} LANGUAGES C CXX)
 set(CMAKE_INCLUDE_CURRENT_DIR ON)
 """
     )
-    global min_qt_version
+    min_qt_version = get_conversion_context().min_qt_version
     if min_qt_version < version.parse("6.3"):
         cm_fh.write(
             """
@@ -4037,8 +4511,9 @@ def write_app_or_lib(
 
     add_target = ""
 
-    global min_qt_version
-    qt_add_plugin_supports_sources = min_qt_version >= version.parse("6.5")
+    qt_add_plugin_supports_sources = get_conversion_context().min_qt_version >= version.parse(
+        "6.5"
+    )
 
     if is_plugin and is_qml_module:
         extra_args = [f"PLUGIN_TARGET {binary_name}"]
@@ -4249,8 +4724,7 @@ def write_deploy_app_commands(cm_fh: IO[str], scope: Scope):
     if scope.TEMPLATE != "app":
         return
 
-    global min_qt_version
-    if min_qt_version < version.parse("6.3"):
+    if get_conversion_context().min_qt_version < version.parse("6.3"):
         app_deploy_ad = """
 # Consider using qt_generate_deploy_app_script() for app deployment if
 # the project can use Qt 6.3. In that case rerun qmake2cmake with
@@ -4423,7 +4897,7 @@ def write_qml_module(
     qmldir_file_path_list = scope.get_files("qmldir.files")
     assert len(qmldir_file_path_list) < 2, "File path must only contain one path"
     qmldir_file_path = qmldir_file_path_list[0] if qmldir_file_path_list else "qmldir"
-    qmldir_file_path = os.path.join(os.getcwd(), qmldir_file_path[0])
+    qmldir_file_path = os.path.join(current_directory(), qmldir_file_path[0])
 
     dynamic_qmldir = scope.get("DYNAMIC_QMLDIR")
     if os.path.exists(qmldir_file_path):
@@ -4567,7 +5041,7 @@ def write_qml_plugin(
         extra_lines.append(f'QML_PLUGINDUMP_DEPENDENCIES "{plugindump_dep}"')
 
     qml_dir = None
-    qmldir_file_path = os.path.join(os.getcwd(), "qmldir")
+    qmldir_file_path = os.path.join(current_directory(), "qmldir")
     qml_dir_dynamic_imports = False
     if os.path.exists(qmldir_file_path):
         qml_dir = QmlDir()
@@ -4768,7 +5242,7 @@ def handle_top_level_repo_project(scope: Scope, cm_fh: IO[str]):
 def create_top_level_cmake_conf():
     conf_file_name = ".cmake.conf"
     try:
-        with open(conf_file_name, "x") as file:
+        with open(resolve_path(conf_file_name), "x") as file:
             file.write('set(QT_REPO_MODULE_VERSION "6.4.0")\n')
     except FileExistsError:
         pass
@@ -4942,10 +5416,18 @@ def cmakeify_scope(
         )
 
 
+def render_cmakelists(scope: Scope) -> str:
+    """Return the contents of the CMakeLists.txt of scope."""
+    assert scope.file
+    cm_fh = io.StringIO()
+    cmakeify_scope(scope, cm_fh, is_sub_project=is_marked_as_subdir(scope.file))
+    return cm_fh.getvalue()
+
+
 def generate_new_cmakelists(scope: Scope, *, debug: bool = False) -> None:
     if debug:
         print("Generating CMakeLists.gen.txt")
-    with open(scope.generated_cmake_lists_path, "w") as cm_fh:
+    with open(resolve_path(scope.generated_cmake_lists_path), "w") as cm_fh:
         assert scope.file
         cmakeify_scope(
             scope,
@@ -4954,9 +5436,13 @@ def generate_new_cmakelists(scope: Scope, *, debug: bool = False) -> None:
         )
 
 
-def do_include(scope: Scope, *, debug: bool = False) -> None:
+def do_include(
+    scope: Scope, *, debug: bool = False, included_files: Optional[List[str]] = None
+) -> None:
+    """Merge the files included by scope and its children into them. The absolute paths of
+    the included files, including missing ones, are appended to included_files."""
     for c in scope.children:
-        do_include(c)
+        do_include(c, included_files=included_files)
 
     for include_index, include_file in enumerate(scope.get_files("_INCLUDED", is_include=True)):
         if not include_file:
@@ -4968,7 +5454,10 @@ def do_include(scope: Scope, *, debug: bool = False) -> None:
         if include_file.startswith("${QT_SOURCE_TREE}"):
             root_source_dir = get_top_level_repo_project_path(scope.file_absolute_path)
             include_file = include_file.replace("${QT_SOURCE_TREE}", root_source_dir)
-        if not os.path.isfile(include_file):
+        record_input_file(include_file)
+        if included_files is not None:
+            included_files.append(absolute_path(include_file))
+        if not os.path.isfile(resolve_path(include_file)):
             generated_config_pri_pattern = re.compile(r"qt.+?-config\.pri$")
             match_result = re.search(generated_config_pri_pattern, include_file)
             if not match_result:
@@ -4978,35 +5467,84 @@ def do_include(scope: Scope, *, debug: bool = False) -> None:
         include_op = scope._get_operation_at_index("_INCLUDED", include_index)
         include_line_no = include_op._line_no
 
-        include_result, project_file_content = parseProFile(include_file, debug=debug)
+        include_statements, project_file_content = parseProFileStatements(include_file, debug=debug)
         include_scope = Scope.FromDict(
             None,
             include_file,
-            include_result.asDict().get("statements"),
+            include_statements,
             "",
             scope.basedir,
             project_file_content=project_file_content,
             parent_include_line_no=include_line_no,
         )  # This scope will be merged into scope!
 
-        do_include(include_scope)
+        do_include(include_scope, included_files=included_files)
 
         scope.merge(include_scope)
 
 
+def write_file_if_changed(file_path: str, contents: str) -> bool:
+    """Write contents to the file at file_path, unless it already has exactly these contents.
+    Returns whether the file was written.
+
+    The file is replaced by renaming a temporary file, so that readers never see a partially
+    written file. It keeps its permissions."""
+    file_path = resolve_path(file_path)
+    data = contents.encode("utf-8")
+    try:
+        file_stat: Optional[os.stat_result] = os.stat(file_path)
+    except FileNotFoundError:
+        file_stat = None
+    if file_stat is not None and file_stat.st_size == len(data):
+        with open(file_path, "rb") as file_fd:
+            if file_fd.read() == data:
+                return False
+
+    temp_file_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Unlike tempfile.mkstemp, this creates the file with the permissions set by the umask.
+    fd = os.open(temp_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+        if file_stat is not None:
+            os.chmod(temp_file_path, stat.S_IMODE(file_stat.st_mode))
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        os.remove(temp_file_path)
+        raise
+    return True
+
+
+def write_cmakelists_if_changed(output_file: str, contents: str) -> None:
+    os.makedirs(os.path.realpath(resolve_path(os.path.dirname(output_file))), exist_ok=True)
+    if write_file_if_changed(output_file, contents):
+        print(f'Wrote "{output_file}".')
+    else:
+        print(f'"{output_file}" is unchanged, not writing it.')
+
+
 def copy_generated_file_to_final_location(
-    scope: Scope, output_file: str, keep_temporary_files=False, debug: bool = False
+    scope: Scope,
+    output_file: str,
+    keep_temporary_files=False,
+    debug: bool = False,
+    write_if_changed: bool = False,
 ) -> None:
     if debug:
         print(f"Copying {scope.generated_cmake_lists_path} to {output_file}")
 
-    base_dir = os.path.dirname(output_file)
-    base_dir_abs = os.path.realpath(base_dir)
-    os.makedirs(base_dir_abs, exist_ok=True)
+    generated_cmake_lists_path = resolve_path(scope.generated_cmake_lists_path)
+    if write_if_changed:
+        with open(generated_cmake_lists_path, "r") as generated_file:
+            write_cmakelists_if_changed(output_file, generated_file.read())
+    else:
+        base_dir = os.path.dirname(output_file)
+        base_dir_abs = os.path.realpath(resolve_path(base_dir))
+        os.makedirs(base_dir_abs, exist_ok=True)
 
-    copyfile(scope.generated_cmake_lists_path, output_file)
+        copyfile(generated_cmake_lists_path, resolve_path(output_file))
     if not keep_temporary_files:
-        os.remove(scope.generated_cmake_lists_path)
+        os.remove(generated_cmake_lists_path)
 
 
 def cmake_project_has_skip_marker(project_file_path: str = "") -> bool:
@@ -5024,25 +5562,24 @@ def cmake_project_has_skip_marker(project_file_path: str = "") -> bool:
     return False
 
 
-def should_convert_project(project_file_path: str = "", ignore_skip_marker: bool = False) -> bool:
-    qmake_or_cmake_conf_path = find_qmake_or_cmake_conf(project_file_path)
-    qmake_or_cmake_conf_dir_path = os.path.dirname(qmake_or_cmake_conf_path)
-
-    project_relative_path = os.path.relpath(project_file_path, qmake_or_cmake_conf_dir_path)
+def is_skipped_project_path(project_relative_path: str) -> bool:
+    """Returns whether projects at project_relative_path, relative to the directory of the
+    .qmake.conf or .cmake.conf file, are never converted.
 
+    If a directory path with a trailing slash is skipped, so are all the paths in it."""
     # Skip cmake auto tests, they should not be converted.
     if project_relative_path.startswith("tests/auto/cmake"):
-        return False
+        return True
     if project_relative_path.startswith("tests/auto/installed_cmake"):
-        return False
+        return True
 
     # Skip qmake testdata projects.
     if project_relative_path.startswith("tests/auto/tools/qmake/testdata"):
-        return False
+        return True
 
     # Skip doc snippets.
     if fnmatch.fnmatch(project_relative_path, "src/*/doc/snippets/*"):
-        return False
+        return True
 
     # Skip certain config tests.
     config_tests = [
@@ -5055,8 +5592,15 @@ def should_convert_project(project_file_path: str = "", ignore_skip_marker: bool
         # Relative to repo src dir
         "config.tests/hostcompiler/hostcompiler.pro",
     ]
-    skip_certain_tests = any(project_relative_path.startswith(c) for c in config_tests)
-    if skip_certain_tests:
+    return any(project_relative_path.startswith(c) for c in config_tests)
+
+
+def should_convert_project(project_file_path: str = "", ignore_skip_marker: bool = False) -> bool:
+    qmake_or_cmake_conf_path = find_qmake_or_cmake_conf(project_file_path)
+    qmake_or_cmake_conf_dir_path = os.path.dirname(qmake_or_cmake_conf_path)
+
+    project_relative_path = os.path.relpath(project_file_path, qmake_or_cmake_conf_dir_path)
+    if is_skipped_project_path(project_relative_path):
         return False
 
     # Skip if CMakeLists.txt in the same path as project_file_path has a
@@ -5076,104 +5620,228 @@ def should_convert_project_after_parsing(
     return True
 
 
+def convert_project(project_file_path: str, context: Optional[ConversionContext] = None) -> str:
+    """Convert the project file at project_file_path and return the contents of its
+    CMakeLists.txt. Only the subdir markers of SUBDIRS projects are written.
+
+    Relative paths are resolved against the directory of the project file, which is stored in
+    context. The working directory of the process is not changed, so threads and asyncio tasks
+    can convert projects at the same time, as long as each conversion has its own context."""
+    if context is None:
+        context = ConversionContext()
+    context.directory = os.path.dirname(os.path.abspath(project_file_path))
+    file_name = os.path.basename(project_file_path)
+    with use_conversion_context(context):
+        # The context can be reused, but the files can have changed since.
+        clear_directory_cache()
+        _find_file_walking_parent_dirs.cache_clear()
+        context.project_file_path = absolute_path(file_name)
+        record_input_file(file_name)
+        statements, project_file_content = parseProFileStatements(file_name)
+        file_scope = Scope.FromDict(
+            None,
+            file_name,
+            statements,
+            project_file_content=project_file_content,
+        )
+        do_include(file_scope)
+        return render_cmakelists(file_scope)
+
+
 def main(command_line_args: Optional[List[str]] = None) -> None:
     # Be sure of proper Python version
     assert sys.version_info >= (3, 7)
 
     args = _parse_commandline(command_line_args)
 
-    global min_qt_version
-    if args.min_qt_version:
-        min_qt_version = version.parse(args.min_qt_version)
-    elif os.getenv("QMAKE2CMAKE_MIN_QT_VERSION"):
-        min_qt_version = version.parse(os.environ["QMAKE2CMAKE_MIN_QT_VERSION"])
-    else:
-        raise RuntimeError(
-            "Please specify the minimum Qt version either with --min-qt-version or the environment variable QMAKE2CMAKE_MIN_QT_VERSION."
+    if args.cache_max_entries is not None:
+        set_condition_simplifier_cache_max_entries(args.cache_max_entries)
+    if args.cache_prune:
+        prune_condition_simplifier_cache()
+    if args.cache_stats:
+        print_condition_simplifier_cache_statistics()
+    if not args.files:
+        return
+
+    min_qt_version = _get_min_qt_version(args)
+    debug_parsing = args.debug_parser or args.debug
+    if args.skip_parse_cache:
+        set_parse_cache_enabled(False)
+    set_persistent_analysis_cache_enabled(args.persistent_analysis_cache)
+    set_parser_backend(args.parser)
+    set_condition_simplifier_engine(args.condition_simplifier)
+    set_condition_simplifier_max_atoms(args.condition_max_atoms)
+    set_condition_simplifier_timeout(args.condition_timeout)
+    for library_mapping_file in args.library_mappings:
+        load_library_mappings(library_mapping_file)
+
+    for file in args.files:
+        # Relative paths, including the one of the output file, are
+        # relative to the directory of the project file.
+        context = ConversionContext(
+            directory=os.path.dirname(os.path.abspath(file)),
+            min_qt_version=min_qt_version,
+            condition_simplifier_cache_enabled=not args.skip_condition_cache,
         )
+        with use_conversion_context(context):
+            _convert_project_file(file, args, debug_parsing=debug_parsing)
 
-    if not isinstance(min_qt_version, version.Version):
-        raise ValueError("Specified minimum Qt version is invalid.")
 
-    debug_parsing = args.debug_parser or args.debug
-    if args.skip_condition_cache:
-        set_condition_simplified_cache_enabled(False)
+def _get_min_qt_version(args: Namespace) -> str:
+    if args.min_qt_version:
+        return args.min_qt_version
+    if os.getenv("QMAKE2CMAKE_MIN_QT_VERSION"):
+        return os.environ["QMAKE2CMAKE_MIN_QT_VERSION"]
+    raise RuntimeError(
+        "Please specify the minimum Qt version either with --min-qt-version or the environment variable QMAKE2CMAKE_MIN_QT_VERSION."
+    )
+
+
+def _get_output_file(args: Namespace) -> str:
+    return args.output_file or os.path.join(".", "CMakeLists.txt")
+
+
+def _get_manifest_options(args: Namespace, project_file_path: str) -> Dict[str, Any]:
+    """Returns the options that change the output of converting the project at
+    project_file_path, as recorded in its manifest."""
+    return {
+        "project_file": absolute_path(project_file_path),
+        "min_qt_version": str(get_conversion_context().min_qt_version),
+        "is_sub_project": is_marked_as_subdir(project_file_path),
+        "parser": args.parser,
+        "condition_simplifier": args.condition_simplifier,
+        "condition_max_atoms": args.condition_max_atoms,
+        "condition_timeout": args.condition_timeout,
+        "skip_subdirs_project": args.skip_subdirs_project,
+        "special_case_preservation": args.enable_special_case_preservation,
+    }
+
 
-    backup_current_dir = os.getcwd()
+def _is_conversion_up_to_date(output_file: str, manifest_options: Dict[str, Any]) -> bool:
+    manifest = read_conversion_manifest(absolute_path(output_file))
+    return manifest is not None and manifest.is_up_to_date(manifest_options)
 
+
+def projects_are_up_to_date(command_line_args: List[str]) -> bool:
+    """Returns whether the manifests of the projects that the qmake2cmake command line
+    arguments convert are up to date, so that converting them again changes nothing.
+
+    The library mappings of the command line must already be loaded."""
+    args = _parse_commandline(command_line_args)
+    min_qt_version = _get_min_qt_version(args)
     for file in args.files:
-        new_current_dir = os.path.dirname(file)
-        file_relative_path = os.path.basename(file)
-        if new_current_dir:
-            os.chdir(new_current_dir)
-
-        project_file_absolute_path = os.path.abspath(file_relative_path)
-        if not should_convert_project(project_file_absolute_path, args.ignore_skip_marker):
-            print(f'Skipping conversion of project: "{project_file_absolute_path}"')
-            continue
+        context = ConversionContext(
+            directory=os.path.dirname(os.path.abspath(file)), min_qt_version=min_qt_version
+        )
+        with use_conversion_context(context):
+            file_name = os.path.basename(file)
+            manifest_options = _get_manifest_options(args, file_name)
+            if not _is_conversion_up_to_date(_get_output_file(args), manifest_options):
+                return False
+    return True
 
-        parseresult, project_file_content = parseProFile(file_relative_path, debug=debug_parsing)
 
-        if args.debug_parse_result or args.debug:
-            print("\n\n#### Parser result:")
-            print(parseresult)
-            print("\n#### End of parser result.\n")
-        if args.debug_parse_dictionary or args.debug:
-            print("\n\n####Parser result dictionary:")
-            print(parseresult.asDict())
-            print("\n#### End of parser result dictionary.\n")
+def _convert_project_file(file: str, args: Namespace, *, debug_parsing: bool) -> None:
+    # Conf files can have been created since an earlier conversion in this process.
+    _find_file_walking_parent_dirs.cache_clear()
+    file_relative_path = os.path.basename(file)
+    project_file_absolute_path = absolute_path(file_relative_path)
+    if not should_convert_project(project_file_absolute_path, args.ignore_skip_marker):
+        print(f'Skipping conversion of project: "{project_file_absolute_path}"')
+        return
+    output_file = _get_output_file(args)
+    manifest_options = _get_manifest_options(args, file_relative_path)
+    if args.incremental and _is_conversion_up_to_date(output_file, manifest_options):
+        print(f'Skipping conversion of project: "{project_file_absolute_path}", it is up to date.')
+        return
+    get_conversion_context().project_file_path = project_file_absolute_path
+    record_input_file(file_relative_path)
+    reset_scope_evaluation_cache_statistics()
+    clear_directory_cache()
 
-        file_scope = Scope.FromDict(
-            None,
-            file_relative_path,
-            parseresult.asDict().get("statements"),
-            project_file_content=project_file_content,
+    if args.debug_parse_result or args.debug:
+        # The raw parser result is not cached, so parse the file again.
+        parseresult, project_file_content = parseProFile(file_relative_path, debug=debug_parsing)
+        print("\n\n#### Parser result:")
+        print(parseresult)
+        print("\n#### End of parser result.\n")
+        statements = parseresult.asDict().get("statements")
+    else:
+        statements, project_file_content = parseProFileStatements(
+            file_relative_path, debug=debug_parsing
         )
+    if args.debug_parse_dictionary or args.debug:
+        print("\n\n####Parser result dictionary:")
+        print({"statements": statements} if statements is not None else {})
+        print("\n#### End of parser result dictionary.\n")
+
+    file_scope = Scope.FromDict(
+        None,
+        file_relative_path,
+        statements,
+        project_file_content=project_file_content,
+    )
 
-        if args.debug_pro_structure or args.debug:
-            print("\n\n#### .pro/.pri file structure:")
-            file_scope.dump()
-            print("\n#### End of .pro/.pri file structure.\n")
+    if args.debug_pro_structure or args.debug:
+        print("\n\n#### .pro/.pri file structure:")
+        file_scope.dump()
+        print("\n#### End of .pro/.pri file structure.\n")
 
-        do_include(file_scope, debug=debug_parsing)
+    do_include(file_scope, debug=debug_parsing)
 
-        if args.debug_full_pro_structure or args.debug:
-            print("\n\n#### Full .pro/.pri file structure:")
-            file_scope.dump()
-            print("\n#### End of full .pro/.pri file structure.\n")
+    if args.debug_full_pro_structure or args.debug:
+        print("\n\n#### Full .pro/.pri file structure:")
+        file_scope.dump()
+        print("\n#### End of full .pro/.pri file structure.\n")
 
-        if not should_convert_project_after_parsing(file_scope, args.skip_subdirs_project):
-            print(f'Skipping conversion of project: "{project_file_absolute_path}"')
-            continue
+    if not should_convert_project_after_parsing(file_scope, args.skip_subdirs_project):
+        print(f'Skipping conversion of project: "{project_file_absolute_path}"')
+        return
 
+    # The special case preservation merges the generated file on disk.
+    render_in_memory = args.write_if_changed and not args.enable_special_case_preservation
+    if render_in_memory:
+        contents = render_cmakelists(file_scope)
+    else:
         generate_new_cmakelists(
             file_scope,
             debug=args.debug,
         )
+    if args.scope_cache_stats:
+        print_scope_evaluation_cache_statistics(project_file_absolute_path)
 
+    if render_in_memory:
+        write_cmakelists_if_changed(output_file, contents)
+    else:
         copy_generated_file = True
 
-        output_file = file_scope.original_cmake_lists_path
-        if args.output_file:
-            output_file = args.output_file
-
         if args.enable_special_case_preservation:
             debug_special_case = args.debug_special_case_preservation or args.debug
             handler = SpecialCaseHandler(
-                output_file,
-                file_scope.generated_cmake_lists_path,
-                file_scope.basedir,
+                absolute_path(output_file),
+                absolute_path(file_scope.generated_cmake_lists_path),
+                absolute_path(file_scope.basedir),
                 keep_temporary_files=args.keep_temporary_files,
                 debug=debug_special_case,
+                use_git_merge=args.special_case_merge == "git",
             )
 
             copy_generated_file = handler.handle_special_cases()
 
         if copy_generated_file:
             copy_generated_file_to_final_location(
-                file_scope, output_file, keep_temporary_files=args.keep_temporary_files
+                file_scope,
+                output_file,
+                keep_temporary_files=args.keep_temporary_files,
+                write_if_changed=args.write_if_changed,
             )
-        os.chdir(backup_current_dir)
+
+    if args.incremental:
+        output_file_absolute_path = absolute_path(output_file)
+        manifest = create_conversion_manifest(
+            get_conversion_context(), output_file_absolute_path, manifest_options
+        )
+        write_conversion_manifest(output_file_absolute_path, manifest)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Cache of the analysis of subprojects.
+
+Converting a SUBDIRS project parses, includes and evaluates all of its
+subprojects, recursively, to find the libraries they use. In a nested
+SUBDIRS tree, a project is analyzed again for every ancestor that is
+converted. The results of the analysis are kept in memory for the lifetime
+of the process and, optionally, on disk next to the parse cache, so that
+later runs and other converter processes can reuse them.
+
+Entries are keyed by the absolute path of the project file. Each one
+records the hashes of the project file and of all the files it included,
+and is only used while none of them changed and the converter is the same.
+"""
+
+import hashlib
+import json
+import os
+
+from typing import Dict, List, Optional
+
+from qmake2cmake.cache_records import (
+    CacheRecord,
+    get_sources_checksum,
+    read_record,
+    write_file_atomically,
+)
+from qmake2cmake.helper import get_library_mappings_checksum
+from qmake2cmake.qmake_parser_cache import get_parse_cache_location, get_parser_checksum
+
+persistent_analysis_cache_enabled = False
+
+# Maps absolute project file paths to their analysis.
+_in_memory_cache: Dict[str, "ProjectAnalysis"] = {}
+
+
+class ProjectAnalysis(CacheRecord):
+    fields = ("template", "subdirs", "required_libs", "optional_libs", "file_hashes")
+
+    def __init__(
+        self,
+        template: str,
+        subdirs: List[str],
+        required_libs: List[str],
+        optional_libs: List[str],
+        file_hashes: Dict[str, Optional[str]],
+    ) -> None:
+        super().__init__()
+        self.template = template
+        # The SUBDIRS entries, with the .file and .subdir modifiers applied.
+        self.subdirs = subdirs
+        self.required_libs = required_libs
+        self.optional_libs = optional_libs
+        # The hashes of the project file and its included files, as
+        # returned by get_file_hash, by absolute path.
+        self.file_hashes = file_hashes
+
+    @staticmethod
+    def get_converter_checksum() -> str:
+        return get_converter_checksum()
+
+    def is_up_to_date(self) -> bool:
+        return self.files_are_up_to_date(self.file_hashes)
+
+
+def set_persistent_analysis_cache_enabled(value: bool):
+    global persistent_analysis_cache_enabled
+    persistent_analysis_cache_enabled = value
+
+
+def clear_project_analysis_cache() -> None:
+    """Forget the analyses kept in memory."""
+    _in_memory_cache.clear()
+
+
+def get_converter_checksum() -> str:
+    # Library mappings can be registered at runtime, and change which
+    # libraries a project needs.
+    sources_checksum = get_sources_checksum(get_parser_checksum(), ("pro2cmake.py", "helper.py"))
+    return sources_checksum + get_library_mappings_checksum()
+
+
+def _cache_file_path(project_file_path: str) -> str:
+    key = hashlib.sha256(project_file_path.encode("utf-8")).hexdigest()
+    analysis_dir = os.path.join(os.path.dirname(get_parse_cache_location()), "analysis")
+    return os.path.join(analysis_dir, key[:2], key[2:] + ".json")
+
+
+def _read_cache_entry(project_file_path: str) -> Optional[ProjectAnalysis]:
+    return read_record(ProjectAnalysis, _cache_file_path(project_file_path))
+
+
+def _write_cache_entry(project_file_path: str, analysis: ProjectAnalysis) -> None:
+    cache_file_path = _cache_file_path(project_file_path)
+    try:
+        write_file_atomically(cache_file_path, json.dumps(analysis.to_dict()))
+    except OSError as e:
+        print(f"Failed to write pro2cmake analysis cache entry {cache_file_path}: {e}")
+
+
+def lookup_project_analysis(project_file_path: str) -> Optional[ProjectAnalysis]:
+    """Returns the analysis of the project file at the absolute
+    project_file_path, if it is cached and up to date."""
+    analysis = _in_memory_cache.get(project_file_path)
+    if analysis is None and persistent_analysis_cache_enabled:
+        analysis = _read_cache_entry(project_file_path)
+    if analysis is None or not analysis.is_up_to_date():
+        return None
+    _in_memory_cache[project_file_path] = analysis
+    return analysis
+
+
+def store_project_analysis(project_file_path: str, analysis: ProjectAnalysis) -> None:
+    _in_memory_cache[project_file_path] = analysis
+    if persistent_analysis_cache_enabled:
+        _write_cache_entry(project_file_path, analysis)
@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Hand-written single pass parser for .pro/.pri files.
+
+The parser produces the same statement structure as
+QmakeParser.parseFileContents(...).asDict()["statements"], which is what
+Scope.FromDict consumes. The pyparsing grammar in qmake_parser.py stays the
+reference implementation: every rule below mirrors the corresponding
+grammar element, including its whitespace and comment handling.
+
+Constructs for which the exact pyparsing behavior is unclear or
+surprising (parse errors, nested parentheses in odd places, comments
+inside parentheses, escape sequences in quoted strings, ...) are not
+handled here. The parser raises UnsupportedSyntaxError for them, and
+parse_statements() then parses the whole file with the reference parser.
+"""
+
+import re
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyparsing as pp  # type: ignore
+
+from qmake2cmake.qmake_parser import (
+    finalize_condition,
+    flatten_list,
+    fixup_comments,
+    fixup_linecontinuation,
+    handle_function_value,
+    mark_condition_part,
+    parse_call_args,
+    parseProFileContents,
+)
+
+
+class UnsupportedSyntaxError(Exception):
+    """Raised for input that should be parsed by the reference parser."""
+
+    def __init__(self, loc: int, message: str) -> None:
+        super().__init__(f"{message} (at char {loc})")
+        self.loc = loc
+
+
+_printables = "".join(chr(c) for c in range(33, 127))
+
+# Whitespace and "#" comments, the way pyparsing skips them before
+# matching an element.
+_skip_re = re.compile(r"(?:[ \t]*#[^\n]*)*[ \t]*")
+# Only comments, for elements that don't skip whitespace.
+_ignorables_re = re.compile(r"(?:[ \t]*#[^\n]*)*")
+_spaces_re = re.compile(r"[ \t]*")
+
+_identifier_re = re.compile(r"[A-Za-z_][A-Za-z0-9_\-./]*")
+_keyword_chars = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_$")
+_literal_value_re = re.compile(
+    "[" + "".join(re.escape(c) for c in _printables if c not in "$#{}()") + "]+"
+)
+_condition_part2_re = re.compile(r"[^#{}|:=\\\n]+")
+_condition_end_re = re.compile(r"[ \t\r\n]*[:{|]")
+
+_quoted_value_re = re.compile(r'"(?:(?:\\.)|(?:[^"\n\r\\]))*"')
+_dbl_quoted_prefix_re = re.compile(r'"(?:[^"\n\r\\]|(?:"")|(?:\\(?:[^x]|x[0-9a-fA-F]+)))*')
+_sgl_quoted_prefix_re = re.compile(r"'(?:[^'\n\r\\]|(?:'')|(?:\\(?:[^x]|x[0-9a-fA-F]+)))*")
+_dollar_paren_re = re.compile(r"\$\((?:(?:\\)|(?:[^)\n\r]))*\)")
+# Characters which end a content token inside parentheses, or which might
+# start a token of their own.
+_nested_content_re = re.compile(r"[^() \t\"'$#]+")
+
+_operations = ("=", "-=", "+=", "*=", "~=")
+
+
+class _StatementParser:
+    def __init__(self, contents: str) -> None:
+        self.s = contents
+        self.n = len(contents)
+
+    # Helpers
+
+    def unsupported(self, loc: int, message: str) -> UnsupportedSyntaxError:
+        return UnsupportedSyntaxError(loc, message)
+
+    def skip(self, loc: int) -> int:
+        return _skip_re.match(self.s, loc).end()  # type: ignore
+
+    def char(self, loc: int) -> str:
+        return self.s[loc] if loc < self.n else ""
+
+    def identifier_end(self, loc: int) -> Optional[int]:
+        match = _identifier_re.match(self.s, loc)
+        return match.end() if match else None
+
+    def is_keyword(self, loc: int, keyword: str) -> bool:
+        end = loc + len(keyword)
+        return (
+            self.s.startswith(keyword, loc)
+            and (end >= self.n or self.s[end] not in _keyword_chars)
+            and (loc == 0 or self.s[loc - 1] not in _keyword_chars)
+        )
+
+    def quoted_string_end(self, loc: int, dollar_paren: bool) -> Optional[int]:
+        """Match the quoted strings that nestedExpr leaves untouched."""
+        c = self.char(loc)
+        if c == '"' or c == "'":
+            prefix_re = _dbl_quoted_prefix_re if c == '"' else _sgl_quoted_prefix_re
+            end = prefix_re.match(self.s, loc).end()  # type: ignore
+            if self.char(end) == c:
+                return end + 1
+        elif dollar_paren and self.s.startswith("$(", loc):
+            match = _dollar_paren_re.match(self.s, loc)
+            if match:
+                return match.end()
+        return None
+
+    def nested(self, loc: int, dollar_paren: bool = False) -> Tuple[List[Any], int]:
+        """Parse a parenthesized expression starting at loc like
+        pp.nestedExpr() does, returning the nested token lists."""
+        s = self.s
+        stack: List[List[Any]] = [[]]
+        loc += 1
+        while True:
+            loc = _spaces_re.match(s, loc).end()  # type: ignore
+            if loc >= self.n:
+                raise self.unsupported(loc, "Unterminated parentheses")
+            c = s[loc]
+            if c == "#":
+                raise self.unsupported(loc, "Comment inside parentheses")
+            if c == "(":
+                stack.append([])
+                loc += 1
+                continue
+            if c == ")":
+                top = stack.pop()
+                loc += 1
+                if not stack:
+                    return top, loc
+                stack[-1].append(top)
+                continue
+            end = self.quoted_string_end(loc, dollar_paren)
+            if end is not None:
+                stack[-1].append(s[loc:end])
+                loc = end
+                continue
+            # Content token: everything up to whitespace or parentheses,
+            # stopping in front of anything that starts a quoted string.
+            start = loc
+            while True:
+                match = _nested_content_re.match(s, loc)
+                if match:
+                    loc = match.end()
+                c = self.char(loc)
+                if c == "#":
+                    raise self.unsupported(loc, "Comment inside parentheses")
+                if c in ('"', "'", "$") and self.quoted_string_end(loc, dollar_paren) is None:
+                    loc += 1
+                    continue
+                break
+            stack[-1].append(s[start:loc])
+
+    def braces_end(self, loc: int) -> int:
+        """Find the end of a {} block that for() and defineTest() bodies
+        are skipped with."""
+        depth = 0
+        for index in range(loc, self.n):
+            c = self.s[index]
+            if c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+            elif c == "#":
+                raise self.unsupported(index, "Comment inside a skipped block")
+        raise self.unsupported(loc, "Unterminated block")
+
+    def line_end(self, loc: int) -> Optional[int]:
+        """Match EOL, returning the location after it."""
+        loc = self.skip(loc)
+        if loc >= self.n:
+            return self.n
+        if self.s[loc] == "\n":
+            return loc + 1
+        return None
+
+    # Values
+
+    def substitution(self, loc: int) -> Optional[Tuple[str, int]]:
+        """Match a Substitution inside a SubstitutionValue, starting at "$"."""
+        s = self.s
+
+        def arguments(start: int, name_end: int) -> Tuple[str, int]:
+            # Like the grammar, combine the tokens of $$name(...) or
+            # $${name(...)} without any parentheses or whitespace.
+            paren_start = _spaces_re.match(s, name_end).end()  # type: ignore
+            if self.char(paren_start) != "(":
+                return s[start:name_end], name_end
+            tokens, end = self.nested(paren_start)
+            return s[start:name_end] + "".join(flatten_list(tokens)), end
+
+        c = self.char(loc + 1)
+        if c == "$":
+            end = self.identifier_end(loc + 2)
+            if end is not None:
+                return arguments(loc, end)
+            if self.char(loc + 2) == "{":
+                end = self.identifier_end(loc + 3)
+                if end is not None:
+                    text, end = arguments(loc, end)
+                    if self.char(end) == "}":
+                        return text + "}", end + 1
+            elif self.char(loc + 2) == "[":
+                end = self.identifier_end(loc + 3)
+                if end is not None and self.char(end) == "]":
+                    return s[loc : end + 1], end + 1
+        elif c == "(" or c == "{":
+            end = self.identifier_end(loc + 2)
+            if end is not None and self.char(end) == (")" if c == "(" else "}"):
+                return s[loc : end + 1], end + 1
+        return None
+
+    def substitution_value(self, loc: int) -> Tuple[str, int]:
+        s = self.s
+        text = ""
+        while loc < self.n:
+            c = s[loc]
+            if c == "$":
+                substitution = self.substitution(loc)
+                if substitution is None:
+                    text += c
+                    loc += 1
+                else:
+                    text += substitution[0]
+                    loc = substitution[1]
+                continue
+            match = _literal_value_re.match(s, loc)
+            if not match:
+                break
+            text += match.group()
+            loc = match.end()
+        return text, loc
+
+    def function_value(self, loc: int, name_end: int) -> Tuple[str, int]:
+        name = self.s[loc + 2 : name_end]
+        args, end = self.nested(self.skip(name_end))
+        if not args and name in ("qtLibraryTarget", "files", "basename"):
+            raise self.unsupported(loc, f"$${name}() without arguments")
+
+        def to_parse_results(tokens: List[Any]) -> pp.ParseResults:
+            return pp.ParseResults(
+                [to_parse_results(t) if isinstance(t, list) else t for t in tokens]
+            )
+
+        return handle_function_value(pp.ParseResults([name, to_parse_results(args)])), end
+
+    def values(self, loc: int) -> Tuple[List[Any], int]:
+        s = self.s
+        values: List[Any] = []
+        while True:
+            start = self.skip(loc)
+            c = self.char(start)
+            if c in ("", "\n", "}") or self.is_keyword(start, "else"):
+                return values, loc
+            if c == '"':
+                match = _quoted_value_re.match(s, start)
+                if match:
+                    value = match.group()
+                    if "\\" in value:
+                        raise self.unsupported(start, "Escape sequence in a quoted value")
+                    values.append(value[1:-1])
+                    loc = match.end()
+                    continue
+            if c == "$":
+                if self.char(start + 1) in (" ", "\t") or (
+                    self.char(start + 1) == "$" and self.char(start + 2) in (" ", "\t")
+                ):
+                    raise self.unsupported(start, "Whitespace inside a substitution")
+                if self.char(start + 1) == "$":
+                    name_end = self.identifier_end(start + 2)
+                    if name_end is not None and self.char(self.skip(name_end)) == "(":
+                        value, loc = self.function_value(start, name_end)
+                        values.append(value)
+                        continue
+            if c == "(":
+                tokens, loc = self.nested(start, dollar_paren=True)
+                values += ["(", *tokens, ")"]
+                continue
+            value, end = self.substitution_value(start)
+            if end == start:
+                # Not a value, whatever comes next has to end the statement.
+                return values, loc
+            values.append(value)
+            loc = end
+
+    # Statements
+
+    def call_args(self, loc: int) -> Optional[Tuple[List[Any], int, int]]:
+        """Match CallArgs following a keyword, returning the tokens, the
+        location of the opening parenthesis and the end location."""
+        start = self.skip(loc)
+        if self.char(start) != "(":
+            return None
+        tokens, end = self.nested(start)
+        return tokens, start, end
+
+    def statement(self, loc: int) -> Optional[Tuple[Any, int, bool]]:
+        """Match a Statement, returning the statement, its end location and
+        whether it was a plain function call."""
+        s = self.s
+        if self.is_keyword(loc, "load"):
+            args = self.call_args(loc + 4)
+            if args:
+                return {"loaded": parse_call_args([args[0]])}, args[2], False
+        if self.is_keyword(loc, "include"):
+            args = self.call_args(loc + 7)
+            if args:
+                tokens, start, end = args
+                locn_end = _ignorables_re.match(s, end).end()  # type: ignore
+                included = {
+                    "locn_start": start,
+                    "value": parse_call_args([tokens]),
+                    "locn_end": locn_end,
+                }
+                return {"included": included}, end, False
+        if self.is_keyword(loc, "option"):
+            args = self.call_args(loc + 6)
+            if args:
+                return {"option": parse_call_args([args[0]])}, args[2], False
+        if self.is_keyword(loc, "requires"):
+            args = self.call_args(loc + 8)
+            if args:
+                _, start, end = args
+                condition = s[start + 1 : end - 1].strip().replace(":", " && ").strip(" && ")
+                return {"project_required_condition": condition}, end, False
+        if self.is_keyword(loc, "qtNomakeTools"):
+            args = self.call_args(loc + 13)
+            if args:
+                _, start, end = args
+                return {"qt_no_make_tools_arguments": s[start:end]}, end, False
+        for keyword in ("for", "defineTest"):
+            if self.is_keyword(loc, keyword):
+                args = self.call_args(loc + len(keyword))
+                if args:
+                    end = self.skip(args[2])
+                    if self.char(end) == "{":
+                        return [], self.braces_end(end), False
+                    if keyword == "for" and self.char(end) == ":":
+                        line_end = s.find("\n", end)
+                        return [], line_end if line_end >= 0 else self.n, False
+
+        key_end = self.identifier_end(loc)
+        if key_end is None:
+            return None
+
+        start = self.skip(key_end)
+        if self.char(start) == "(":
+            _, end = self.nested(start)
+            return [], end, True
+
+        for operation in _operations:
+            if s.startswith(operation, start):
+                end = start + len(operation)
+                locn_end = _ignorables_re.match(s, end).end()  # type: ignore
+                values, end = self.values(end)
+                result = {
+                    "key": s[loc:key_end],
+                    "operation": {"locn_start": start, "value": operation, "locn_end": locn_end},
+                    "value": values,
+                }
+                return result, end, False
+        return None
+
+    def statement_line(self, loc: int) -> Optional[Tuple[Any, int]]:
+        statement = self.statement(loc)
+        if statement is None:
+            return None
+        result, end, is_function_call = statement
+        line_end = self.line_end(end)
+        if line_end is not None:
+            return result, line_end
+        if self.char(self.skip(end)) == "}":
+            return result, end
+        if is_function_call:
+            # Probably the condition of a scope.
+            return None
+        raise self.unsupported(end, "Expected end of line")
+
+    def statement_group(self, loc: int, in_block: bool) -> Tuple[List[Any], int]:
+        statements: List[Any] = []
+        while True:
+            start = self.skip(loc)
+            c = self.char(start)
+            if c == "":
+                if in_block:
+                    raise self.unsupported(start, "Missing '}'")
+                return statements, self.n
+            if c == "\n":
+                loc = start + 1
+                continue
+            if c == "}":
+                if not in_block:
+                    raise self.unsupported(start, "Unexpected '}'")
+                return statements, start
+
+            result = self.statement_line(start)
+            if result is None:
+                result = self.scope(start)
+            if result is None:
+                raise self.unsupported(start, "Expected a statement or a scope")
+            statements.append(result[0])
+            loc = result[1]
+
+    def block(self, loc: int) -> Tuple[List[Any], int]:
+        """Parse a {} block starting at loc."""
+        line_end = self.line_end(loc + 1)
+        statements, end = self.statement_group(
+            line_end if line_end is not None else loc + 1, in_block=True
+        )
+        # statement_group stops right at the closing brace.
+        end += 1
+        line_end = self.line_end(end)
+        return statements, line_end if line_end is not None else end
+
+    # Scopes
+
+    def condition_part(self, loc: int) -> Optional[Tuple[str, int]]:
+        s = self.s
+        part1: Optional[Tuple[str, int]] = None
+        identifier_start = loc + 1 if self.char(loc) == "!" else loc
+        identifier_end = self.identifier_end(identifier_start)
+        if identifier_end is not None:
+            part1 = (s[loc:identifier_end], identifier_end)
+            start = _spaces_re.match(s, identifier_end).end()  # type: ignore
+            if self.char(start) == "(":
+                tokens, end = self.nested(start, dollar_paren=True)
+                if any(isinstance(t, list) for t in tokens):
+                    raise self.unsupported(start, "Nested parentheses in a condition")
+                part1 = (s[loc:identifier_end] + "(" + "".join(tokens) + ")", end)
+
+        match = _condition_part2_re.match(s, loc)
+        if match and (part1 is None or match.end() > part1[1]):
+            part: Optional[Tuple[str, int]] = (match.group(), match.end())
+        else:
+            part = part1
+        if part is None or not _condition_end_re.match(s, part[1]):
+            return None
+        return mark_condition_part(part[0]), part[1]
+
+    def condition(self, loc: int) -> Optional[Tuple[str, int]]:
+        s = self.s
+        part = self.condition_part(loc)
+        if part is None:
+            return None
+        condition, loc = part
+        while self.char(loc) in ("|", ":"):
+            start = loc + 1
+            while self.char(start) == " ":
+                start += 1
+            part = self.condition_part(start)
+            if part is None:
+                break
+            condition += s[loc] + part[0]
+            loc = part[1]
+        return finalize_condition(condition), loc
+
+    def scope(self, loc: int) -> Optional[Tuple[Dict[str, Any], int]]:
+        condition = self.condition(loc)
+        if condition is None:
+            return None
+        result: Dict[str, Any] = {"condition": condition[0]}
+
+        start = self.skip(condition[1])
+        c = self.char(start)
+        if c == ":":
+            start = self.skip(start + 1)
+            if self.char(start) == "{":
+                result["statements"], loc = self.block(start)
+            else:
+                statement = self.statement(start)
+                line_end = self.line_end(statement[1]) if statement else None
+                if statement is None or line_end is None:
+                    raise self.unsupported(start, "Expected a single line scope")
+                result["statements"] = [statement[0]]
+                loc = line_end
+        elif c == "{":
+            result["statements"], loc = self.block(start)
+        elif c == "|":
+            # Weird thing like write_file(a)|error(), see the grammar.
+            start = self.skip(start + 1)
+            name_end = self.identifier_end(start)
+            if name_end is None or self.char(self.skip(name_end)) != "(":
+                raise self.unsupported(start, "Expected a function call")
+            _, loc = self.nested(self.skip(name_end))
+            result["statements"] = []
+        else:
+            raise self.unsupported(start, "Expected a scope")
+
+        start = self.skip(loc)
+        if self.is_keyword(start, "else"):
+            result["else_statements"], loc = self.else_branch(start + 4)
+        return result, loc
+
+    def else_branch(self, loc: int) -> Tuple[List[Any], int]:
+        start = self.skip(loc)
+        c = self.char(start)
+        if c == "{":
+            return self.block(start)
+        if c != ":":
+            raise self.unsupported(start, "Expected an else branch")
+
+        start = self.skip(start + 1)
+        scope = self.scope(start)
+        if scope is not None:
+            return [scope[0]], scope[1]
+        if self.char(start) == "{":
+            return self.block(start)
+        statement = self.statement(start)
+        if statement is None:
+            raise self.unsupported(start, "Expected a single line else branch")
+        line_end = self.line_end(statement[1])
+        return [statement[0]], line_end if line_end is not None else statement[1]
+
+    def parse(self) -> List[Any]:
+        statements, _ = self.statement_group(0, in_block=False)
+        return statements
+
+
+def parseProFileContentsFast(contents: str) -> Tuple[Optional[List[Any]], str]:
+    """Parse contents, returning what parseProFileContents(contents)
+    returns as statements, together with the massaged file contents.
+
+    Raises UnsupportedSyntaxError for input that is left to the reference
+    parser."""
+    contents = fixup_comments(contents)
+    contents = fixup_linecontinuation(contents)
+    # pyparsing expands tabs before parsing, and all locations refer to
+    # the expanded string.
+    return _StatementParser(contents.expandtabs()).parse(), contents
+
+
+def parse_statements(contents: str) -> Tuple[Optional[List[Any]], str]:
+    """Parse contents with the fast parser, falling back to the reference
+    parser where the fast parser doesn't support the input."""
+    try:
+        return parseProFileContentsFast(contents)
+    except UnsupportedSyntaxError:
+        result, massaged_contents = parseProFileContents(contents)
+        return result.asDict().get("statements"), massaged_contents
+
+
+def find_statements_mismatch(expected: Any, actual: Any, path: str = "statements") -> Optional[str]:
+    """Describe the first difference between two statement trees."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual)):
+            if key not in actual:
+                return f"{path}: missing key '{key}'"
+            if key not in expected:
+                return f"{path}: unexpected key '{key}'"
+            mismatch = find_statements_mismatch(expected[key], actual[key], f"{path}.{key}")
+            if mismatch:
+                return mismatch
+        return None
+    if isinstance(expected, list) and isinstance(actual, list):
+        for index, (e, a) in enumerate(zip(expected, actual)):
+            mismatch = find_statements_mismatch(e, a, f"{path}[{index}]")
+            if mismatch:
+                return mismatch
+        if len(expected) != len(actual):
+            return f"{path}: expected {len(expected)} items, got {len(actual)}"
+        return None
+    if expected != actual:
+        return f"{path}: expected {expected!r}, got {actual!r}"
+    return None
+
+
+def find_fast_parser_mismatch(contents: str, expected: Optional[List[Any]]) -> Optional[str]:
+    """Parse contents with the fast parser and compare the result with the
+    statements of the reference parser. Returns a description of the first
+    difference, or None if both agree or the fast parser leaves the input
+    to the reference parser."""
+    try:
+        actual, _ = parseProFileContentsFast(contents)
+    except UnsupportedSyntaxError:
+        return None
+    return find_statements_mismatch(expected, actual)
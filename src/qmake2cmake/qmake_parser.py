@@ -2,14 +2,18 @@
 # Copyright (C) 2018 The Qt Company Ltd.
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
+import bisect
 import collections
 import os
 import re
+import threading
+from functools import lru_cache
 from itertools import chain
 from typing import Tuple
 
 import pyparsing as pp  # type: ignore
 
+from qmake2cmake.conversion_context import current_directory, resolve_path
 from qmake2cmake.helper import _set_up_py_parsing_nicer_debug_output
 
 _set_up_py_parsing_nicer_debug_output(pp)
@@ -56,6 +60,22 @@ def flatten_list(input_list):
             yield el
 
 
+class LineOffsetIndex:
+    """Maps character locations of parse results to line numbers.
+
+    pp.lineno() counts the newlines from the start of the string on every
+    call, which makes looking up the line of every statement in a file
+    quadratic. The index records the newline offsets once and answers each
+    lookup with a binary search, with the same result as pp.lineno().
+    """
+
+    def __init__(self, contents: str) -> None:
+        self._newline_offsets = [m.start() for m in re.finditer("\n", contents)]
+
+    def lineno(self, loc: int) -> int:
+        return bisect.bisect_left(self._newline_offsets, loc) + 1
+
+
 def handle_function_value(group: pp.ParseResults):
     function_name = group[0]
     function_args = group[1]
@@ -78,7 +98,7 @@ def handle_function_value(group: pp.ParseResults):
         if len(function_args) != 1:
             print(f"XXXX basename with more than one argument")
         if function_args[0] == "_PRO_FILE_PWD_":
-            return os.path.basename(os.getcwd())
+            return os.path.basename(current_directory())
         print(f"XXXX basename with value other than _PRO_FILE_PWD_")
         return os.path.basename(str(function_args[0]))
 
@@ -89,10 +109,65 @@ def handle_function_value(group: pp.ParseResults):
     return f"$${function_name}({' '.join(function_args)})"
 
 
+def parse_call_args(results) -> str:
+    out = ""
+    for item in chain(*results):
+        if isinstance(item, str):
+            out += item
+        else:
+            out += "(" + parse_call_args(item) + ")"
+    return out
+
+
+# Unfortunately qmake condition operators have no precedence,
+# and are simply evaluated left to right. To emulate that, wrap
+# each condition sub-expression in parentheses.
+# So c1|c2:c3 is evaluated by qmake as (c1|c2):c3.
+# Each condition sub-expression always gets an ")", and in the
+# end the whole condition gets as many "(" as there are
+# sub-expressions. Note that instead of inserting the actual
+# parentheses, we insert special markers which get replaced in
+# the end. The sub-expressions are counted by counting the
+# markers, so that parsing a condition keeps no state around.
+# Whitespace in the markers is important. Assumes the markers
+# never appear in .pro files.
+l_paren_marker = "_(_ "
+r_paren_marker = " _)_"
+
+
+def mark_condition_part(condition_part: str) -> str:
+    # Add ending parenthesis marker. The counterpart is added
+    # in finalize_condition.
+    return f"{condition_part}{r_paren_marker}"
+
+
+def finalize_condition(condition: str) -> str:
+    condition_parts_count = condition.count(r_paren_marker)
+    prepended_parentheses = l_paren_marker * condition_parts_count
+    result = prepended_parentheses + condition.strip().replace(":", " && ").strip(" && ")
+    # If there are only 2 condition sub-expressions, there is no
+    # need for parentheses.
+    if condition_parts_count < 3:
+        result = result.replace(l_paren_marker, "")
+        result = result.replace(r_paren_marker, "")
+        result = result.strip(" ")
+    else:
+        result = result.replace(l_paren_marker, "( ")
+        result = result.replace(r_paren_marker, " )")
+        # Strip parentheses and spaces around the final
+        # condition.
+        result = result[1:-1]
+        result = result.strip(" ")
+    return result
+
+
 class QmakeParser:
     def __init__(self, *, debug: bool = False) -> None:
         self.debug = debug
         self._Grammar = self._generate_grammar()
+        # pyparsing elements are not safe to use from several threads at
+        # once.
+        self._lock = threading.Lock()
 
     def _generate_grammar(self):
         # Define grammar:
@@ -185,15 +260,6 @@ class QmakeParser:
         )
         CallArgs = add_element("CallArgs", pp.nestedExpr())
 
-        def parse_call_args(results):
-            out = ""
-            for item in chain(*results):
-                if isinstance(item, str):
-                    out += item
-                else:
-                    out += "(" + parse_call_args(item) + ")"
-            return out
-
         CallArgs.setParseAction(parse_call_args)
 
         Load = add_element("Load", pp.Keyword("load") + CallArgs("loaded"))
@@ -308,30 +374,8 @@ class QmakeParser:
             "ConditionWhiteSpace", pp.Suppress(pp.Optional(pp.White(" ")))
         )
 
-        # Unfortunately qmake condition operators have no precedence,
-        # and are simply evaluated left to right. To emulate that, wrap
-        # each condition sub-expression in parentheses.
-        # So c1|c2:c3 is evaluated by qmake as (c1|c2):c3.
-        # The following variable keeps count on how many parentheses
-        # should be added to the beginning of the condition. Each
-        # condition sub-expression always gets an ")", and in the
-        # end the whole condition gets many "(". Note that instead
-        # inserting the actual parentheses, we insert special markers
-        # which get replaced in the end.
-        condition_parts_count = 0
-        # Whitespace in the markers is important. Assumes the markers
-        # never appear in .pro files.
-        l_paren_marker = "_(_ "
-        r_paren_marker = " _)_"
-
         def handle_condition_part(condition_part_parse_result: pp.ParseResults) -> str:
-            condition_part_list = [*condition_part_parse_result]
-            nonlocal condition_parts_count
-            condition_parts_count += 1
-            condition_part_joined = "".join(condition_part_list)
-            # Add ending parenthesis marker. The counterpart is added
-            # in handle_condition.
-            return f"{condition_part_joined}{r_paren_marker}"
+            return mark_condition_part("".join([*condition_part_parse_result]))
 
         ConditionPart.setParseAction(handle_condition_part)
         ConditionRepeated = add_element(
@@ -339,27 +383,7 @@ class QmakeParser:
         )
 
         def handle_condition(condition_parse_results: pp.ParseResults) -> str:
-            nonlocal condition_parts_count
-            prepended_parentheses = l_paren_marker * condition_parts_count
-            result = prepended_parentheses + " ".join(condition_parse_results).strip().replace(
-                ":", " && "
-            ).strip(" && ")
-            # If there are only 2 condition sub-expressions, there is no
-            # need for parentheses.
-            if condition_parts_count < 3:
-                result = result.replace(l_paren_marker, "")
-                result = result.replace(r_paren_marker, "")
-                result = result.strip(" ")
-            else:
-                result = result.replace(l_paren_marker, "( ")
-                result = result.replace(r_paren_marker, " )")
-                # Strip parentheses and spaces around the final
-                # condition.
-                result = result[1:-1]
-                result = result.strip(" ")
-            # Reset the parenthesis count for the next condition.
-            condition_parts_count = 0
-            return result
+            return finalize_condition(" ".join(condition_parse_results))
 
         Condition = add_element("Condition", pp.Combine(ConditionPart + ConditionRepeated))
         Condition.setParseAction(handle_condition)
@@ -403,7 +427,8 @@ class QmakeParser:
         try:
             contents = fixup_comments(contents)
             contents = fixup_linecontinuation(contents)
-            result = self._Grammar.parseString(contents, parseAll=True)
+            with self._lock:
+                result = self._Grammar.parseString(contents, parseAll=True)
         except pp.ParseException as pe:
             print(pe.line)
             print(f"{' ' * (pe.col - 1)}^")
@@ -413,17 +438,32 @@ class QmakeParser:
 
     def parseFile(self, file: str) -> Tuple[pp.ParseResults, str]:
         print(f'Parsing "{file}"...', flush=True)
-        with open(file, "r") as file_fd:
+        with open(resolve_path(file), "r") as file_fd:
             contents = file_fd.read()
             result, contents = self.parseFileContents(contents)
         return result, contents
 
 
+@lru_cache(maxsize=None)
+def get_qmake_parser(*, debug: bool = False) -> QmakeParser:
+    """Return the QmakeParser shared by all parses in this process.
+
+    Building the grammar is expensive compared to parsing a typical
+    project file, and the grammar keeps no state between parses, so one
+    instance can parse any number of files.
+
+    Packrat memoization is deliberately not enabled: for this grammar
+    the cache bookkeeping costs more than the re-parses it saves. See
+    benchmarks/benchmark_parser.py.
+    """
+    return QmakeParser(debug=debug)
+
+
 def parseProFile(file: str, *, debug=False) -> Tuple[pp.ParseResults, str]:
-    parser = QmakeParser(debug=debug)
+    parser = get_qmake_parser(debug=debug)
     return parser.parseFile(file)
 
 
 def parseProFileContents(contents: str, *, debug=False) -> Tuple[pp.ParseResults, str]:
-    parser = QmakeParser(debug=debug)
+    parser = get_qmake_parser(debug=debug)
     return parser.parseFileContents(contents)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Content-addressed cache for parsed .pro/.pri files.
+
+The cache stores the statement tree that Scope.FromDict consumes, keyed by
+the hash of the file contents and the parser version. Entries are kept in
+memory for the lifetime of the process and on disk next to the condition
+simplifier cache, so that unchanged files are not parsed again by later
+runs.
+"""
+
+import hashlib
+import json
+import os
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyparsing as pp  # type: ignore
+
+from qmake2cmake.cache_records import write_file_atomically
+from qmake2cmake.conversion_context import current_directory, resolve_path
+from qmake2cmake.qmake_parser import fixup_comments, fixup_linecontinuation, parseProFileContents
+from qmake2cmake.qmake_fast_parser import find_fast_parser_mismatch, parse_statements
+
+parse_cache_enabled = True
+
+# "pyparsing" is the reference parser, "fast" the hand-written parser in
+# qmake_fast_parser.py, and "compare" runs both and reports differences.
+parser_backends = ["pyparsing", "fast", "compare"]
+parser_backend = "pyparsing"
+
+# Maps cache keys to the serialized statements. Every lookup deserializes
+# a fresh statement tree, because the scopes take ownership of the value
+# lists.
+_in_memory_cache: Dict[str, str] = {}
+
+
+def set_parse_cache_enabled(value: bool):
+    global parse_cache_enabled
+    parse_cache_enabled = value
+
+
+def set_parser_backend(value: str):
+    global parser_backend
+    assert value in parser_backends
+    parser_backend = value
+
+
+def get_parse_cache_location() -> str:
+    import platformdirs  # Only needed once the cache is opened.
+
+    temp_path = platformdirs.user_cache_dir()
+    return os.path.join(temp_path, ".pro2cmake_cache", "parse")
+
+
+@lru_cache(maxsize=None)
+def get_parser_checksum() -> str:
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    content = b""
+    for parser_module in ["qmake_parser.py", "qmake_fast_parser.py"]:
+        with open(os.path.join(module_dir, parser_module), "rb") as parser_file:
+            content += parser_file.read()
+    content += pp.__version__.encode("utf-8")
+    return hashlib.md5(content).hexdigest()
+
+
+def get_cache_key(contents: str) -> str:
+    key_content = get_parser_checksum() + "\n" + parser_backend + "\n"
+    # $$basename(_PRO_FILE_PWD_) is resolved while parsing, using the
+    # directory of the running conversion.
+    if "basename" in contents:
+        key_content += current_directory() + "\n"
+    key_content += contents
+    return hashlib.sha256(key_content.encode("utf-8")).hexdigest()
+
+
+def _cache_file_path(key: str) -> str:
+    return os.path.join(get_parse_cache_location(), key[:2], key[2:] + ".json")
+
+
+def _read_cache_entry(key: str) -> Optional[str]:
+    serialized = _in_memory_cache.get(key)
+    if serialized is not None:
+        return serialized
+
+    try:
+        with open(_cache_file_path(key), "r") as cache_file:
+            serialized = cache_file.read()
+    except (IOError, ValueError):
+        return None
+
+    _in_memory_cache[key] = serialized
+    return serialized
+
+
+def _write_cache_entry(key: str, serialized: str) -> None:
+    _in_memory_cache[key] = serialized
+
+    cache_file_path = _cache_file_path(key)
+    try:
+        write_file_atomically(cache_file_path, serialized)
+    except OSError as e:
+        print(f"Failed to write pro2cmake parse cache entry {cache_file_path}: {e}")
+
+
+def _drop_cache_entry(key: str) -> None:
+    _in_memory_cache.pop(key, None)
+    try:
+        os.remove(_cache_file_path(key))
+    except OSError:
+        pass
+
+
+def _parse_statements(contents: str, *, debug: bool = False) -> Tuple[Optional[List[Any]], str]:
+    if parser_backend == "fast" and not debug:
+        return parse_statements(contents)
+
+    result, massaged_contents = parseProFileContents(contents, debug=debug)
+    statements = result.asDict().get("statements")
+    if parser_backend == "compare":
+        mismatch = find_fast_parser_mismatch(contents, statements)
+        if mismatch:
+            print(f"Parser mismatch: {mismatch}")
+    return statements, massaged_contents
+
+
+def parseProFileContentsStatements(
+    contents: str, *, debug: bool = False
+) -> Tuple[Optional[List[Any]], str]:
+    """Parse contents and return the statements for Scope.FromDict together
+    with the massaged file contents, like parseProFileContents does."""
+    if debug or not parse_cache_enabled or parser_backend == "compare":
+        return _parse_statements(contents, debug=debug)
+
+    key = get_cache_key(contents)
+    serialized = _read_cache_entry(key)
+    if serialized is not None:
+        try:
+            statements = json.loads(serialized)["statements"]
+        except (ValueError, KeyError, TypeError):
+            # A truncated or otherwise corrupt entry, parse the contents again.
+            _drop_cache_entry(key)
+        else:
+            massaged_contents = fixup_linecontinuation(fixup_comments(contents))
+            return statements, massaged_contents
+
+    statements, massaged_contents = _parse_statements(contents)
+    _write_cache_entry(key, json.dumps({"statements": statements}, separators=(",", ":")))
+    return statements, massaged_contents
+
+
+def parseProFileStatements(file: str, *, debug: bool = False) -> Tuple[Optional[List[Any]], str]:
+    print(f'Parsing "{file}"...', flush=True)
+    with open(resolve_path(file), "r") as file_fd:
+        contents = file_fd.read()
+    return parseProFileContentsStatements(contents, debug=debug)
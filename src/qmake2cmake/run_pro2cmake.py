@@ -2,17 +2,34 @@
 # Copyright (C) 2018 The Qt Company Ltd.
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
-import glob
+import io
+import itertools
 import os
+import posixpath
+import re
 import subprocess
 import concurrent.futures
 import collections
+import collections.abc
+import contextlib
+import multiprocessing.util
 import sys
+import traceback
 import typing
 import argparse
-from qmake2cmake.qmake_parser import parseProFileContents
+from qmake2cmake import pro2cmake as pro2cmake_module
+from qmake2cmake.qmake_parser_cache import (
+    parser_backends,
+    set_parser_backend,
+)
+from qmake2cmake.condition_simplifier_cache import flush_condition_simplifier_cache
+from qmake2cmake.conversion_context import ConversionContext, use_conversion_context
+from qmake2cmake.helper import load_library_mappings
+from qmake2cmake.project_analysis_cache import set_persistent_analysis_cache_enabled
 from argparse import ArgumentParser
-from qmake2cmake.pro2cmake import do_include, Scope
+from qmake2cmake.pro2cmake import find_cmake_conf, find_qmake_conf, is_skipped_project_path
+from qmake2cmake.qmake_parser import fixup_comments, fixup_linecontinuation
+from qmake2cmake.pro_conversion_rate import Blacklist
 
 
 def parse_command_line() -> argparse.Namespace:
@@ -52,12 +69,69 @@ def parse_command_line() -> argparse.Namespace:
         help="Don't run qmake2cmake on a pro file which is included in a subdir project in the "
         "same directory.",
     )
+    parser.add_argument(
+        "--exclude",
+        dest="excludes",
+        action="append",
+        default=[],
+        metavar="DIR",
+        help="Don't look for .pro files in directories with this name, or whose path relative "
+        "to <path> contains this part, like util/cmake. Can be given multiple times.",
+    )
     parser.add_argument(
         "--main-file",
         dest="main_file",
         action="store",
         help="Specify the name of the main .pro file in <path>.",
     )
+    parser.add_argument(
+        "--engine",
+        dest="engine",
+        choices=["subprocess", "pool", "tree"],
+        default="subprocess",
+        help="How the projects are converted. 'subprocess' starts a new qmake2cmake process "
+        "for each project. 'pool' converts the projects in a pool of long-lived worker "
+        "processes, which avoids paying the interpreter and import startup cost per project. "
+        "'tree' first analyzes all projects in one process, to find the subprojects of all "
+        "SUBDIRS projects, and then converts them in a pool of processes that share the "
+        "parsed files and the analysis, without subdir marker files.",
+    )
+    parser.add_argument(
+        "--parser",
+        dest="parser",
+        choices=parser_backends,
+        default="pyparsing",
+        help="Which .pro/.pri file parser to use, see qmake2cmake --help.",
+    )
+    parser.add_argument(
+        "--persistent-analysis-cache",
+        dest="persistent_analysis_cache",
+        action="store_true",
+        help="Share the analysis of subprojects between the qmake2cmake runs, "
+        "see qmake2cmake --help.",
+    )
+    parser.add_argument(
+        "--library-mapping",
+        dest="library_mappings",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="Read additional library mappings from a JSON or TOML file, see qmake2cmake --help.",
+    )
+    parser.add_argument(
+        "--incremental",
+        dest="incremental",
+        action="store_true",
+        help="Only convert the projects whose files changed since they were last converted "
+        "with this option, see qmake2cmake --help.",
+    )
+    parser.add_argument(
+        "--write-if-changed",
+        dest="write_if_changed",
+        action="store_true",
+        help="Only replace the CMakeLists.txt files whose contents change, see qmake2cmake "
+        "--help.",
+    )
     parser.add_argument(
         "--count", dest="count", help="How many projects should be converted.", type=int
     )
@@ -83,127 +157,394 @@ def parse_command_line() -> argparse.Namespace:
     return args
 
 
-def find_all_pro_files(base_path: str, args: argparse.Namespace):
-    def sorter(pro_file: str) -> str:
-        """Sorter that tries to prioritize main pro files in a directory."""
-        pro_file_without_suffix = pro_file.rsplit("/", 1)[-1][:-4]
-        dir_name = os.path.dirname(pro_file)
-        if dir_name == ".":
-            dir_name = os.path.basename(os.getcwd())
-        elif dir_name.startswith("./"):
-            dir_name = os.path.basename(os.getcwd()) + "/" + dir_name[2:]
-        if dir_name.endswith(pro_file_without_suffix):
-            return dir_name
-        return dir_name + "/__" + pro_file
-
-    all_files = []
-    previous_dir_name: typing.Optional[str] = None
-
-    print("Finding .pro files.")
-    glob_result = glob.glob(os.path.join(base_path, "**/*.pro"), recursive=True)
-
-    def cmake_lists_exists_filter(path):
-        path_dir_name = os.path.dirname(path)
-        if os.path.exists(os.path.join(path_dir_name, "CMakeLists.txt")):
-            return True
-        return False
-
-    def cmake_lists_missing_filter(path):
-        return not cmake_lists_exists_filter(path)
-
-    filter_result = glob_result
-    filter_func = None
-    if args.only_existing:
-        filter_func = cmake_lists_exists_filter
-    elif args.only_missing:
-        filter_func = cmake_lists_missing_filter
-
-    if filter_func:
-        print("Filtering.")
-        filter_result = [p for p in filter_result if filter_func(p)]
-
-    def read_file_contents(file_path):
-        with open(file_path, "r") as file_fd:
-            contents = file_fd.read()
-        return contents
-
-    def is_subdirs_project(file_path):
-        file_contents = read_file_contents(file_path)
-        parse_result, massaged_file_contents = parseProFileContents(file_contents)
-        file_scope = Scope.FromDict(
-            None,
-            file_path,
-            parse_result.asDict().get("statements"),
-            project_file_content=massaged_file_contents,
-        )
-        do_include(file_scope)
-        return file_scope.get_string("TEMPLATE") == "subdirs"
-
-    def filter_non_subdirs_pro_files_in_same_dir(pro_files):
-        result = []
-        pro_files_by_dir = collections.defaultdict(list)
-        for f in pro_files:
-            dir_path = os.path.dirname(f)
-            pro_files_by_dir[dir_path].append(f)
-
-        for one_dir, dir_files in pro_files_by_dir.items():
-            if len(dir_files) <= 1:
-                result += dir_files
-                continue
-            print(f"Multiple .pro files found in {one_dir}")
-            subdirs_projects = set(filter(is_subdirs_project, dir_files))
-            skipped_projects = []
-            if len(subdirs_projects) == 0 or len(subdirs_projects) > 1:
-                p = dir_files[0]
-                result.append(p)
-                skipped_projects = dir_files[:1]
-                if len(subdirs_projects) == 0:
-                    print(f"  No SUBDIRS project found.")
-                else:
-                    print(f"  Multiple SUBDIRS projects found")
-                print(f"  Selecting the first .pro file {p}")
-            if len(subdirs_projects) == 1:
-                p = subdirs_projects.pop()
-                print(f"  SUBDIRS project selected for conversion: {p}")
-                result.append(p)
-                skipped_projects = list(set(dir_files) - {p})
-            for p in skipped_projects:
-                print(f"  Skipping: {p}")
-        return result
-
-    if not args.skip_smart_directory_filtering:
-        filter_result = filter_non_subdirs_pro_files_in_same_dir(filter_result)
-
-    for pro_file in sorted(filter_result, key=sorter):
-        dir_name = os.path.dirname(pro_file)
-        if dir_name == previous_dir_name:
-            print("Skipping:", pro_file)
+class _DirectoryScan(typing.NamedTuple):
+    """The .pro files found in a directory."""
+
+    pro_files: typing.List[str]
+    has_cmake_lists: bool
+
+
+class _ScanState(typing.NamedTuple):
+    """A directory to scan, and the directories of the nearest .qmake.conf and .cmake.conf
+    files, which the paths of the projects in it are relative to."""
+
+    path: str
+    relative_path: str
+    qmake_conf_dir: str
+    cmake_conf_dir: str
+
+
+def _scan_directory(
+    state: _ScanState, blacklist: Blacklist, is_base: bool = False
+) -> typing.Tuple[_DirectoryScan, typing.List[_ScanState]]:
+    """Lists the directory of state. Returns its .pro files and the subdirectories to scan,
+    pruned with the rules of should_convert_project and blacklist."""
+    try:
+        with os.scandir(state.path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return _DirectoryScan([], False), []
+    names = {entry.name for entry in entries}
+    # Skip CMake build directories.
+    if "CMakeCache.txt" in names and not is_base:
+        return _DirectoryScan([], False), []
+
+    qmake_conf_dir = state.qmake_conf_dir
+    cmake_conf_dir = state.cmake_conf_dir
+    if ".qmake.conf" in names and os.path.isfile(os.path.join(state.path, ".qmake.conf")):
+        qmake_conf_dir = state.path
+    if ".cmake.conf" in names and os.path.isfile(os.path.join(state.path, ".cmake.conf")):
+        cmake_conf_dir = state.path
+    conf_dir = qmake_conf_dir or cmake_conf_dir
+
+    def is_skipped(path: str, suffix: str = "") -> bool:
+        if not conf_dir:
+            return False
+        relative_path = os.path.relpath(path, conf_dir).replace(os.sep, "/")
+        return is_skipped_project_path(relative_path + suffix)
+
+    pro_files = []
+    subdirectories = []
+    for entry in entries:
+        # Like glob, skip hidden files and directories, which include .git.
+        if entry.name.startswith("."):
+            continue
+        try:
+            if entry.is_dir():
+                relative_path = posixpath.join(state.relative_path, entry.name)
+                if blacklist.is_blacklisted(entry.name, relative_path) or is_skipped(
+                    entry.path, "/"
+                ):
+                    continue
+                subdirectories.append(
+                    _ScanState(entry.path, relative_path, qmake_conf_dir, cmake_conf_dir)
+                )
+            elif entry.name.endswith(".pro") and entry.is_file():
+                if not is_skipped(entry.path):
+                    pro_files.append(entry.path)
+        except OSError:
+            continue
+    return _DirectoryScan(pro_files, "CMakeLists.txt" in names), subdirectories
+
+
+def _scan_tree(state: _ScanState, blacklist: Blacklist) -> typing.List[_DirectoryScan]:
+    """Scans the directory of state and all its subdirectories, depth first."""
+    result = []
+    pending = [state]
+    while pending:
+        directory_scan, subdirectories = _scan_directory(pending.pop(), blacklist)
+        if directory_scan.pro_files:
+            result.append(directory_scan)
+        pending.extend(reversed(subdirectories))
+    return result
+
+
+def scan_pro_files(
+    base_path: str, blacklist: Blacklist
+) -> typing.Iterator[typing.Tuple[typing.List[str], bool]]:
+    """Finds the .pro files in base_path and its subdirectories. Yields the .pro files of each
+    directory with whether the directory has a CMakeLists.txt, base_path first.
+
+    The subtrees of the top-level directories are scanned in parallel, and their results
+    are yielded as soon as the ones before them are complete."""
+    base_path_absolute = os.path.abspath(base_path)
+    base_state = _ScanState(
+        base_path,
+        "",
+        os.path.dirname(find_qmake_conf(base_path_absolute)),
+        os.path.dirname(find_cmake_conf(base_path_absolute)),
+    )
+    directory_scan, subdirectories = _scan_directory(base_state, blacklist, is_base=True)
+    if directory_scan.pro_files:
+        yield directory_scan
+    if not subdirectories:
+        return
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        futures = [pool.submit(_scan_tree, state, blacklist) for state in subdirectories]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _pro_file_sort_key(pro_file: str) -> str:
+    """Sorter that tries to prioritize main pro files in a directory."""
+    pro_file_without_suffix = pro_file.rsplit("/", 1)[-1][:-4]
+    dir_name = os.path.dirname(pro_file)
+    if dir_name == ".":
+        dir_name = os.path.basename(os.getcwd())
+    elif dir_name.startswith("./"):
+        dir_name = os.path.basename(os.getcwd()) + "/" + dir_name[2:]
+    if dir_name.endswith(pro_file_without_suffix):
+        return dir_name
+    return dir_name + "/__" + pro_file
+
+
+_template_assignment_pattern = re.compile(r"TEMPLATE\s*=\s*([\w.-]*)")
+_template_pattern = re.compile(r"\bTEMPLATE\b")
+_include_pattern = re.compile(r"\binclude\s*\(")
+
+
+def scan_template(file_contents: str) -> typing.Optional[str]:
+    """Returns the TEMPLATE of the project with file_contents, without parsing it, or None
+    if it can only be found by evaluating the project.
+
+    That's the case when the last plain top-level TEMPLATE assignment is followed by an
+    include, or by any other statement that mentions TEMPLATE, like a conditional
+    assignment."""
+    template: typing.Optional[str] = "app"
+    depth = 0
+    for line in fixup_linecontinuation(fixup_comments(file_contents)).splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        match = _template_assignment_pattern.fullmatch(line)
+        if match and depth == 0:
+            template = match.group(1)
+            continue
+        if _template_pattern.search(line) or _include_pattern.search(line):
+            template = None
+        depth += line.count("{") - line.count("}")
+        if depth < 0:
+            return None
+    return template
+
+
+def _is_subdirs_project(file_path: str) -> bool:
+    with open(file_path, "r") as file_fd:
+        template = scan_template(file_fd.read())
+    if template is None:
+        # Keep the analysis for the conversion of the parent projects, and for the tree
+        # engine, which analyzes all projects.
+        project_file_absolute_path = os.path.abspath(file_path)
+        context = ConversionContext(directory=os.path.dirname(project_file_absolute_path))
+        with use_conversion_context(context):
+            analysis = pro2cmake_module.analyze_subproject(os.path.basename(file_path))
+        template = analysis.template
+    return template == "subdirs"
+
+
+def _select_pro_file(
+    pro_files: typing.List[str], has_cmake_lists: bool, args: argparse.Namespace
+) -> typing.Optional[str]:
+    """Returns the project to convert out of the .pro files of a directory, if any."""
+    if args.only_existing and not has_cmake_lists:
+        return None
+    if args.only_missing and has_cmake_lists:
+        return None
+    if len(pro_files) > 1 and not args.skip_smart_directory_filtering:
+        one_dir = os.path.dirname(pro_files[0])
+        print(f"Multiple .pro files found in {one_dir}")
+        subdirs_projects = set(filter(_is_subdirs_project, pro_files))
+        if len(subdirs_projects) == 1:
+            p = subdirs_projects.pop()
+            print(f"  SUBDIRS project selected for conversion: {p}")
+            skipped_projects = sorted(set(pro_files) - {p})
         else:
-            all_files.append(pro_file)
-            previous_dir_name = dir_name
-    return all_files
+            p = pro_files[0]
+            skipped_projects = pro_files[1:]
+            if len(subdirs_projects) == 0:
+                print(f"  No SUBDIRS project found.")
+            else:
+                print(f"  Multiple SUBDIRS projects found")
+            print(f"  Selecting the first .pro file {p}")
+        for skipped_project in skipped_projects:
+            print(f"  Skipping: {skipped_project}")
+        pro_files = [p]
+    pro_files = sorted(pro_files, key=_pro_file_sort_key)
+    for skipped_project in pro_files[1:]:
+        print("Skipping:", skipped_project)
+    return pro_files[0]
+
+
+def _get_blacklist(args: argparse.Namespace) -> Blacklist:
+    return Blacklist(
+        [name for name in args.excludes if "/" not in name],
+        [path_part for path_part in args.excludes if "/" in path_part],
+    )
 
 
-def run(all_files: typing.List[str], pro2cmake: str, args: argparse.Namespace) -> typing.List[str]:
-    failed_files = []
-    files_count = len(all_files)
+def find_pro_files(base_path: str, args: argparse.Namespace) -> typing.Iterator[str]:
+    """Yields the projects to convert in base_path, one per directory, while they are
+    found."""
+    print("Finding .pro files.")
+    for pro_files, has_cmake_lists in scan_pro_files(base_path, _get_blacklist(args)):
+        pro_file = _select_pro_file(pro_files, has_cmake_lists, args)
+        if pro_file:
+            yield pro_file
+
+
+def find_all_pro_files(base_path: str, args: argparse.Namespace) -> typing.List[str]:
+    """Returns the projects to convert in base_path, one per directory, main projects
+    first."""
+    return sorted(find_pro_files(base_path, args), key=_pro_file_sort_key)
+
+
+def _init_pool_worker() -> None:
+    # Pool workers leave via os._exit(), which skips the atexit handlers
+    # that write back the condition simplifier cache.
+    multiprocessing.util.Finalize(None, flush_condition_simplifier_cache, exitpriority=10)
+
+
+def _init_tree_worker(subdir_markers: typing.Dict[str, str]) -> None:
+    _init_pool_worker()
+    pro2cmake_module.set_subdir_markers(subdir_markers)
+
+
+def _start_process_pool(process_pool: concurrent.futures.ProcessPoolExecutor) -> None:
+    """Starts the worker processes of process_pool from the calling thread, before any other
+    threads are started. Forking a process that runs several threads can deadlock the child.
+    With the fork start method, all workers are started on the first submit."""
+    process_pool.submit(os.getpid).result()
+
+
+def build_project_tree(pro_files: typing.List[str]) -> typing.Dict[str, str]:
+    """Analyze all projects in this process, and return the subdir markers of the subprojects
+    of their SUBDIRS, as pro2cmake.set_subdir_markers takes them.
+
+    The parsed files and the analysis of the projects stay cached in this process, for the
+    worker processes forked from it."""
+    subdir_markers: typing.Dict[str, str] = {}
+    for pro_file in pro_files:
+        project_file_absolute_path = os.path.abspath(pro_file)
+        context = ConversionContext(directory=os.path.dirname(project_file_absolute_path))
+        try:
+            with use_conversion_context(context):
+                analysis = pro2cmake_module.analyze_subproject(os.path.basename(pro_file))
+                for sd in analysis.subdirs:
+                    # Like handle_subdir, which converts subprojects in the same directory as
+                    # part of their parent project.
+                    if pro2cmake_module.path_isdir(sd) or (
+                        pro2cmake_module.path_isfile(sd) and os.path.dirname(sd)
+                    ):
+                        subdir_markers.setdefault(
+                            pro2cmake_module.subdir_marker_key(sd), project_file_absolute_path
+                        )
+        except Exception as e:
+            # The conversion of the project reports the error.
+            print(f'Failed to analyze "{pro_file}": {e}')
+    return subdir_markers
+
+
+def _convert_in_pool_worker(
+    pro2cmake_args: typing.List[str], capture_output: bool
+) -> typing.Tuple[int, str]:
+    """Convert a project in the current process, the same way the qmake2cmake
+    command line tool would do it."""
+    output = io.StringIO()
+    return_code = 0
+    with contextlib.ExitStack() as stack:
+        if capture_output:
+            stack.enter_context(contextlib.redirect_stdout(output))
+            stack.enter_context(contextlib.redirect_stderr(output))
+        try:
+            pro2cmake_module.main(pro2cmake_args)
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                return_code = e.code
+            elif e.code is not None:
+                print(e.code, file=sys.stderr)
+                return_code = 1
+        except Exception:
+            traceback.print_exc()
+            return_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+    return return_code, output.getvalue()
+
+
+def _cmake_lists_state(
+    project_file: str,
+) -> typing.Optional[typing.Tuple[int, int, int]]:
+    """Returns what changes when the CMakeLists.txt next to project_file is written, or None if
+    there is none."""
+    try:
+        file_stat = os.stat(os.path.join(os.path.dirname(project_file), "CMakeLists.txt"))
+    except OSError:
+        return None
+    return file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size
+
+
+def run(
+    all_files: typing.Iterable[str], pro2cmake: str, args: argparse.Namespace
+) -> typing.Tuple[typing.List[str], int]:
+    """Converts all_files, the first one being the main project unless args.main_file is
+    set. all_files can be an iterator that yields the projects while they are found.
+    Returns the projects that failed to convert and the number of found projects."""
+    failed_files: typing.List[str] = []
+    # The number of projects by the result of _process_a_file.
+    results: typing.Counter[str] = collections.Counter()
+    # Unknown while the projects are found.
+    files_count: typing.Optional[int] = (
+        len(all_files) if isinstance(all_files, collections.abc.Sized) else None
+    )
     workers = os.cpu_count() or 1
+    process_pool: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
 
-    def _process_a_file(
-        data: typing.Tuple[str, int, int], direct_output: bool = False
-    ) -> typing.Tuple[int, str, str]:
-        filename, index, total = data
+    def _pro2cmake_args(project_file: str) -> typing.List[str]:
         pro2cmake_args = []
-        pro2cmake_args.append(sys.executable)
-        pro2cmake_args.append(pro2cmake)
         if args.min_qt_version:
             pro2cmake_args += ["--min-qt-version", args.min_qt_version]
         if args.skip_subdirs_projects:
             pro2cmake_args.append("--skip-subdirs-project")
-        pro2cmake_args.append(os.path.basename(filename))
+        if args.parser != "pyparsing":
+            pro2cmake_args += ["--parser", args.parser]
+        if args.persistent_analysis_cache:
+            pro2cmake_args.append("--persistent-analysis-cache")
+        if args.write_if_changed:
+            pro2cmake_args.append("--write-if-changed")
+        if args.incremental:
+            pro2cmake_args.append("--incremental")
+        for library_mapping_file in args.library_mappings:
+            # The projects are converted in their own directories.
+            pro2cmake_args += ["--library-mapping", os.path.abspath(library_mapping_file)]
+        pro2cmake_args.append(project_file)
 
         if args.pro2cmake_args:
             pro2cmake_args += args.pro2cmake_args
+        return pro2cmake_args
+
+    def _progress(index: int, total: typing.Optional[int]) -> str:
+        return str(index) if total is None else f"{index}/{total}"
+
+    def _process_a_file(
+        data: typing.Tuple[str, int, typing.Optional[int]], direct_output: bool = False
+    ) -> typing.Tuple[int, str, str, str]:
+        """Converts a project, and returns the exit code of the conversion, the project file,
+        its output and the result: "written" or "unchanged" depending on whether its
+        CMakeLists.txt was written, or "up to date" if it wasn't converted."""
+        filename, index, total = data
+        if args.incremental and pro2cmake_module.projects_are_up_to_date(
+            _pro2cmake_args(os.path.abspath(filename))
+        ):
+            output_result = f"Up to date[{_progress(index, total)}]: {filename}\n"
+            if direct_output:
+                print(output_result, end="")
+                output_result = ""
+            return 0, filename, output_result, "up to date"
+        cmake_lists_state = _cmake_lists_state(filename)
+        return_code, output_result = _convert_a_file(filename, index, total, direct_output)
+        changed = _cmake_lists_state(filename) != cmake_lists_state
+        return return_code, filename, output_result, "written" if changed else "unchanged"
+
+    def _convert_a_file(
+        filename: str, index: int, total: typing.Optional[int], direct_output: bool
+    ) -> typing.Tuple[int, str]:
+        stdout = f"Converted[{_progress(index, total)}]: {filename}\n"
+
+        if process_pool:
+            return_code, output = process_pool.submit(
+                _convert_in_pool_worker,
+                _pro2cmake_args(os.path.abspath(filename)),
+                not direct_output,
+            ).result()
+            output_result = "" if direct_output else stdout + output
+            return return_code, output_result
+
+        pro2cmake_args = [sys.executable, pro2cmake] + _pro2cmake_args(os.path.basename(filename))
 
         if direct_output:
             stdout_arg = None
@@ -218,58 +559,117 @@ def run(all_files: typing.List[str], pro2cmake: str, args: argparse.Namespace) -
             stdout=stdout_arg,
             stderr=stderr_arg,
         )
-        stdout = f"Converted[{index}/{total}]: {filename}\n"
         if direct_output:
             output_result = ""
         else:
             output_result = stdout + result.stdout.decode()
-        return result.returncode, filename, output_result
+        return result.returncode, output_result
 
     # Determine the main .pro file.
+    remaining_files = iter(all_files)
     if args.main_file:
         main_file = os.path.join(args.path, args.main_file)
         if not os.path.isfile(main_file):
             raise FileNotFoundError(f"Specified main .pro file '{main_file}' cannot be found.")
+        projects_count = 0
     else:
-        main_file = all_files[0]
-        all_files = all_files[1:]
-
-    # Convert the main .pro file first to create the subdir markers.
-    print(f"Converting the main project file {main_file}")
-    exit_code = _process_a_file((main_file, 0, 1), direct_output=True)[0]
-    if exit_code != 0:
-        return [main_file]
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, initargs=(10,)) as pool:
-        print("Firing up thread pool executor.")
-
-        for return_code, filename, stdout in pool.map(
-            _process_a_file,
-            zip(all_files, range(1, files_count + 1), (files_count for _ in all_files)),
-        ):
-            if return_code:
-                failed_files.append(filename)
-            print(stdout)
+        first_file = next(remaining_files, None)
+        if first_file is None:
+            return failed_files, 0
+        main_file = first_file
+        projects_count = 1
+
+    with contextlib.ExitStack() as stack:
+        if args.engine == "pool":
+            print("Firing up process pool executor.")
+            process_pool = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_pool_worker
+                )
+            )
+            _start_process_pool(process_pool)
+
+        if args.engine == "tree":
+            print("Analyzing the project tree.")
+            tree_files = [main_file, *remaining_files]
+            subdir_markers = build_project_tree(tree_files)
+            # For checking whether the projects are up to date.
+            pro2cmake_module.set_subdir_markers(subdir_markers)
+            stack.callback(pro2cmake_module.set_subdir_markers, None)
+            # Forked workers inherit the caches of this process.
+            mp_context = None
+            if "fork" in multiprocessing.get_all_start_methods():
+                mp_context = multiprocessing.get_context("fork")
+            process_pool = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=mp_context,
+                    initializer=_init_tree_worker,
+                    initargs=(subdir_markers,),
+                )
+            )
+            _start_process_pool(process_pool)
+            # The subprojects are known, so the main .pro file is converted with the others.
+            remaining_files = iter(tree_files)
+            projects_count = 0
+        else:
+            # Convert the main .pro file first to create the subdir markers.
+            print(f"Converting the main project file {main_file}")
+            exit_code, _, _, result = _process_a_file((main_file, 0, 1), direct_output=True)
+            if exit_code != 0:
+                # The subprojects are not converted, but still counted.
+                return [main_file], projects_count + sum(1 for _ in remaining_files)
+            results[result] += 1
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers, initargs=(10,)) as pool:
+            print("Firing up thread pool executor.")
+
+            # The projects that are still being found are converted as soon as they are.
+            for return_code, filename, stdout, result in pool.map(
+                _process_a_file,
+                zip(remaining_files, itertools.count(1), itertools.repeat(files_count)),
+            ):
+                projects_count += 1
+                if return_code:
+                    failed_files.append(filename)
+                else:
+                    results[result] += 1
+                print(stdout)
 
-    return failed_files
+    print(
+        f"CMakeLists.txt files written: {results['written']}, "
+        f"unchanged: {results['unchanged']}."
+    )
+    if args.incremental:
+        print(f"Projects that are up to date and were not converted: {results['up to date']}.")
+    return failed_files, projects_count
 
 
 def main() -> None:
     args = parse_command_line()
+    set_parser_backend(args.parser)
+    # Finding the projects can analyze some of them, and the analyses are reused by the
+    # conversions. The library mappings also change the checksum of the manifests.
+    set_persistent_analysis_cache_enabled(args.persistent_analysis_cache)
+    for library_mapping_file in args.library_mappings:
+        load_library_mappings(library_mapping_file)
 
     script_path = os.path.dirname(os.path.abspath(__file__))
     pro2cmake = os.path.join(script_path, "pro2cmake.py")
     base_path = args.path
 
-    all_files = find_all_pro_files(base_path, args)
-    if args.offset:
-        all_files = all_files[args.offset :]
-    if args.count:
-        all_files = all_files[: args.count]
-    files_count = len(all_files)
+    all_files: typing.Iterable[str]
+    if args.offset or args.count or args.engine == "tree":
+        all_files = find_all_pro_files(base_path, args)
+        if args.offset:
+            all_files = all_files[args.offset :]
+        if args.count:
+            all_files = all_files[: args.count]
+    else:
+        all_files = find_pro_files(base_path, args)
 
-    failed_files = run(all_files, pro2cmake, args)
-    if len(all_files) == 0:
+    failed_files, files_count = run(all_files, pro2cmake, args)
+    if files_count == 0:
         print("No files found.")
 
     if failed_files:
@@ -13,8 +13,9 @@ It has two modes of operation:
    "clean" CMakeLists.txt/configure.cmake as a source. "clean" in this
    case means a generated file which has no "special case" modifications.
 
-Both modes use a temporary git repository to compute and reapply
-"special case" diffs.
+Both modes compute and reapply "special case" diffs with a three-way
+merge, see text_merge.py. Alternatively, the merge can be done in a
+temporary git repository.
 
 For the first mode to work, the developer has to mark changes
 with "# special case" markers on every line they want to keep. Or
@@ -62,6 +63,7 @@ import re
 import os
 import subprocess
 import filecmp
+import threading
 import time
 import typing
 import stat
@@ -70,6 +72,12 @@ from shutil import copyfile
 from shutil import rmtree
 from textwrap import dedent
 
+from qmake2cmake.text_merge import merge_texts
+
+# Serializes the "git add" calls of the conversions running in threads of
+# this process, which would otherwise compete for the index lock.
+_git_add_lock = threading.Lock()
+
 
 def remove_special_cases(original: str) -> str:
     # Remove content between the following markers
@@ -99,14 +107,17 @@ def write_content_to_file(file_path: str, content: str) -> None:
         file_fd.write(content)
 
 
-def resolve_simple_git_conflicts(file_path: str, debug=False) -> None:
-    content = read_content_from_file(file_path)
+def resolve_simple_conflicts(content: str) -> str:
     # If the conflict represents the addition of a new content hunk,
     # keep the content and remove the conflict markers.
+    return re.sub(r"\n<<<<<<< HEAD\n=======(.+?)>>>>>>> master\n", r"\1", content, 0, re.DOTALL)
+
+
+def resolve_simple_git_conflicts(file_path: str, debug=False) -> None:
+    content = read_content_from_file(file_path)
     if debug:
         print("Resolving simple conflicts automatically.")
-    replaced = re.sub(r"\n<<<<<<< HEAD\n=======(.+?)>>>>>>> master\n", r"\1", content, 0, re.DOTALL)
-    write_content_to_file(file_path, replaced)
+    write_content_to_file(file_path, resolve_simple_conflicts(content))
 
 
 def copyfile_log(src: str, dst: str, debug=False):
@@ -126,12 +137,14 @@ def check_if_git_in_path() -> bool:
     return False
 
 
-def run_process_quiet(args_string: str, debug=False) -> bool:
+def run_process_quiet(args_string: str, debug=False, cwd: typing.Optional[str] = None) -> bool:
     if debug:
         print(f'Running command: "{args_string}"')
     args_list = args_string.split()
     try:
-        subprocess.run(args_list, check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        subprocess.run(
+            args_list, check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=cwd
+        )
     except subprocess.CalledProcessError as e:
         # git merge with conflicts returns with exit code 1, but that's not
         # an error for us.
@@ -197,6 +210,7 @@ class SpecialCaseHandler(object):
         base_dir: str,
         keep_temporary_files=False,
         debug=False,
+        use_git_merge=False,
     ) -> None:
         self.base_dir = base_dir
         self.original_file_path = original_file_path
@@ -204,6 +218,8 @@ class SpecialCaseHandler(object):
         self.keep_temporary_files = keep_temporary_files
         self.use_heuristic = False
         self.debug = debug
+        # Merge in a temporary git repository instead of in memory.
+        self.use_git_merge = use_git_merge
 
     @property
     def prev_file_path(self) -> str:
@@ -224,6 +240,26 @@ class SpecialCaseHandler(object):
         filename = original_file_basename + ".no-special" + original_file_ext
         return os.path.join(self.base_dir, filename)
 
+    def apply_merge(self, no_special_cases_file_path: str) -> None:
+        # Merge the changes from the "clean" file to the original
+        # "modified" file into the newly generated file, like
+        # apply_git_merge_magic does.
+        if self.debug:
+            print(
+                f"Merging the changes from {no_special_cases_file_path} to "
+                f"{self.original_file_path} into {self.generated_file_path}."
+            )
+        merged, has_conflicts = merge_texts(
+            read_content_from_file(no_special_cases_file_path),
+            read_content_from_file(self.generated_file_path),
+            read_content_from_file(self.original_file_path),
+        )
+        if has_conflicts:
+            if self.debug:
+                print("Resolving simple conflicts automatically.")
+            merged = resolve_simple_conflicts(merged)
+        write_content_to_file(self.post_merge_file_path, merged)
+
     def apply_git_merge_magic(self, no_special_cases_file_path: str) -> None:
         # Create new folder for temporary repo, and ch dir into it.
         repo = os.path.join(self.base_dir, "tmp_repo")
@@ -302,6 +338,11 @@ class SpecialCaseHandler(object):
             # regenerations.
             copyfile_log(self.generated_file_path, self.prev_file_path, debug=self.debug)
 
+            if not check_if_git_in_path():
+                if self.debug:
+                    print(f"git is not in PATH, not adding {self.prev_file_path}.")
+                return
+
             # Attempt to git add until we succeed. It can fail when
             # run_pro2cmake executes pro2cmake in multiple threads, and git
             # has acquired the index lock.
@@ -309,7 +350,10 @@ class SpecialCaseHandler(object):
             failed_once = False
             i = 0
             while not success and i < 20:
-                success = run_process_quiet(f"git add {self.prev_file_path}", debug=self.debug)
+                with _git_add_lock:
+                    success = run_process_quiet(
+                        f"git add {self.prev_file_path}", debug=self.debug, cwd=self.base_dir
+                    )
                 if not success:
                     failed_once = True
                     i += 1
@@ -326,8 +370,10 @@ class SpecialCaseHandler(object):
 
     def handle_special_cases_helper(self) -> bool:
         """
-        Uses git to reapply special case modifications to the "new"
-        generated CMakeLists.gen.txt/configure.cmake.gen file.
+        Reapplies special case modifications to the "new" generated
+        CMakeLists.gen.txt/configure.cmake.gen file, with a three-way merge
+        in memory or, if use_git_merge is True, in a temporary git
+        repository.
 
         If use_heuristic is True, a new file is created from the
         original file, with special cases removed.
@@ -350,11 +396,14 @@ class SpecialCaseHandler(object):
 
             if self.debug:
                 print(
-                    f"Using git to reapply special case modifications to newly "
+                    f"Reapplying special case modifications to newly "
                     f"generated {self.generated_file_path} file"
                 )
 
-            self.apply_git_merge_magic(no_special_cases_file_path)
+            if self.use_git_merge:
+                self.apply_git_merge_magic(no_special_cases_file_path)
+            else:
+                self.apply_merge(no_special_cases_file_path)
             self.save_next_clean_file()
 
             copyfile_log(self.post_merge_file_path, self.generated_file_path)
@@ -362,7 +411,7 @@ class SpecialCaseHandler(object):
                 os.remove(self.post_merge_file_path)
             if self.debug:
                 print(
-                    "Special case reapplication using git is complete. "
+                    "Special case reapplication is complete. "
                     "Make sure to fix remaining conflict markers."
                 )
 
@@ -381,9 +430,9 @@ class SpecialCaseHandler(object):
         self.use_heuristic = not prev_file_exists
 
         git_available = check_if_git_in_path()
-        keep_special_cases = original_file_exists and git_available
+        keep_special_cases = original_file_exists and (git_available or not self.use_git_merge)
 
-        if not git_available:
+        if not git_available and self.use_git_merge:
             print(
                 "You need to have git in PATH in order to reapply the special "
                 "case modifications."
@@ -0,0 +1,779 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+"""
+Three-way merge of texts in memory.
+
+merge_texts merges the changes two texts made to a common base the way
+"git merge" merges the changes of two branches to a file: lines are
+compared with the histogram diff of git, changes of the two sides that are
+identical are taken once, and overlapping changes become conflicts in the
+default conflict style:
+
+<<<<<<< HEAD
+lines of ours
+=======
+lines of theirs
+>>>>>>> original
+
+Like git, conflicts are narrowed down to the lines in which the two sides
+differ, and conflicts that are at most three lines apart are joined.
+
+This follows the diff and merge code of git's xdiff closely, so that the
+results are the same as the ones of the default "ort" merge strategy of
+git 2.34 and later. Older versions of git compare lines with the Myers diff
+by default, and may place some conflicts differently.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class _Change(NamedTuple):
+    """A change of a diff: the lines [i1, i1 + chg1) of the old text are
+    replaced with the lines [i2, i2 + chg2) of the new text."""
+
+    i1: int
+    chg1: int
+    i2: int
+    chg2: int
+
+
+class _MergeHunk:
+    """A part of the merge result, as an xdmerge_t of git's xdiff. i0, i1
+    and i2 are line indexes in the base, ours and theirs. mode is 0 for a
+    conflict, 1 or 2 for a change taken from ours or theirs, and 4 for a
+    conflict whose sides turned out to be identical."""
+
+    __slots__ = ("mode", "i0", "chg0", "i1", "chg1", "i2", "chg2")
+
+    def __init__(self, mode: int, i0: int, chg0: int, i1: int, chg1: int, i2: int, chg2: int):
+        self.mode = mode
+        self.i0 = i0
+        self.chg0 = chg0
+        self.i1 = i1
+        self.chg1 = chg1
+        self.i2 = i2
+        self.chg2 = chg2
+
+
+# The tuning constants of git's xdiff.
+_MAX_EQLIMIT = 1024
+_SIMSCAN_WINDOW = 100
+_KPDIS_RUN = 4
+_MAX_COST_MIN = 256
+_HEUR_MIN_COST = 256
+_SNAKE_CNT = 20
+_K_HEUR = 4
+
+
+def _bogosqrt(n: int) -> int:
+    i = 1
+    while n > 0:
+        n >>= 2
+        i <<= 1
+    return i
+
+
+class _Split(NamedTuple):
+    i1: int
+    i2: int
+    min_lo: bool
+    min_hi: bool
+
+
+class _DiffEnvironment:
+    """The state of a Myers diff of the lines ha1 and ha2, given as
+    numbers that are equal for equal lines, as xdl_recs_cmp of git's xdiff
+    computes it."""
+
+    def __init__(self, ha1: List[int], ha2: List[int]) -> None:
+        self.ha1 = ha1
+        self.ha2 = ha2
+        self.changed1 = [False] * len(ha1)
+        self.changed2 = [False] * len(ha2)
+        self.max_cost = max(_bogosqrt(len(ha1) + len(ha2) + 3), _MAX_COST_MIN)
+
+    def compare(self, off1: int, lim1: int, off2: int, lim2: int, need_min: bool) -> None:
+        ha1 = self.ha1
+        ha2 = self.ha2
+        # Shrink the box by walking through the snakes at both ends.
+        while off1 < lim1 and off2 < lim2 and ha1[off1] == ha2[off2]:
+            off1 += 1
+            off2 += 1
+        while off1 < lim1 and off2 < lim2 and ha1[lim1 - 1] == ha2[lim2 - 1]:
+            lim1 -= 1
+            lim2 -= 1
+        if off1 == lim1:
+            for i in range(off2, lim2):
+                self.changed2[i] = True
+        elif off2 == lim2:
+            for i in range(off1, lim1):
+                self.changed1[i] = True
+        else:
+            split = self.split(off1, lim1, off2, lim2, need_min)
+            self.compare(off1, split.i1, off2, split.i2, split.min_lo)
+            self.compare(split.i1, lim1, split.i2, lim2, split.min_hi)
+
+    def split(self, off1: int, lim1: int, off2: int, lim2: int, need_min: bool) -> _Split:
+        """Returns the point at which a shortest edit script of the box
+        crosses the middle, like xdl_split."""
+        ha1 = self.ha1
+        ha2 = self.ha2
+        dmin = off1 - lim2
+        dmax = lim1 - off2
+        fmid = off1 - off2
+        bmid = lim1 - lim2
+        odd = (fmid - bmid) & 1
+        fmin = fmax = fmid
+        bmin = bmax = bmid
+        # The furthest reaching paths forward and backward, by diagonal.
+        kvdf = {fmid: off1}
+        kvdb = {bmid: lim1}
+        line_max = lim1 + lim2 + 1
+
+        ec = 0
+        while True:
+            ec += 1
+            got_snake = False
+
+            if fmin > dmin:
+                fmin -= 1
+                kvdf[fmin - 1] = -1
+            else:
+                fmin += 1
+            if fmax < dmax:
+                fmax += 1
+                kvdf[fmax + 1] = -1
+            else:
+                fmax -= 1
+
+            for d in range(fmax, fmin - 1, -2):
+                if kvdf[d - 1] >= kvdf[d + 1]:
+                    i1 = kvdf[d - 1] + 1
+                else:
+                    i1 = kvdf[d + 1]
+                prev1 = i1
+                i2 = i1 - d
+                while i1 < lim1 and i2 < lim2 and ha1[i1] == ha2[i2]:
+                    i1 += 1
+                    i2 += 1
+                if i1 - prev1 > _SNAKE_CNT:
+                    got_snake = True
+                kvdf[d] = i1
+                if odd and bmin <= d <= bmax and kvdb[d] <= i1:
+                    return _Split(i1, i2, True, True)
+
+            if bmin > dmin:
+                bmin -= 1
+                kvdb[bmin - 1] = line_max
+            else:
+                bmin += 1
+            if bmax < dmax:
+                bmax += 1
+                kvdb[bmax + 1] = line_max
+            else:
+                bmax -= 1
+
+            for d in range(bmax, bmin - 1, -2):
+                if kvdb[d - 1] < kvdb[d + 1]:
+                    i1 = kvdb[d - 1]
+                else:
+                    i1 = kvdb[d + 1] - 1
+                prev1 = i1
+                i2 = i1 - d
+                while i1 > off1 and i2 > off2 and ha1[i1 - 1] == ha2[i2 - 1]:
+                    i1 -= 1
+                    i2 -= 1
+                if prev1 - i1 > _SNAKE_CNT:
+                    got_snake = True
+                kvdb[d] = i1
+                if not odd and fmin <= d <= fmax and i1 <= kvdf[d]:
+                    return _Split(i1, i2, True, True)
+
+            if need_min:
+                continue
+
+            # For expensive edit scripts, settle for a path that has a long
+            # snake and got far, like git does.
+            if got_snake and ec > _HEUR_MIN_COST:
+                best = 0
+                for d in range(fmax, fmin - 1, -2):
+                    dd = d - fmid if d > fmid else fmid - d
+                    i1 = kvdf[d]
+                    i2 = i1 - d
+                    v = (i1 - off1) + (i2 - off2) - dd
+                    if (
+                        v > _K_HEUR * ec
+                        and v > best
+                        and off1 + _SNAKE_CNT <= i1 < lim1
+                        and off2 + _SNAKE_CNT <= i2 < lim2
+                    ):
+                        k = 1
+                        while ha1[i1 - k] == ha2[i2 - k]:
+                            if k == _SNAKE_CNT:
+                                best = v
+                                best_split = _Split(i1, i2, True, False)
+                                break
+                            k += 1
+                if best > 0:
+                    return best_split
+
+                for d in range(bmax, bmin - 1, -2):
+                    dd = d - bmid if d > bmid else bmid - d
+                    i1 = kvdb[d]
+                    i2 = i1 - d
+                    v = (lim1 - i1) + (lim2 - i2) - dd
+                    if (
+                        v > _K_HEUR * ec
+                        and v > best
+                        and off1 < i1 <= lim1 - _SNAKE_CNT
+                        and off2 < i2 <= lim2 - _SNAKE_CNT
+                    ):
+                        k = 0
+                        while ha1[i1 + k] == ha2[i2 + k]:
+                            if k == _SNAKE_CNT - 1:
+                                best = v
+                                best_split = _Split(i1, i2, False, True)
+                                break
+                            k += 1
+                if best > 0:
+                    return best_split
+
+            if ec >= self.max_cost:
+                fbest = fbest1 = -1
+                for d in range(fmax, fmin - 1, -2):
+                    i1 = min(kvdf[d], lim1)
+                    i2 = i1 - d
+                    if lim2 < i2:
+                        i1 = lim2 + d
+                        i2 = lim2
+                    if fbest < i1 + i2:
+                        fbest = i1 + i2
+                        fbest1 = i1
+                bbest = bbest1 = line_max * 2
+                for d in range(bmax, bmin - 1, -2):
+                    i1 = max(off1, kvdb[d])
+                    i2 = i1 - d
+                    if i2 < off2:
+                        i1 = off2 + d
+                        i2 = off2
+                    if i1 + i2 < bbest:
+                        bbest = i1 + i2
+                        bbest1 = i1
+                if (lim1 + lim2) - bbest < fbest - (off1 + off2):
+                    return _Split(fbest1, fbest - fbest1, True, False)
+                return _Split(bbest1, bbest - bbest1, False, True)
+
+
+def _keep_multiple_match(discard: List[int], i: int, start: int, end: int) -> bool:
+    """Returns whether the line i, which has many matches, is compared
+    rather than discarded, like the negation of xdl_clean_mmatch."""
+    start = max(start, i - _SIMSCAN_WINDOW)
+    end = min(end, i + _SIMSCAN_WINDOW)
+    no_match_before = 0
+    multiple_matches_before = 1
+    r = 1
+    while i - r >= start:
+        if discard[i - r] == 0:
+            no_match_before += 1
+        elif discard[i - r] == 2:
+            multiple_matches_before += 1
+        else:
+            break
+        r += 1
+    if no_match_before == 0:
+        return True
+    no_match_after = 0
+    multiple_matches_after = 1
+    r = 1
+    while i + r <= end:
+        if discard[i + r] == 0:
+            no_match_after += 1
+        elif discard[i + r] == 2:
+            multiple_matches_after += 1
+        else:
+            break
+        r += 1
+    if no_match_after == 0:
+        return True
+    no_match = no_match_before + no_match_after
+    multiple_matches = multiple_matches_before + multiple_matches_after
+    return not multiple_matches * _KPDIS_RUN < multiple_matches + no_match
+
+
+def _compared_lines(
+    ha: List[int], other_counts: Dict[int, int], start: int, end: int, changed: List[bool]
+) -> List[int]:
+    """Returns the indexes of the lines in [start, end) that are compared
+    by the Myers diff. The lines that don't appear in the other text, and
+    the ones with many matches among them, are marked as changed instead,
+    like xdl_cleanup_records does."""
+    limit = min(_bogosqrt(len(ha)), _MAX_EQLIMIT)
+    discard = [0] * len(ha)
+    for i in range(start, end):
+        matches = other_counts.get(ha[i], 0)
+        discard[i] = 0 if matches == 0 else 2 if matches >= limit else 1
+    indexes = []
+    for i in range(start, end):
+        if discard[i] == 1 or (
+            discard[i] == 2 and _keep_multiple_match(discard, i, start, end - 1)
+        ):
+            indexes.append(i)
+        else:
+            changed[i] = True
+    return indexes
+
+
+def _myers_diff(ha_a: List[int], ha_b: List[int]) -> Tuple[List[bool], List[bool]]:
+    """Returns whether each line of ha_a and ha_b is changed, according
+    to the Myers diff of git's xdiff."""
+    # Leave the common beginning and end out of the diff.
+    prefix = 0
+    max_prefix = min(len(ha_a), len(ha_b))
+    while prefix < max_prefix and ha_a[prefix] == ha_b[prefix]:
+        prefix += 1
+    suffix = 0
+    max_suffix = max_prefix - prefix
+    while suffix < max_suffix and ha_a[-1 - suffix] == ha_b[-1 - suffix]:
+        suffix += 1
+
+    changed_a = [False] * len(ha_a)
+    changed_b = [False] * len(ha_b)
+    counts_a: Dict[int, int] = {}
+    for h in ha_a:
+        counts_a[h] = counts_a.get(h, 0) + 1
+    counts_b: Dict[int, int] = {}
+    for h in ha_b:
+        counts_b[h] = counts_b.get(h, 0) + 1
+    indexes_a = _compared_lines(ha_a, counts_b, prefix, len(ha_a) - suffix, changed_a)
+    indexes_b = _compared_lines(ha_b, counts_a, prefix, len(ha_b) - suffix, changed_b)
+
+    environment = _DiffEnvironment([ha_a[i] for i in indexes_a], [ha_b[i] for i in indexes_b])
+    environment.compare(0, len(indexes_a), 0, len(indexes_b), False)
+    for index, changed in zip(indexes_a, environment.changed1):
+        changed_a[index] = changed
+    for index, changed in zip(indexes_b, environment.changed2):
+        changed_b[index] = changed
+    return changed_a, changed_b
+
+
+class _HistogramDiff:
+    """The histogram diff of git's xdiff, which git merge uses by default.
+    Lines are numbered from 1, like in xhistogram.c."""
+
+    MAX_CHAIN_LENGTH = 64
+
+    def __init__(self, ha1: List[int], ha2: List[int]) -> None:
+        self.ha1 = ha1
+        self.ha2 = ha2
+        self.changed1 = [False] * len(ha1)
+        self.changed2 = [False] * len(ha2)
+
+    def diff(self, line1: int, count1: int, line2: int, count2: int) -> None:
+        while True:
+            if count1 <= 0 and count2 <= 0:
+                return
+            if not count1 or not count2:
+                self.mark_changed(line1, count1, line2, count2)
+                return
+            lcs = self.find_lcs(line1, count1, line2, count2)
+            if lcs is None:
+                # Every common line appears too often, fall back to Myers.
+                changed1, changed2 = _myers_diff(
+                    self.ha1[line1 - 1 : line1 - 1 + count1],
+                    self.ha2[line2 - 1 : line2 - 1 + count2],
+                )
+                self.changed1[line1 - 1 : line1 - 1 + count1] = changed1
+                self.changed2[line2 - 1 : line2 - 1 + count2] = changed2
+                return
+            begin1, end1, begin2, end2 = lcs
+            if begin1 == 0 and begin2 == 0:
+                self.mark_changed(line1, count1, line2, count2)
+                return
+            self.diff(line1, begin1 - line1, line2, begin2 - line2)
+            count1 = line1 + count1 - 1 - end1
+            line1 = end1 + 1
+            count2 = line2 + count2 - 1 - end2
+            line2 = end2 + 1
+
+    def mark_changed(self, line1: int, count1: int, line2: int, count2: int) -> None:
+        for i in range(line1 - 1, line1 - 1 + count1):
+            self.changed1[i] = True
+        for i in range(line2 - 1, line2 - 1 + count2):
+            self.changed2[i] = True
+
+    def find_lcs(
+        self, line1: int, count1: int, line2: int, count2: int
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """Returns the first and last lines of the longest common run of
+        lines with the fewest occurrences, or None if all common lines
+        appear too often."""
+        ha1 = self.ha1
+        ha2 = self.ha2
+        end_line1 = line1 + count1 - 1
+        end_line2 = line2 + count2 - 1
+
+        # For every distinct line of the first range, its first line
+        # number and its number of occurrences. For every line, the
+        # next line number with the same contents, or 0.
+        records: Dict[int, List[int]] = {}
+        line_records: Dict[int, List[int]] = {}
+        next_lines: Dict[int, int] = {}
+        for ptr in range(end_line1, line1 - 1, -1):
+            record = records.get(ha1[ptr - 1])
+            if record is not None:
+                next_lines[ptr] = record[0]
+                record[0] = ptr
+                record[1] += 1
+            else:
+                record = [ptr, 1]
+                records[ha1[ptr - 1]] = record
+                next_lines[ptr] = 0
+            line_records[ptr] = record
+
+        lcs = (0, 0, 0, 0)
+        max_count = self.MAX_CHAIN_LENGTH + 1
+        has_common = False
+        b_ptr = line2
+        while b_ptr <= end_line2:
+            b_next = b_ptr + 1
+            record = records.get(ha2[b_ptr - 1])
+            if record is not None:
+                has_common = True
+                if record[1] <= max_count:
+                    as_ = record[0]
+                    while True:
+                        np = next_lines[as_]
+                        bs = b_ptr
+                        ae = as_
+                        be = bs
+                        rc = record[1]
+                        while line1 < as_ and line2 < bs and ha1[as_ - 2] == ha2[bs - 2]:
+                            as_ -= 1
+                            bs -= 1
+                            if 1 < rc:
+                                rc = min(rc, line_records[as_][1])
+                        while ae < end_line1 and be < end_line2 and ha1[ae] == ha2[be]:
+                            ae += 1
+                            be += 1
+                            if 1 < rc:
+                                rc = min(rc, line_records[ae][1])
+                        if b_next <= be:
+                            b_next = be + 1
+                        if lcs[1] - lcs[0] < ae - as_ or rc < max_count:
+                            lcs = (as_, ae, bs, be)
+                            max_count = rc
+                        while np != 0 and np <= ae:
+                            np = next_lines[np]
+                        if np == 0:
+                            break
+                        as_ = np
+            b_ptr = b_next
+
+        if has_common and self.MAX_CHAIN_LENGTH < max_count:
+            return None
+        return lcs
+
+
+def _diff(a: Sequence[str], b: Sequence[str]) -> List[_Change]:
+    """Returns the changes that turn the lines a into the lines b."""
+    classes: Dict[str, int] = {}
+    ha_a = [classes.setdefault(line, len(classes)) for line in a]
+    ha_b = [classes.setdefault(line, len(classes)) for line in b]
+    histogram = _HistogramDiff(ha_a, ha_b)
+    histogram.diff(1, len(a), 1, len(b))
+    # With an unchanged line after the last one.
+    changed_a = histogram.changed1 + [False]
+    changed_b = histogram.changed2 + [False]
+    _compact_changes(a, changed_a, changed_b)
+    _compact_changes(b, changed_b, changed_a)
+
+    changes = []
+    x = 0
+    y = 0
+    while x < len(a) or y < len(b):
+        if changed_a[x] or changed_b[y]:
+            start_x = x
+            start_y = y
+            while changed_a[x]:
+                x += 1
+            while changed_b[y]:
+                y += 1
+            changes.append(_Change(start_x, x - start_x, start_y, y - start_y))
+        else:
+            x += 1
+            y += 1
+    return changes
+
+
+def _group_end(changed: List[bool], start: int) -> int:
+    while changed[start]:
+        start += 1
+    return start
+
+
+def _compact_changes(lines: Sequence[str], changed: List[bool], other_changed: List[bool]) -> None:
+    """Move the groups of changed lines in lines down as far as possible,
+    unless they can be aligned with a group of changed lines of the other
+    text, like xdl_change_compact of git does without the indent
+    heuristic."""
+    n = len(lines)
+    # The current group [start, end) and the corresponding group of the
+    # other text.
+    start = 0
+    end = _group_end(changed, 0)
+    other_start = 0
+    other_end = _group_end(other_changed, 0)
+    while True:
+        if end != start:
+            while True:
+                group_size = end - start
+                end_matching_other = -1
+                # Move the group up as far as possible.
+                while start > 0 and lines[start - 1] == lines[end - 1]:
+                    start -= 1
+                    end -= 1
+                    changed[start] = True
+                    changed[end] = False
+                    while start > 0 and changed[start - 1]:
+                        start -= 1
+                    other_end = other_start - 1
+                    other_start = other_end
+                    while other_start > 0 and other_changed[other_start - 1]:
+                        other_start -= 1
+                earliest_end = end
+                if other_end > other_start:
+                    end_matching_other = end
+                # Move the group down as far as possible.
+                while end < n and lines[start] == lines[end]:
+                    changed[start] = False
+                    changed[end] = True
+                    start += 1
+                    end = _group_end(changed, end + 1)
+                    other_start = other_end + 1
+                    other_end = _group_end(other_changed, other_start)
+                    if other_end > other_start:
+                        end_matching_other = end
+                if group_size == end - start:
+                    break
+            if end != earliest_end and end_matching_other != -1:
+                # Move the group back up to where it is aligned with the
+                # group of the other text.
+                while other_end == other_start:
+                    start -= 1
+                    end -= 1
+                    changed[start] = True
+                    changed[end] = False
+                    while start > 0 and changed[start - 1]:
+                        start -= 1
+                    other_end = other_start - 1
+                    other_start = other_end
+                    while other_start > 0 and other_changed[other_start - 1]:
+                        other_start -= 1
+        if end == n:
+            break
+        start = end + 1
+        end = _group_end(changed, start)
+        other_start = other_end + 1
+        other_end = _group_end(other_changed, other_start)
+
+
+def _append_merge(
+    merge: List[_MergeHunk], mode: int, i0: int, chg0: int, i1: int, chg1: int, i2: int, chg2: int
+) -> None:
+    if merge:
+        m = merge[-1]
+        if i1 <= m.i1 + m.chg1 or i2 <= m.i2 + m.chg2:
+            if mode != m.mode:
+                m.mode = 0
+            m.chg0 = i0 + chg0 - m.i0
+            m.chg1 = i1 + chg1 - m.i1
+            m.chg2 = i2 + chg2 - m.i2
+            return
+    merge.append(_MergeHunk(mode, i0, chg0, i1, chg1, i2, chg2))
+
+
+def _merge_changes(
+    changes1: List[_Change],
+    changes2: List[_Change],
+    base_length: int,
+    ours_length: int,
+    theirs_length: int,
+    ours: Sequence[str],
+    theirs: Sequence[str],
+) -> List[_MergeHunk]:
+    """Combine the changes from the base to ours and to theirs."""
+    merge: List[_MergeHunk] = []
+    index1 = 0
+    index2 = 0
+    while index1 < len(changes1) and index2 < len(changes2):
+        x1 = changes1[index1]
+        x2 = changes2[index2]
+        if x1.i1 + x1.chg1 < x2.i1:
+            _append_merge(merge, 1, x1.i1, x1.chg1, x1.i2, x1.chg2, x2.i2 - x2.i1 + x1.i1, x1.chg1)
+            index1 += 1
+            continue
+        if x2.i1 + x2.chg1 < x1.i1:
+            _append_merge(merge, 2, x2.i1, x2.chg1, x1.i2 - x1.i1 + x2.i1, x2.chg1, x2.i2, x2.chg2)
+            index2 += 1
+            continue
+        if (
+            x1.i1 != x2.i1
+            or x1.chg1 != x2.chg1
+            or x1.chg2 != x2.chg2
+            or ours[x1.i2 : x1.i2 + x1.chg2] != theirs[x2.i2 : x2.i2 + x2.chg2]
+        ):
+            # A conflict.
+            off = x1.i1 - x2.i1
+            ffo = off + x1.chg1 - x2.chg1
+            i0 = x1.i1
+            i1 = x1.i2
+            i2 = x2.i2
+            if off > 0:
+                i0 -= off
+                i1 -= off
+            else:
+                i2 += off
+            chg0 = x1.i1 + x1.chg1 - i0
+            chg1 = x1.i2 + x1.chg2 - i1
+            chg2 = x2.i2 + x2.chg2 - i2
+            if ffo < 0:
+                chg0 -= ffo
+                chg1 -= ffo
+            else:
+                chg2 += ffo
+            _append_merge(merge, 0, i0, chg0, i1, chg1, i2, chg2)
+
+        end1 = x1.i1 + x1.chg1
+        end2 = x2.i1 + x2.chg1
+        if end1 >= end2:
+            index2 += 1
+        if end2 >= end1:
+            index1 += 1
+
+    for x1 in changes1[index1:]:
+        _append_merge(
+            merge,
+            1,
+            x1.i1,
+            x1.chg1,
+            x1.i2,
+            x1.chg2,
+            x1.i1 + theirs_length - base_length,
+            x1.chg1,
+        )
+    for x2 in changes2[index2:]:
+        _append_merge(
+            merge,
+            2,
+            x2.i1,
+            x2.chg1,
+            x2.i1 + ours_length - base_length,
+            x2.chg1,
+            x2.i2,
+            x2.chg2,
+        )
+    return merge
+
+
+def _refine_conflicts(
+    merge: List[_MergeHunk], ours: Sequence[str], theirs: Sequence[str]
+) -> List[_MergeHunk]:
+    """Narrow every conflict down to the lines in which the sides differ,
+    splitting it where they agree."""
+    result: List[_MergeHunk] = []
+    for m in merge:
+        if m.mode != 0 or m.chg1 == 0 or m.chg2 == 0:
+            result.append(m)
+            continue
+        changes = _diff(ours[m.i1 : m.i1 + m.chg1], theirs[m.i2 : m.i2 + m.chg2])
+        if not changes:
+            m.mode = 4
+            result.append(m)
+            continue
+        for change in changes:
+            result.append(
+                _MergeHunk(
+                    0,
+                    m.i0,
+                    m.chg0,
+                    m.i1 + change.i1,
+                    change.chg1,
+                    m.i2 + change.i2,
+                    change.chg2,
+                )
+            )
+    return result
+
+
+def _simplify_non_conflicts(merge: List[_MergeHunk]) -> List[_MergeHunk]:
+    """Join conflicts that are at most three lines apart."""
+    result: List[_MergeHunk] = []
+    for m in merge:
+        if result:
+            previous = result[-1]
+            if previous.mode == 0 and m.mode == 0 and m.i1 - (previous.i1 + previous.chg1) <= 3:
+                previous.chg1 = m.i1 + m.chg1 - previous.i1
+                previous.chg2 = m.i2 + m.chg2 - previous.i2
+                continue
+        result.append(m)
+    return result
+
+
+def _with_newline(lines: Sequence[str]) -> List[str]:
+    lines = list(lines)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    return lines
+
+
+def merge_texts(
+    base: str,
+    ours: str,
+    theirs: str,
+    *,
+    ours_label: str = "HEAD",
+    theirs_label: str = "original",
+) -> Tuple[str, bool]:
+    """Merges the changes from base to ours and to theirs. Returns the
+    result and whether it has conflicts.
+
+    The conflict markers are labeled like the ones of "git merge" when
+    ours is checked out and the branch with theirs is merged."""
+    base_lines = base.splitlines(keepends=True)
+    ours_lines = ours.splitlines(keepends=True)
+    theirs_lines = theirs.splitlines(keepends=True)
+
+    merge = _merge_changes(
+        _diff(base_lines, ours_lines),
+        _diff(base_lines, theirs_lines),
+        len(base_lines),
+        len(ours_lines),
+        len(theirs_lines),
+        ours_lines,
+        theirs_lines,
+    )
+    merge = _simplify_non_conflicts(_refine_conflicts(merge, ours_lines, theirs_lines))
+
+    result: List[str] = []
+    has_conflicts = False
+    i = 0
+    for m in merge:
+        if m.mode == 4:
+            continue
+        result.extend(ours_lines[i : m.i1])
+        if m.mode == 0:
+            has_conflicts = True
+            result.append(f"<<<<<<< {ours_label}\n")
+            result.extend(_with_newline(ours_lines[m.i1 : m.i1 + m.chg1]))
+            result.append("=======\n")
+            result.extend(_with_newline(theirs_lines[m.i2 : m.i2 + m.chg2]))
+            result.append(f">>>>>>> {theirs_label}\n")
+        elif m.mode == 1:
+            result.extend(ours_lines[m.i1 : m.i1 + m.chg1])
+        else:
+            result.extend(theirs_lines[m.i2 : m.i2 + m.chg2])
+        i = m.i1 + m.chg1
+    result.extend(ours_lines[i:])
+    return "".join(result), has_conflicts
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake import condition_simplifier_cache
+from qmake2cmake.condition_simplifier_cache import ConditionCacheDatabase
+from qmake2cmake.pro2cmake import main as convert_qmake_to_cmake
+
+import json
+import os
+import pytest
+import sqlite3
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.sqlite')
+    monkeypatch.setattr(condition_simplifier_cache, 'get_cache_location', lambda: path)
+    return path
+
+
+def test_entries_are_shared_between_processes(cache_path):
+    first = ConditionCacheDatabase(cache_path, 'checksum')
+    assert(first.get('a AND a') is None)
+    first.add('a AND a', 'a')
+    # Entries are only written when the cache is flushed.
+    assert(ConditionCacheDatabase(cache_path, 'checksum').get('a AND a') is None)
+    first.flush()
+    assert(ConditionCacheDatabase(cache_path, 'checksum').get('a AND a') == 'a')
+
+
+def test_existing_entries_are_kept(cache_path):
+    first = ConditionCacheDatabase(cache_path, 'checksum')
+    second = ConditionCacheDatabase(cache_path, 'checksum')
+    first.add('a OR a', 'a')
+    second.add('a OR a', 'other')
+    second.add('b OR b', 'b')
+    first.flush()
+    second.flush()
+    third = ConditionCacheDatabase(cache_path, 'checksum')
+    assert(third.get('a OR a') == 'a')
+    assert(third.get('b OR b') == 'b')
+
+
+def test_simplifier_change_invalidates_entries(cache_path):
+    database = ConditionCacheDatabase(cache_path, 'old')
+    database.add('a AND a', 'a')
+    database.flush()
+    assert(ConditionCacheDatabase(cache_path, 'new').get('a AND a') is None)
+
+
+def test_legacy_json_cache_is_migrated(cache_path):
+    legacy_path = condition_simplifier_cache.get_legacy_cache_location()
+    with open(legacy_path, 'w') as legacy_file:
+        json.dump({'checksum': 'checksum', 'schema_version': '1',
+                   'cache': {'conditions': {'a AND a': 'a'}}}, legacy_file)
+
+    assert(ConditionCacheDatabase(cache_path, 'checksum').get('a AND a') == 'a')
+    assert(not os.path.exists(legacy_path))
+
+
+def test_corrupt_cache_file_is_replaced(cache_path):
+    with open(cache_path, 'w') as cache_file:
+        cache_file.write('this is not a database' * 100)
+
+    database = ConditionCacheDatabase(cache_path, 'checksum')
+    database.add('a AND a', 'a')
+    database.flush()
+    assert(ConditionCacheDatabase(cache_path, 'checksum').get('a AND a') == 'a')
+
+
+def test_locked_cache_file_is_kept(cache_path, monkeypatch):
+    database = ConditionCacheDatabase(cache_path, 'checksum')
+    database.add('a AND a', 'a')
+    database.flush()
+
+    def locked(self):
+        raise sqlite3.OperationalError('database is locked')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ConditionCacheDatabase, '_connect', locked)
+        assert(ConditionCacheDatabase(cache_path, 'checksum').get('a AND a') is None)
+    assert(ConditionCacheDatabase(cache_path, 'checksum').get('a AND a') == 'a')
+
+
+def test_memoized_function_is_called_once(cache_path, monkeypatch):
+    monkeypatch.setattr(condition_simplifier_cache, '_cache_file_writers', [])
+    monkeypatch.setattr(condition_simplifier_cache, 'get_condition_simplifier_checksum',
+                        lambda: 'checksum')
+    calls = []
+
+    def simplify(condition):
+        calls.append(condition)
+        return condition.upper()
+
+    helper = condition_simplifier_cache.simplify_condition_memoize(simplify)
+    assert(helper('a and b') == 'A AND B')
+    assert(helper('a and b') == 'A AND B')
+    assert(calls == ['a and b'])
+
+    condition_simplifier_cache.flush_condition_simplifier_cache()
+    assert(ConditionCacheDatabase(cache_path, 'checksum').get('a and b') == 'A AND B')
+
+
+def test_database_is_opened_on_first_lookup(cache_path, monkeypatch):
+    monkeypatch.setattr(condition_simplifier_cache, '_cache_file_writers', [])
+    checksums = []
+    monkeypatch.setattr(condition_simplifier_cache, 'get_condition_simplifier_checksum',
+                        lambda: checksums.append(1) or 'checksum')
+
+    helper = condition_simplifier_cache.simplify_condition_memoize(str.upper)
+    condition_simplifier_cache.flush_condition_simplifier_cache()
+    assert(checksums == [])
+    assert(helper('a') == 'A')
+    assert(helper('b') == 'B')
+    assert(checksums == [1])
+
+
+def test_least_recently_used_entries_are_evicted(cache_path, monkeypatch):
+    monkeypatch.setattr(condition_simplifier_cache, 'condition_simplifier_cache_max_entries', 2)
+    times = iter(range(100))
+    monkeypatch.setattr(condition_simplifier_cache.time, 'time', lambda: next(times))
+
+    database = ConditionCacheDatabase(cache_path, 'checksum')
+    for condition in ['a', 'b']:
+        database.add(condition, condition)
+        database.flush()
+    database.record_hit('a')
+    database.flush()
+    database.add('c', 'c')
+    database.flush()
+
+    database = ConditionCacheDatabase(cache_path, 'checksum')
+    assert(database.get('a') == 'a')
+    assert(database.get('b') is None)
+    assert(database.get('c') == 'c')
+
+
+def test_statistics_and_prune(cache_path):
+    database = ConditionCacheDatabase(cache_path, 'checksum')
+    for condition in ['a', 'b', 'c']:
+        database.add(condition, condition)
+    database.record_hit('a')
+    database.flush()
+    database.record_hit('a')
+    database.record_hit('b')
+    database.flush()
+
+    statistics = ConditionCacheDatabase(cache_path, 'checksum').statistics()
+    assert(statistics['entries'] == 3)
+    assert(statistics['hits'] == 3)
+    assert(statistics['misses'] == 3)
+    assert(statistics['size'] > 0)
+
+    assert(database.prune(1) == 2)
+    assert(database.prune(1) == 0)
+    assert(database.statistics()['entries'] == 1)
+    assert(database.get('a') == 'a')
+
+
+def test_invalid_max_entries_environment_variable(monkeypatch, capsys):
+    monkeypatch.setenv('QMAKE2CMAKE_CACHE_MAX_ENTRIES', 'many')
+    with pytest.raises(SystemExit):
+        convert_qmake_to_cmake(['--cache-stats'])
+    assert('QMAKE2CMAKE_CACHE_MAX_ENTRIES' in capsys.readouterr().err)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake import condition_simplifier
+from qmake2cmake.condition_simplifier import _simplify_canonical_condition, simplify_condition
+from qmake2cmake.condition_simplifier_native import (
+    UnsupportedConditionError,
+    simplify_condition_native,
+)
+
+import os
+import pytest
+import re
+
+
+_tests_path = os.path.dirname(os.path.abspath(__file__))
+
+
+def _read_corpus():
+    # Conditions recorded while converting projects, with the result of the
+    # sympy path. See benchmarks/benchmark_condition_cache.py.
+    with open(os.path.join(_tests_path, 'data', 'condition_corpus.txt'), 'r') as corpus_file:
+        return [tuple(line.rstrip('\n').split('\t')) for line in corpus_file]
+
+
+_corpus = _read_corpus()
+
+
+# The platform atoms that are set on every platform. The equivalence of
+# the results is checked on these, independently of the platform rules of
+# the native engine.
+_platforms = [
+    {'WIN32'},
+    {'WIN32', 'WINRT'},
+    {'UNIX'},
+    {'UNIX', 'LINUX'},
+    {'UNIX', 'ANDROID'},
+    {'UNIX', 'APPLE', 'MACOS'},
+    *({'UNIX', 'APPLE', 'UIKIT', uikit} for uikit in ['IOS', 'TVOS', 'WATCHOS']),
+    {'UNIX', 'BSD'},
+    *({'UNIX', 'BSD', bsd} for bsd in ['FREEBSD', 'OPENBSD', 'NETBSD']),
+    *({'UNIX', other} for other in ['HAIKU', 'INTEGRITY', 'VXWORKS', 'QNX', 'WASM']),
+]
+_platform_atoms = set().union(*_platforms)
+_operators = {'AND': '&', 'OR': '|', 'NOT': '~', '(': '(', ')': ')'}
+_constants = {'ON': True, 'true': True, 'True': True, 'OFF': False, 'false': False, 'False': False}
+
+
+def _python_expression(condition):
+    """Returns condition as a Python expression on truth tables, and its atoms."""
+    items = []
+    for token in re.findall(r'\(|\)|[^\s()]+', condition):
+        if token in _operators:
+            items.append((_operators[token], False))
+        elif items and items[-1][1]:
+            # Consecutive words form a single atom.
+            items[-1] = (items[-1][0] + ' ' + token, True)
+        else:
+            items.append((token, True))
+    atoms = {text for text, is_atom in items if is_atom}
+    expression = ' '.join(f'v[{text!r}]' if is_atom else text for text, is_atom in items)
+    return expression, atoms
+
+
+def conditions_equivalent(a, b):
+    """Whether the conditions have the same value on every platform."""
+    if a.strip() == b.strip():
+        return True
+    a_expression, a_atoms = _python_expression(a)
+    b_expression, b_atoms = _python_expression(b)
+    others = sorted((a_atoms | b_atoms) - _platform_atoms - set(_constants))
+    size = 1 << len(others)
+    all_bits = (1 << size) - 1
+    values = {atom: sum(1 << m for m in range(size) if m >> i & 1) for i, atom in enumerate(others)}
+    values.update((constant, all_bits if value else 0) for constant, value in _constants.items())
+    for platform in _platforms:
+        values.update((atom, all_bits if atom in platform else 0) for atom in _platform_atoms)
+        if (eval(a_expression, {}, {'v': values}) ^ eval(b_expression, {}, {'v': values})) & all_bits:
+            return False
+    return True
+
+
+@pytest.fixture
+def native_engine():
+    condition_simplifier.set_condition_simplifier_engine('native')
+    yield
+    condition_simplifier.set_condition_simplifier_engine('sympy')
+
+
+def validate_equivalent_to_sympy(condition: str) -> None:
+    expected = _simplify_canonical_condition(condition)
+    assert(conditions_equivalent(simplify_condition_native(condition), expected))
+
+
+def test_corpus_is_equivalent_to_sympy():
+    simplified = 0
+    for condition, expected in _corpus:
+        try:
+            result = simplify_condition_native(condition)
+        except UnsupportedConditionError:
+            continue
+        simplified += 1
+        assert conditions_equivalent(result, expected), f'{condition}: {result} != {expected}'
+    # Most of the corpus is made of conditions the native engine handles.
+    assert(simplified > len(_corpus) // 2)
+
+
+def test_corpus_through_engine_selection(native_engine):
+    for condition, expected in _corpus:
+        result = simplify_condition(condition)
+        assert conditions_equivalent(result, expected), f'{condition}: {result} != {expected}'
+
+
+@pytest.mark.parametrize('condition', [
+    'WIN32 OR UNIX',
+    'NOT WIN32 AND foo',
+    'WINRT AND NOT WIN32',
+    'APPLE AND MACOS',
+    'APPLE OR IOS OR foo',
+    'UNIX AND NOT APPLE AND NOT LINUX',
+    'ANDROID AND LINUX',
+    'FREEBSD OR (BSD AND bar)',
+    '(a AND b) OR (a AND NOT b) OR c',
+    'TARGET Foo::Bar AND (TARGET Foo::Bar OR baz)',
+    'a STREQUAL b OR NOT (a STREQUAL b)',
+])
+def test_domain_rules_match_sympy(condition):
+    validate_equivalent_to_sympy(condition)
+
+
+def test_spelling_matches_sympy_for_simple_conditions():
+    assert(simplify_condition_native('WIN32 OR UNIX') == 'ON')
+    assert(simplify_condition_native('NOT UNIX') == 'WIN32')
+    assert(simplify_condition_native('NOT WIN32') == 'UNIX')
+    assert(simplify_condition_native('  NOT NOT bar   ') == 'bar')
+    assert(simplify_condition_native('APPLE AND MACOS') == 'MACOS')
+    assert(simplify_condition_native('QT_FEATURE_foo AND QT_FEATURE_bar')
+           == 'QT_FEATURE_bar AND QT_FEATURE_foo')
+
+
+def test_unsupported_conditions():
+    for condition in ['isEmpty(foo)', 'NOT equals(a, "b")', 'AND', '(a OR b']:
+        with pytest.raises(UnsupportedConditionError):
+            simplify_condition_native(condition)
+
+
+def test_unsupported_conditions_fall_back_to_sympy(native_engine):
+    assert(simplify_condition('isEmpty(foo)') == 'isEmpty(foo)')
+    many_atoms = ' OR '.join(f'a{i}' for i in range(20))
+    assert(simplify_condition(many_atoms) == ' OR '.join(sorted(many_atoms.split(' OR '))))
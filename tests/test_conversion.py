@@ -2,10 +2,12 @@
 # Copyright (C) 2022 The Qt Company Ltd.
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
-from qmake2cmake.pro2cmake import Scope, SetOperation, merge_scopes, recursive_evaluate_scope
+from qmake2cmake.conversion_context import ConversionContext
+from qmake2cmake.pro2cmake import Scope, SetOperation, convert_project, merge_scopes, recursive_evaluate_scope
 from qmake2cmake.pro2cmake import main as convert_qmake_to_cmake
 from tempfile import TemporaryDirectory
 
+import concurrent.futures
 import filecmp
 import functools
 import os
@@ -13,10 +15,11 @@ import pathlib
 import pytest
 import re
 import shutil
+import subprocess
 import sys
 import tempfile
 
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
 
 debug_mode = bool(os.environ.get("DEBUG_QMAKE2CMAKE_TEST_CONVERSION"))
 test_script_dir = pathlib.Path(__file__).parent.resolve()
@@ -31,14 +34,15 @@ def compare_expected_output_directories(actual: str, expected: str):
 def convert(base_name: str,
             *,
             min_qt_version: str = default_min_qt_version,
-            after_conversion_hook: Optional[Callable[[str], None]] = None):
-    '''Converts {base_name}.pro to CMake in a temporary directory.
+            after_conversion_hook: Optional[Callable[[str], None]] = None,
+            data_dir: pathlib.Path = test_data_dir):
+    '''Converts {base_name}.pro in data_dir to CMake in a temporary directory.
 
     The optional after_conversion_hook is a function that takes the temporary directory as
     parameter.  It is called after the conversion took place.
     '''
     pro_file_name = str(base_name) + ".pro"
-    pro_file_path = test_data_dir.joinpath(pro_file_name)
+    pro_file_path = data_dir.joinpath(pro_file_name)
     assert(pro_file_path.exists())
     with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
         tmp_dir = pathlib.Path(tmp_dir_str)
@@ -62,11 +66,13 @@ def convert(base_name: str,
         return content
 
 
-def convert_and_compare_expected_output(pro_base_name: str, rel_expected_output_dir: str):
+def convert_and_compare_expected_output(pro_base_name: str, rel_expected_output_dir: str,
+                                        data_dir: pathlib.Path = test_data_dir):
     abs_expected_output_dir = test_data_dir.joinpath(rel_expected_output_dir)
     convert(pro_base_name,
             after_conversion_hook=functools.partial(compare_expected_output_directories,
-                                                    expected=abs_expected_output_dir))
+                                                    expected=abs_expected_output_dir),
+            data_dir=data_dir)
 
 
 def test_qt_modules():
@@ -98,9 +104,11 @@ def test_qt_version_check():
     assert(["if(( ( (QT_VERSION_MAJOR GREATER 5) ) AND (QT_VERSION_MINOR LESS 1) ) AND (QT_VERSION_PATCH EQUAL 0))", "if(( ( (QT_VERSION VERSION_GREATER 6.6.5) ) AND (QT_VERSION VERSION_LESS 6.6.7) ) AND (QT_VERSION VERSION_EQUAL 6.6.6))"] == interesting_lines)
 
 
-def test_subdirs():
+def test_subdirs(tmp_path):
     '''Test conversion of a TEMPLATE=subdirs project.'''
-    convert_and_compare_expected_output("subdirs/subdirs", "subdirs/expected")
+    # The conversion writes subdir markers next to the subprojects, so convert a copy.
+    shutil.copytree(test_data_dir.joinpath("subdirs"), tmp_path.joinpath("subdirs"))
+    convert_and_compare_expected_output("subdirs/subdirs", "subdirs/expected", data_dir=tmp_path)
 
 
 def test_common_project_types():
@@ -275,3 +283,96 @@ qt_generate_deploy_qml_app_script(
 )
 install(SCRIPT ${deploy_script})
 """ in output)
+
+
+convert_project_base_names = ["app", "app_qml_module", "lib_shared", "plugin_static",
+                              "qt_version_check", "required_qt_modules"]
+
+
+def test_convert_project_matches_command_line(tmp_path, monkeypatch):
+    '''convert_project resolves paths against the project, not the working directory.'''
+    expected = {base_name: convert(base_name, min_qt_version="6.3")
+                for base_name in convert_project_base_names}
+    monkeypatch.chdir(tmp_path)
+    for base_name in convert_project_base_names:
+        context = ConversionContext(min_qt_version="6.3")
+        pro_file_path = str(test_data_dir.joinpath(base_name + ".pro"))
+        assert convert_project(pro_file_path, context) == expected[base_name]
+        assert os.getcwd() == str(tmp_path)
+
+
+def test_convert_project_in_threads():
+    '''Concurrent conversions with their own contexts don't affect each other.'''
+    def convert_in_context(base_name: str) -> Tuple[str, int]:
+        context = ConversionContext(min_qt_version="6.3")
+        output = convert_project(str(test_data_dir.joinpath(base_name + ".pro")), context)
+        return output, context.next_scope_id
+
+    expected = [convert_in_context(base_name) for base_name in convert_project_base_names]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        for _ in range(3):
+            assert list(pool.map(convert_in_context, convert_project_base_names)) == expected
+
+
+def test_convert_project_sees_new_directories(tmp_path):
+    '''Later conversions don't reuse the directory listings of earlier ones.'''
+    pro_file_path = tmp_path.joinpath("subdirs.pro")
+    pro_file_path.write_text("TEMPLATE = subdirs\nSUBDIRS = foo\n")
+    reused_context = ConversionContext(min_qt_version="6.3")
+    for context in [None, reused_context]:
+        assert "add_subdirectory(foo)" not in convert_project(str(pro_file_path), context)
+    tmp_path.joinpath("foo").mkdir()
+    tmp_path.joinpath("foo", "foo.pro").write_text("SOURCES = main.cpp\n")
+    for context in [None, reused_context]:
+        assert "add_subdirectory(foo)" in convert_project(str(pro_file_path), context)
+
+
+def test_write_if_changed(tmp_path):
+    '''Unchanged output files are not touched.'''
+    pro_file_path = str(test_data_dir.joinpath("app.pro"))
+    output_file_path = tmp_path.joinpath("CMakeLists.txt")
+    arguments = ["--write-if-changed", "-o", str(output_file_path), pro_file_path,
+                 "--min-qt-version", default_min_qt_version]
+    convert_qmake_to_cmake(arguments)
+    assert output_file_path.read_text() == convert("app")
+    output_file_path.chmod(0o640)
+    first_stat = output_file_path.stat()
+
+    convert_qmake_to_cmake(arguments)
+    second_stat = output_file_path.stat()
+    assert (second_stat.st_ino, second_stat.st_mtime_ns) == (first_stat.st_ino,
+                                                             first_stat.st_mtime_ns)
+
+    output_file_path.write_text(output_file_path.read_text().replace("app", "ppa"))
+    convert_qmake_to_cmake(arguments)
+    assert output_file_path.read_text() == convert("app")
+    assert output_file_path.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in tmp_path.iterdir()] == ["CMakeLists.txt"]
+
+
+@pytest.mark.parametrize("merge", ["builtin", "git"])
+def test_special_case_preservation(tmp_path, merge):
+    '''Lines marked as special cases are kept when the project is converted again.'''
+    if shutil.which("git") is None:
+        if merge == "git":
+            pytest.skip("git is not in PATH")
+    else:
+        subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    pro_file_path = tmp_path.joinpath("app.pro")
+    pro_file_path.write_text("TEMPLATE = app\nSOURCES = main.cpp\n")
+    arguments = ["-s", "--special-case-merge", merge, str(pro_file_path),
+                 "--min-qt-version", default_min_qt_version]
+    convert_qmake_to_cmake(arguments)
+    output_file_path = tmp_path.joinpath("CMakeLists.txt")
+    output_file_path.write_text(output_file_path.read_text().replace(
+        "    main.cpp\n", "    main.cpp\n    extra.cpp # special case\n"))
+
+    pro_file_path.write_text("TEMPLATE = app\nSOURCES = main.cpp\nQT += network\n")
+    convert_qmake_to_cmake(arguments)
+    output = output_file_path.read_text()
+    assert "    extra.cpp # special case\n" in output
+    assert "Qt::Network" in output
+    assert "<<<<<<<" not in output
+    assert "extra.cpp" not in tmp_path.joinpath(".prev_CMakeLists.txt").read_text()
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name != ".git") == [
+        ".prev_CMakeLists.txt", "CMakeLists.txt", "app.pro"]
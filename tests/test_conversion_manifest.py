@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake.conversion_manifest import get_manifest_path, read_conversion_manifest
+from qmake2cmake.pro2cmake import main as convert_qmake_to_cmake
+
+import pytest
+
+default_min_qt_version = "6.2.0"
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / 'app.pro').write_text('SOURCES = main.cpp\ninclude(common.pri)\n')
+    (tmp_path / 'common.pri').write_text('QT += network\n')
+    (tmp_path / 'main.cpp').write_text('int main() { return 0; }\n')
+    return tmp_path
+
+
+def convert(project, capsys, *extra_args: str) -> bool:
+    '''Converts app.pro incrementally and returns whether it was converted.'''
+    convert_qmake_to_cmake(['--incremental', '--min-qt-version', default_min_qt_version,
+                            *extra_args, str(project / 'app.pro')])
+    return 'it is up to date' not in capsys.readouterr().out
+
+
+def test_manifest_records_inputs(project, capsys):
+    assert convert(project, capsys)
+    output_file_path = str(project / 'CMakeLists.txt')
+    manifest = read_conversion_manifest(output_file_path)
+    assert manifest is not None
+    assert get_manifest_path(output_file_path) == str(project / '.qmake2cmake'
+                                                      / 'CMakeLists.txt.manifest.json')
+    assert {str(project / name) for name in ['app.pro', 'common.pri', 'CMakeLists.txt']} \
+        <= set(manifest.files)
+    assert manifest.options['min_qt_version'] == default_min_qt_version
+
+
+def test_unchanged_project_is_skipped(project, capsys):
+    assert convert(project, capsys)
+    mtime = (project / 'CMakeLists.txt').stat().st_mtime_ns
+    assert not convert(project, capsys)
+    assert (project / 'CMakeLists.txt').stat().st_mtime_ns == mtime
+
+
+def test_changed_include_is_converted(project, capsys):
+    assert convert(project, capsys)
+    (project / 'common.pri').write_text('QT += network sql\n')
+    assert convert(project, capsys)
+    assert 'Qt::Sql' in (project / 'CMakeLists.txt').read_text()
+    assert not convert(project, capsys)
+
+
+def test_added_file_is_converted(project, capsys):
+    (project / 'app.pro').write_text('VPATH = src\nSOURCES = main.cpp other.cpp\n')
+    (project / 'src').mkdir()
+    assert convert(project, capsys)
+    assert 'other.cpp-NOTFOUND' in (project / 'CMakeLists.txt').read_text()
+    (project / 'src' / 'other.cpp').write_text('void other() {}\n')
+    assert convert(project, capsys)
+    assert 'src/other.cpp' in (project / 'CMakeLists.txt').read_text()
+
+
+def test_changed_options_or_output_are_converted(project, capsys):
+    assert convert(project, capsys)
+    assert convert(project, capsys, '--min-qt-version', '6.5.0')
+    output_file_path = project / 'CMakeLists.txt'
+    output_file_path.write_text(output_file_path.read_text() + '# edited\n')
+    assert convert(project, capsys, '--min-qt-version', '6.5.0')
+    assert '# edited' not in output_file_path.read_text()
+
+
+def test_added_conf_file_is_converted(tmp_path, capsys):
+    project = tmp_path / 'app'
+    project.mkdir()
+    (project / 'app.pro').write_text('SOURCES = main.cpp\n')
+    assert convert(project, capsys)
+    assert not convert(project, capsys)
+    (tmp_path / '.qmake.conf').write_text('MODULE_VERSION = 6.5.0\n')
+    assert convert(project, capsys)
+    assert not convert(project, capsys)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake import directory_cache
+from qmake2cmake.directory_cache import (
+    clear_directory_cache,
+    invalidate_directory,
+    path_exists,
+    path_isdir,
+    path_isfile,
+)
+from qmake2cmake.pro2cmake import handle_vpath, is_marked_as_subdir, write_subdir_marker
+
+import os
+import pytest
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'main.cpp').write_text('')
+    (tmp_path / 'other').mkdir()
+    (tmp_path / 'other' / 'util.cpp').write_text('')
+    monkeypatch.chdir(tmp_path)
+    clear_directory_cache()
+    yield tmp_path
+    clear_directory_cache()
+
+
+def test_lookups_match_os_path(tree):
+    for path in ['src', 'src/', 'src/main.cpp', 'src/main.cpp/', './src/../other/util.cpp',
+                 str(tree / 'other'), 'missing', 'missing/main.cpp', 'src/missing.cpp', '', '/',
+                 'SRC', 'src/Main.cpp', 'Src/MAIN.CPP/']:
+        assert path_exists(path) == os.path.exists(path), path
+        assert path_isdir(path) == os.path.isdir(path), path
+        assert path_isfile(path) == os.path.isfile(path), path
+
+
+def test_parent_of_symbolic_link(tree):
+    (tree / 'deep' / 'inner').mkdir(parents=True)
+    (tree / 'deep' / 'deep.cpp').write_text('')
+    (tree / 'link').symlink_to(tree / 'deep' / 'inner', target_is_directory=True)
+    for path in ['link/../deep.cpp', 'link/../inner', 'link/../../other/util.cpp',
+                 'src/../link/../deep.cpp', str(tree / 'link' / '..' / 'deep.cpp')]:
+        assert path_exists(path) == os.path.exists(path), path
+        assert path_isdir(path) == os.path.isdir(path), path
+        assert path_isfile(path) == os.path.isfile(path), path
+
+
+def test_directories_are_listed_once(tree, monkeypatch):
+    listed = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(directory_cache.os, 'scandir', counting_scandir)
+    assert handle_vpath('util.cpp', 'src', ['other']) == '../other/util.cpp'
+    assert handle_vpath('main.cpp', 'src', ['other']) == 'main.cpp'
+    assert path_isfile('other/util.cpp')
+    assert sorted(listed) == [str(tree / 'other'), str(tree / 'src')]
+
+
+def test_listings_are_invalidated(tree):
+    assert not path_exists('src/new.cpp')
+    (tree / 'src' / 'new.cpp').write_text('')
+    assert not path_exists('src/new.cpp')
+    invalidate_directory('src')
+    assert path_exists('src/new.cpp')
+
+    assert not is_marked_as_subdir('src')
+    write_subdir_marker('src', 'parent.pro')
+    assert is_marked_as_subdir('src')
+
+
+def test_subdir_marker_in_new_nested_directory(tree):
+    # The listings of all directories created for the marker must be refreshed.
+    assert not path_exists('new')
+    assert not is_marked_as_subdir('new/nested')
+    write_subdir_marker('new/nested', 'parent.pro')
+    assert path_isdir('new/nested')
+    assert is_marked_as_subdir('new/nested')
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake import qmake_parser_cache
+from qmake2cmake.qmake_fast_parser import (
+    UnsupportedSyntaxError,
+    find_fast_parser_mismatch,
+    parse_statements,
+    parseProFileContentsFast,
+)
+from qmake2cmake.qmake_parser import parseProFileContents
+
+import glob
+import os
+import pytest
+
+
+_tests_path = os.path.dirname(os.path.abspath(__file__))
+_data_files = sorted(glob.glob(_tests_path + '/data/**/*.pr[oi]', recursive=True))
+
+
+def reference_statements(contents):
+    result, massaged_contents = parseProFileContents(contents)
+    return result.asDict().get('statements'), massaged_contents
+
+
+def validate_snippet(contents):
+    expected, expected_contents = reference_statements(contents)
+    statements, massaged_contents = parseProFileContentsFast(contents)
+    assert(statements == expected)
+    assert(massaged_contents == expected_contents)
+    return statements
+
+
+@pytest.mark.parametrize('file', _data_files, ids=lambda f: os.path.relpath(f, _tests_path))
+def test_data_files_match_reference_parser(file):
+    with open(file, 'r') as file_fd:
+        contents = file_fd.read()
+    expected, expected_contents = reference_statements(contents)
+    statements, massaged_contents = parseProFileContentsFast(contents)
+    assert(statements == expected)
+    assert(massaged_contents == expected_contents)
+
+
+def test_empty_and_comment_only_files():
+    assert(validate_snippet('') == [])
+    assert(validate_snippet('# just a comment\n\n') == [])
+
+
+def test_tabs_are_expanded_like_pyparsing():
+    validate_snippet('SOURCES += \\\n\tfoo.cpp \\\n\tbar.cpp\n\tunix {\n\tLIBS += -lm\n}\n')
+
+
+def test_comments_after_statements():
+    validate_snippet('A = 1 # comment\nunix { # comment\n    B = 2 # comment\n} # comment\n')
+
+
+def test_else_chains():
+    validate_snippet('win32 {\n    A = 1\n} else: unix {\n    A = 2\n} else {\n    A = 3\n}\n')
+    validate_snippet('linux: A = 1\nelse: B = 2\n')
+
+
+def test_conditions_and_function_calls():
+    validate_snippet('!win32|qtConfig(foo):contains(QT, gui):!isEmpty(X) {\n    A = $$f(a b)\n}\n')
+    validate_snippet('include($$PWD/../foo.pri)\nload(qt_module)\nqtConfig(x): A += "a b" c\n')
+
+
+def test_unsupported_syntax_falls_back_to_reference_parser():
+    contents = 'A = "x\\"y" b\n'
+    with pytest.raises(UnsupportedSyntaxError):
+        parseProFileContentsFast(contents)
+    assert(parse_statements(contents) == reference_statements(contents))
+    # Inputs the fast parser does not handle are not reported as mismatches.
+    assert(find_fast_parser_mismatch(contents, reference_statements(contents)[0]) is None)
+
+
+def test_mismatches_are_reported():
+    contents = 'A = 1\n'
+    expected, _ = reference_statements(contents)
+    assert(find_fast_parser_mismatch(contents, expected) is None)
+    assert(find_fast_parser_mismatch('A = 2\n', expected) is not None)
+
+
+def test_parser_backend_selection(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(qmake_parser_cache, 'get_parse_cache_location', lambda: str(tmp_path))
+    monkeypatch.setattr(qmake_parser_cache, '_in_memory_cache', {})
+    contents = 'SOURCES += a.cpp\nunix: LIBS += -lm\n'
+    expected = reference_statements(contents)
+
+    try:
+        for backend in qmake_parser_cache.parser_backends:
+            qmake_parser_cache.set_parser_backend(backend)
+            assert(qmake_parser_cache.parseProFileContentsStatements(contents) == expected)
+    finally:
+        qmake_parser_cache.set_parser_backend('pyparsing')
+    assert('Parser mismatch' not in capsys.readouterr().out)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake import helper
+from qmake2cmake.helper import (
+    LibraryMapping,
+    clear_registered_library_mappings,
+    find_3rd_party_library_mapping,
+    find_annotated_qmake_lib_name,
+    find_library_info_for_target,
+    find_qt_library_mapping,
+    load_library_mappings,
+    map_3rd_party_library,
+    map_qt_library,
+    register_library_mappings,
+)
+from qmake2cmake.pro2cmake import map_condition
+
+import json
+import pytest
+import sys
+
+
+@pytest.fixture
+def registered_mappings():
+    yield
+    clear_registered_library_mappings()
+
+
+def _first(mappings, predicate):
+    return next((mapping for mapping in mappings if predicate(mapping)), None)
+
+
+def test_indexes_match_linear_search():
+    for mapping in helper._library_map + helper._qt_library_map:
+        so_name = mapping.soName
+        assert find_3rd_party_library_mapping(so_name) is _first(
+            helper._library_map, lambda m: m.soName == so_name)
+        assert find_qt_library_mapping(so_name) is _first(
+            helper._qt_library_map, lambda m: m.soName == so_name)
+        if mapping.targetName:
+            target_name = mapping.targetName
+            qt_target_name = target_name[:-7] if target_name.endswith('Private') else target_name
+            expected = _first(helper._qt_library_map, lambda m: m.targetName == qt_target_name) or \
+                _first(helper._library_map, lambda m: m.targetName == target_name)
+            assert find_library_info_for_target(target_name) is expected
+    assert find_library_info_for_target('Qt::CorePrivate') is find_qt_library_mapping('core')
+    assert find_annotated_qmake_lib_name('openssl_headers') == 'openssl/nolink'
+    assert find_annotated_qmake_lib_name('zlib') == 'zlib'
+    assert find_3rd_party_library_mapping('no_such_library') is None
+
+
+def test_load_library_mappings(tmp_path, registered_mappings):
+    mapping_file = tmp_path / 'mappings.json'
+    mapping_file.write_text(json.dumps({
+        'libraries': [
+            {'soName': 'inhouse', 'packageName': 'InHouse', 'targetName': 'InHouse::InHouse'},
+            {'soName': 'zlib', 'packageName': 'MyZLIB', 'targetName': 'MyZLIB::MyZLIB'},
+        ],
+        'qt_libraries': [
+            {'soName': 'inhousewidgets', 'packageName': 'Qt6', 'targetName': 'Qt::InHouseWidgets',
+             'components': ['InHouseWidgets']},
+        ],
+    }))
+    load_library_mappings(str(mapping_file))
+    # Loading the same file again doesn't add duplicates.
+    load_library_mappings(str(mapping_file))
+
+    assert map_3rd_party_library('inhouse') == 'InHouse::InHouse'
+    assert map_3rd_party_library('zlib') == 'MyZLIB::MyZLIB'
+    assert map_qt_library('inhousewidgets-private') == 'Qt::InHouseWidgetsPrivate'
+    assert find_library_info_for_target('Qt::InHouseWidgetsPrivate').soName == 'inhousewidgets'
+    assert find_library_info_for_target('InHouse::InHouse').packageName == 'InHouse'
+
+    clear_registered_library_mappings()
+    assert map_3rd_party_library('inhouse') == 'inhouse'
+    assert map_3rd_party_library('zlib') == 'WrapZLIB::WrapZLIB'
+
+
+def test_load_toml_library_mappings_with_tomli(tmp_path, registered_mappings, monkeypatch):
+    tomllib = pytest.importorskip('tomllib')
+    # Before Python 3.11, the tomli package provides the same parser.
+    monkeypatch.setitem(sys.modules, 'tomllib', None)
+    monkeypatch.setitem(sys.modules, 'tomli', tomllib)
+    mapping_file = tmp_path / 'mappings.toml'
+    mapping_file.write_text('[[libraries]]\n'
+                            'soName = "inhouse"\npackageName = "InHouse"\n'
+                            'targetName = "InHouse::InHouse"\n')
+    load_library_mappings(str(mapping_file))
+    assert map_3rd_party_library('inhouse') == 'InHouse::InHouse'
+
+    monkeypatch.setitem(sys.modules, 'tomli', None)
+    with pytest.raises(ValueError):
+        load_library_mappings(str(mapping_file))
+
+
+def test_registered_platform_specific_mappings(registered_mappings):
+    register_library_mappings([
+        LibraryMapping('xcb_inhouse', 'XCB_InHouse', 'XCB::InHouse'),
+        LibraryMapping('wayland-inhouse', 'Wayland', 'Wayland::InHouse'),
+        LibraryMapping('xkbinhouse', 'XKB_InHouse', 'XKB::InHouse', emit_if='UNIX'),
+        LibraryMapping('inhouse', 'InHouse', 'InHouse::InHouse'),
+    ])
+    # Like the built-in mappings, unless the condition is given explicitly.
+    assert find_3rd_party_library_mapping('xcb_inhouse').emit_if == 'X11_SUPPORTED'
+    assert find_3rd_party_library_mapping('wayland-inhouse').emit_if == 'config.linux'
+    assert find_3rd_party_library_mapping('xkbinhouse').emit_if == 'UNIX'
+    assert find_3rd_party_library_mapping('inhouse').emit_if == ''
+    assert find_3rd_party_library_mapping('xcb').emit_if == 'X11_SUPPORTED'
+
+
+def test_invalid_library_mapping_files(tmp_path):
+    mapping_file = tmp_path / 'mappings.json'
+    mapping_file.write_text(json.dumps({'libraries': [{'soName': 'foo', 'package': 'Foo'}]}))
+    with pytest.raises(ValueError):
+        load_library_mappings(str(mapping_file))
+    mapping_file.write_text(json.dumps([{'soName': 'foo'}]))
+    with pytest.raises(ValueError):
+        load_library_mappings(str(mapping_file))
+    assert find_3rd_party_library_mapping('foo') is None
+
+
+def test_map_condition_uses_registered_mappings(registered_mappings):
+    condition = 'qtConfig(system-inhouse) AND qtHaveModule(inhousewidgets)'
+    assert map_condition(condition) == \
+        'QT_FEATURE_system_inhouse AND TARGET inhousewidgets'
+    register_library_mappings([LibraryMapping('inhouse', 'InHouse', 'InHouse::InHouse')])
+    register_library_mappings([LibraryMapping('inhousewidgets', 'Qt6', 'Qt::InHouseWidgets',
+                                              components=['InHouseWidgets'])], qt=True)
+    assert map_condition(condition) == 'ON AND TARGET Qt::InHouseWidgets'
+    clear_registered_library_mappings()
+    assert map_condition(condition) == \
+        'QT_FEATURE_system_inhouse AND TARGET inhousewidgets'
@@ -2,7 +2,9 @@
 # Copyright (C) 2018 The Qt Company Ltd.
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
-from qmake2cmake.condition_simplifier import simplify_condition
+from qmake2cmake import condition_simplifier
+from qmake2cmake.condition_simplifier import canonicalize_condition, simplify_condition
+from qmake2cmake.conversion_context import get_conversion_context
 
 
 def validate_simplify(input: str, expected: str) -> None:
@@ -158,3 +160,38 @@ def test_simplify_complex_false():
 
 def test_simplify_android_not_apple():
     validate_simplify('ANDROID AND NOT MACOS', 'ANDROID')
+
+
+def test_canonicalize_equivalent_spellings():
+    for condition in ['A AND B', '(A) AND (B)', '(B) AND (A)', ' B  AND A ', 'A AND (B AND A)']:
+        assert canonicalize_condition(condition) == 'A AND B'
+    assert canonicalize_condition('C AND (B OR A)') == '(A OR B) AND C'
+    assert canonicalize_condition('(C AND B) OR A') == 'A OR B AND C'
+    assert canonicalize_condition('NOT (B OR A)') == 'NOT (A OR B)'
+    assert canonicalize_condition('NOT(A)') == 'NOT A'
+
+
+def test_canonicalize_keeps_other_conditions():
+    for condition in ['', 'TARGET Foo::Bar AND B', 'a STREQUAL b', 'isEmpty(foo)', 'A AND', '(A']:
+        assert canonicalize_condition(condition) == condition
+
+
+def test_simplify_unsimplifiable_condition_is_kept_as_written():
+    validate_simplify('QT_VERSION_MAJOR GREATER 5 AND (B)', 'QT_VERSION_MAJOR GREATER 5 AND (B)')
+    validate_simplify('(B) AND I', '(B) AND I')
+    validate_simplify('I AND B', 'I AND B')
+
+
+def test_simplify_condition_over_atom_budget(monkeypatch, capsys):
+    monkeypatch.setattr(condition_simplifier, 'condition_simplifier_max_atoms', 3)
+    monkeypatch.setattr(get_conversion_context(), 'project_file_path', '/p/foo.pro')
+    validate_simplify('(D OR C) OR (B OR A) OR A', 'A OR B OR C OR D')
+    assert 'foo.pro: Not simplifying condition that has 4 atoms, more than 3' in capsys.readouterr().out
+    validate_simplify('B AND A AND B', 'A AND B')
+
+
+def test_simplify_condition_over_time_budget(monkeypatch, capsys):
+    monkeypatch.setattr(get_conversion_context(), 'condition_simplifier_cache_enabled', False)
+    monkeypatch.setattr(condition_simplifier, 'condition_simplifier_timeout', 1e-9)
+    validate_simplify('(y2 AND x1) OR (x1 AND y1) OR WIN32', 'WIN32 OR x1 AND y1 OR x1 AND y2')
+    assert 'Not simplifying condition that took longer than' in capsys.readouterr().out
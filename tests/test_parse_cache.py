@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake import qmake_parser_cache
+from qmake2cmake.qmake_parser import parseProFile
+
+import glob
+import os
+import pytest
+
+
+_tests_path = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def parse_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(qmake_parser_cache, "get_parse_cache_location", lambda: str(tmp_path))
+    monkeypatch.setattr(qmake_parser_cache, "_in_memory_cache", {})
+    return tmp_path
+
+
+def test_cached_statements_match_parser(parse_cache_dir):
+    for file in sorted(glob.glob(_tests_path + '/data/**/*.pro', recursive=True)):
+        parse_result, contents = parseProFile(file)
+        expected = parse_result.asDict().get('statements')
+
+        # The first call fills the cache, the second one is served from memory.
+        assert(qmake_parser_cache.parseProFileStatements(file) == (expected, contents))
+        assert(qmake_parser_cache.parseProFileStatements(file) == (expected, contents))
+
+
+def test_unchanged_file_is_not_parsed_again(parse_cache_dir, monkeypatch):
+    file = _tests_path + '/data/complex_values.pro'
+    statements, contents = qmake_parser_cache.parseProFileStatements(file)
+    assert(len(list(parse_cache_dir.glob('*/*.json'))) == 1)
+
+    def fail(*args, **kwargs):
+        assert False, "the parser should not be called for cached contents"
+
+    # Simulate a new process, which only has the on-disk cache.
+    monkeypatch.setattr(qmake_parser_cache, "_in_memory_cache", {})
+    monkeypatch.setattr(qmake_parser_cache, "parseProFileContents", fail)
+    assert(qmake_parser_cache.parseProFileStatements(file) == (statements, contents))
+
+
+def test_cached_statements_are_not_shared(parse_cache_dir):
+    file = _tests_path + '/data/complex_values.pro'
+    first, _ = qmake_parser_cache.parseProFileStatements(file)
+    second, _ = qmake_parser_cache.parseProFileStatements(file)
+    assert(first == second)
+    assert(first is not second)
+    first.append({})
+    assert(first != second)
+
+
+@pytest.mark.parametrize('corrupt_contents', ['{"statements": [', '{}', '[]'])
+def test_corrupt_entry_is_parsed_again(parse_cache_dir, monkeypatch, corrupt_contents):
+    file = _tests_path + '/data/complex_values.pro'
+    statements, contents = qmake_parser_cache.parseProFileStatements(file)
+    [cache_file] = parse_cache_dir.glob('*/*.json')
+    cache_file.write_text(corrupt_contents)
+
+    monkeypatch.setattr(qmake_parser_cache, "_in_memory_cache", {})
+    assert(qmake_parser_cache.parseProFileStatements(file) == (statements, contents))
+    # The entry was replaced by a valid one.
+    monkeypatch.setattr(qmake_parser_cache, "_in_memory_cache", {})
+    assert(qmake_parser_cache.parseProFileStatements(file) == (statements, contents))
+    assert(cache_file.read_text() != corrupt_contents)
+
+
+def test_failed_write_leaves_no_temporary_file(parse_cache_dir, monkeypatch, capsys):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    file = _tests_path + '/data/complex_values.pro'
+    statements, contents = qmake_parser_cache.parseProFileStatements(file)
+    assert(statements is not None)
+    assert("Failed to write pro2cmake parse cache entry" in capsys.readouterr().out)
+    assert([path for path in parse_cache_dir.rglob('*') if path.is_file()] == [])
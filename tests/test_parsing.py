@@ -3,8 +3,9 @@
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
 import os
-from qmake2cmake.pro2cmake import map_condition
-from qmake2cmake.qmake_parser import QmakeParser
+import pyparsing as pp
+from qmake2cmake.pro2cmake import _map_condition_part, _rewrite_condition, map_condition
+from qmake2cmake.qmake_parser import LineOffsetIndex, QmakeParser, get_qmake_parser
 from qmake2cmake.condition_simplifier import simplify_condition
 
 
@@ -343,3 +344,39 @@ def test_condition_operator_precedence():
     validate_simplify(result[0]["condition"], "a1 OR a2")
     validate_simplify(result[1]["condition"], "b3 AND (b1 OR b2)")
     validate_simplify(result[2]["condition"], "c4 OR (c1 AND c3) OR (c2 AND c3)")
+
+
+def test_shared_parser_is_reusable():
+    parser = get_qmake_parser()
+    assert parser is get_qmake_parser()
+
+    file = _tests_path + '/data/condition_operator_precedence.pro'
+    expected = QmakeParser().parseFile(file)[0].asDict()
+    for _ in range(2):
+        # Parse something else in between, so that no state can leak
+        # from one condition to the next one.
+        parser.parseFile(_tests_path + '/data/complex_condition.pro')
+        assert parser.parseFile(file)[0].asDict() == expected
+
+
+def test_line_offset_index_matches_pyparsing():
+    for contents in ['', 'a', '\n', 'a\nb', 'a\n\nb\n', '\n\nfoo = bar\n  baz\n']:
+        index = LineOffsetIndex(contents)
+        for loc in range(len(contents) + 2):
+            assert index.lineno(loc) == pp.lineno(loc, contents)
+
+
+def test_map_condition_plain_conditions_skip_rewrites():
+    def rewritten(condition):
+        # What map_condition returns without the shortcut for plain
+        # conditions.
+        condition = _rewrite_condition(condition).replace("cross_compile", "CMAKE_CROSSCOMPILING")
+        return " ".join(_map_condition_part(part) for part in condition.split())
+
+    for condition in ['unix', '!win32', 'unix|win32', '(linux|macos) !android', 'qtConfig(foo-bar)',
+                      'qtHaveModule(gui)', 'cross_compile', 'mytrue false', 'x86', 'x86_64|arm64-v8a',
+                      'no-png', 'if(unix)', 'isEmpty (FOO)', 'contains(CONFIG, static)',
+                      'equals(QT_MAJOR_VERSION, 6)', 'win32-*|*-g++*']:
+        assert map_condition(condition) == rewritten(condition), condition
+    assert map_condition('!unix|qtConfig(cross_compile)') == 'NOT UNIX OR QT_FEATURE_CMAKE_CROSSCOMPILING'
+    assert map_condition('x86') == 'TEST_architecture_arch STREQUAL i386'
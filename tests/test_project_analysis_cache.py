@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake import cache_records, pro2cmake, project_analysis_cache
+from qmake2cmake.helper import (
+    LibraryMapping,
+    clear_registered_library_mappings,
+    register_library_mappings,
+)
+from qmake2cmake.pro2cmake import analyze_subproject
+from qmake2cmake.project_analysis_cache import (
+    clear_project_analysis_cache,
+    set_persistent_analysis_cache_enabled,
+)
+
+import pytest
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    (tmp_path / 'leaf').mkdir()
+    (tmp_path / 'leaf' / 'leaf.pro').write_text('TEMPLATE = lib\nQT += network\ninclude(common.pri)\n')
+    (tmp_path / 'leaf' / 'common.pri').write_text('unix: QMAKE_USE += zlib\n')
+    (tmp_path / 'top.pro').write_text('TEMPLATE = subdirs\nSUBDIRS = leaf other\nother.file = leaf/leaf.pro\n')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(project_analysis_cache, 'get_parse_cache_location',
+                        lambda: str(tmp_path / 'cache' / 'parse'))
+    clear_project_analysis_cache()
+    yield tmp_path
+    clear_project_analysis_cache()
+    set_persistent_analysis_cache_enabled(False)
+
+
+@pytest.fixture
+def analyzed_files(monkeypatch):
+    files = []
+    parse = pro2cmake.parseProFileContentsStatements
+
+    def counting_parse(contents):
+        files.append(contents.split('\n')[0])
+        return parse(contents)
+
+    monkeypatch.setattr(pro2cmake, 'parseProFileContentsStatements', counting_parse)
+    return files
+
+
+def test_analysis_is_reused(project, analyzed_files):
+    analysis = analyze_subproject('top.pro')
+    assert analysis.template == 'subdirs'
+    assert analysis.subdirs == ['leaf', 'leaf/leaf.pro']
+    assert analyze_subproject('top.pro') is analysis
+
+    leaf_analysis = analyze_subproject('leaf/leaf.pro')
+    assert leaf_analysis.template == 'lib'
+    assert leaf_analysis.required_libs == ['Qt::Core', 'Qt::Gui', 'Qt::Network']
+    assert leaf_analysis.optional_libs == ['WrapZLIB::WrapZLIB']
+    assert analyze_subproject(str(project / 'leaf' / 'leaf.pro')) is leaf_analysis
+    assert len(analyzed_files) == 2
+
+    # Changing an included file invalidates the analysis.
+    (project / 'leaf' / 'common.pri').write_text('')
+    leaf_analysis = analyze_subproject('leaf/leaf.pro')
+    assert leaf_analysis.optional_libs == []
+    assert len(analyzed_files) == 3
+
+    # So do changes of the library mappings.
+    register_library_mappings([LibraryMapping('network', 'MyQt', 'MyQt::Network')], qt=True)
+    try:
+        assert 'MyQt::Network' in analyze_subproject('leaf/leaf.pro').required_libs
+    finally:
+        clear_registered_library_mappings()
+    assert len(analyzed_files) == 4
+
+
+def test_persistent_analysis_cache(project, analyzed_files):
+    set_persistent_analysis_cache_enabled(True)
+    analysis = analyze_subproject('leaf/leaf.pro')
+    clear_project_analysis_cache()
+    cached_analysis = analyze_subproject('leaf/leaf.pro')
+    assert vars(cached_analysis) == vars(analysis)
+    assert len(analyzed_files) == 1
+
+    (project / 'leaf' / 'leaf.pro').write_text('TEMPLATE = app\n')
+    clear_project_analysis_cache()
+    assert analyze_subproject('leaf/leaf.pro').template == 'app'
+    assert len(analyzed_files) == 2
+
+
+def test_unchanged_files_are_not_hashed_again(project, analyzed_files, monkeypatch):
+    analysis = analyze_subproject('leaf/leaf.pro')
+    assert sorted(analysis.file_hashes) == [str(project / 'leaf' / 'common.pri'),
+                                            str(project / 'leaf' / 'leaf.pro')]
+
+    # The up to date check only compares the stat signatures of the files.
+    with monkeypatch.context() as m:
+        m.setattr(cache_records, 'hashlib', None)
+        assert analyze_subproject('leaf/leaf.pro') is analysis
+    assert len(analyzed_files) == 1
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake import project_analysis_cache
+from qmake2cmake.helper import clear_registered_library_mappings
+from qmake2cmake.project_analysis_cache import (
+    clear_project_analysis_cache,
+    lookup_project_analysis,
+    set_persistent_analysis_cache_enabled,
+)
+from qmake2cmake.run_pro2cmake import main as convert_all_qmake_to_cmake
+from qmake2cmake.run_pro2cmake import find_all_pro_files, parse_command_line, scan_template
+from tempfile import TemporaryDirectory
+
+import filecmp
+import pathlib
+import pytest
+import shutil
+import sys
+
+test_script_dir = pathlib.Path(__file__).parent.resolve()
+test_data_dir = test_script_dir.joinpath("data", "conversion")
+default_min_qt_version = "6.2.0"
+
+
+def convert_all(tmp_dir: pathlib.Path, monkeypatch, *extra_args: str):
+    monkeypatch.setattr(sys, "argv", ["qmake2cmake_all", "--min-qt-version",
+                                      default_min_qt_version, *extra_args, str(tmp_dir)])
+    convert_all_qmake_to_cmake()
+
+
+def test_pool_engine(monkeypatch, capsys):
+    '''Convert a whole subdirs tree with long-lived worker processes.'''
+    with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
+        tmp_dir = pathlib.Path(tmp_dir_str).joinpath("subdirs")
+        shutil.copytree(test_data_dir.joinpath("subdirs"), tmp_dir)
+        convert_all(tmp_dir, monkeypatch, "--engine", "pool")
+
+        assert(filecmp.cmp(tmp_dir.joinpath("CMakeLists.txt"),
+                           tmp_dir.joinpath("expected", "CMakeLists.txt"), shallow=False))
+        for lib in ["lib1", "lib2", "lib3"]:
+            with open(tmp_dir.joinpath(lib, "CMakeLists.txt"), "r") as f:
+                assert(f"qt_add_library({lib}\n" in f.read())
+
+    output = capsys.readouterr().out
+    assert("not successfully converted" not in output)
+
+
+def test_pool_engine_reports_failures(monkeypatch, capsys):
+    with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
+        tmp_dir = pathlib.Path(tmp_dir_str).joinpath("subdirs")
+        shutil.copytree(test_data_dir.joinpath("subdirs"), tmp_dir)
+        with open(tmp_dir.joinpath("lib2", "lib2.pro"), "a") as f:
+            f.write("SOURCES += (\n")
+        convert_all(tmp_dir, monkeypatch, "--engine", "pool")
+
+    output = capsys.readouterr().out
+    assert("The following files were not successfully converted (1 of 4):" in output)
+    # The main project parses its subprojects, so it fails first.
+    assert('"' + str(tmp_dir.joinpath("subdirs.pro")) + '"' in output)
+
+
+def test_pool_engine_reports_subproject_failures(monkeypatch, capsys):
+    with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
+        tmp_dir = pathlib.Path(tmp_dir_str).joinpath("subdirs")
+        shutil.copytree(test_data_dir.joinpath("subdirs"), tmp_dir)
+        # Not in the SUBDIRS of the main project, so only its own conversion in a worker
+        # process fails.
+        tmp_dir.joinpath("broken").mkdir()
+        with open(tmp_dir.joinpath("broken", "broken.pro"), "w") as f:
+            f.write("TEMPLATE = lib\nSOURCES += (\n")
+        convert_all(tmp_dir, monkeypatch, "--engine", "pool")
+
+        assert(filecmp.cmp(tmp_dir.joinpath("CMakeLists.txt"),
+                           tmp_dir.joinpath("expected", "CMakeLists.txt"), shallow=False))
+        for lib in ["lib1", "lib2", "lib3"]:
+            with open(tmp_dir.joinpath(lib, "CMakeLists.txt"), "r") as f:
+                assert(f"qt_add_library({lib}\n" in f.read())
+        assert(not tmp_dir.joinpath("broken", "CMakeLists.txt").exists())
+
+    output = capsys.readouterr().out
+    # The worker process reports the error of the conversion.
+    assert("in _convert_in_pool_worker" in output)
+    failures = output[output.index("The following files were not successfully converted"):]
+    assert(failures.startswith("The following files were not successfully converted (1 of 5):"))
+    assert(str(tmp_dir.joinpath("broken", "broken.pro")) in failures)
+    assert(str(tmp_dir.joinpath("subdirs.pro")) not in failures)
+
+
+def test_tree_engine(monkeypatch, capsys):
+    '''Convert a whole subdirs tree from an in-memory project graph.'''
+    with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
+        pool_dir = pathlib.Path(tmp_dir_str).joinpath("pool", "subdirs")
+        tree_dir = pathlib.Path(tmp_dir_str).joinpath("tree", "subdirs")
+        for output_dir in [pool_dir, tree_dir]:
+            shutil.copytree(test_data_dir.joinpath("subdirs"), output_dir,
+                            ignore=shutil.ignore_patterns(".qmake2cmake"))
+        convert_all(pool_dir, monkeypatch, "--engine", "pool")
+        convert_all(tree_dir, monkeypatch, "--engine", "tree")
+
+        assert(filecmp.cmp(tree_dir.joinpath("CMakeLists.txt"),
+                           tree_dir.joinpath("expected", "CMakeLists.txt"), shallow=False))
+        for lib in ["lib1", "lib2", "lib3"]:
+            assert(filecmp.cmp(tree_dir.joinpath(lib, "CMakeLists.txt"),
+                               pool_dir.joinpath(lib, "CMakeLists.txt"), shallow=False))
+            # The subprojects are known without marker files.
+            assert(not tree_dir.joinpath(lib, ".qmake2cmake").exists())
+
+    output = capsys.readouterr().out
+    assert("not successfully converted" not in output)
+
+
+def test_write_if_changed(monkeypatch, capsys):
+    with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
+        tmp_dir = pathlib.Path(tmp_dir_str).joinpath("subdirs")
+        shutil.copytree(test_data_dir.joinpath("subdirs"), tmp_dir,
+                        ignore=shutil.ignore_patterns(".qmake2cmake"))
+        convert_all(tmp_dir, monkeypatch, "--engine", "pool", "--write-if-changed")
+        assert("CMakeLists.txt files written: 4, unchanged: 0." in capsys.readouterr().out)
+        mtime = tmp_dir.joinpath("lib2", "CMakeLists.txt").stat().st_mtime_ns
+
+        with open(tmp_dir.joinpath("lib1", "lib1.pro"), "a") as f:
+            f.write("DEFINES += LIB1_CHANGED\n")
+        convert_all(tmp_dir, monkeypatch, "--engine", "pool", "--write-if-changed")
+        assert("CMakeLists.txt files written: 1, unchanged: 3." in capsys.readouterr().out)
+        assert(tmp_dir.joinpath("lib2", "CMakeLists.txt").stat().st_mtime_ns == mtime)
+
+
+def test_incremental(monkeypatch, capsys):
+    '''Only the projects whose inputs changed are converted again.'''
+    with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
+        tmp_dir = pathlib.Path(tmp_dir_str).joinpath("subdirs")
+        shutil.copytree(test_data_dir.joinpath("subdirs"), tmp_dir,
+                        ignore=shutil.ignore_patterns(".qmake2cmake"))
+        convert_all(tmp_dir, monkeypatch, "--engine", "pool", "--incremental")
+        output = capsys.readouterr().out
+        assert("CMakeLists.txt files written: 4, unchanged: 0." in output)
+        assert("Projects that are up to date and were not converted: 0." in output)
+
+        convert_all(tmp_dir, monkeypatch, "--engine", "pool", "--incremental")
+        output = capsys.readouterr().out
+        assert("CMakeLists.txt files written: 0, unchanged: 0." in output)
+        assert("Projects that are up to date and were not converted: 4." in output)
+
+        with open(tmp_dir.joinpath("lib2", "lib2.pro"), "a") as f:
+            f.write("DEFINES += LIB2_CHANGED\n")
+        convert_all(tmp_dir, monkeypatch, "--engine", "tree", "--incremental")
+        output = capsys.readouterr().out
+        assert("Projects that are up to date and were not converted: 2." in output)
+        assert("LIB2_CHANGED" in tmp_dir.joinpath("lib2", "CMakeLists.txt").read_text())
+
+
+def test_find_all_pro_files(monkeypatch, capsys):
+    '''Directories that can't contain projects to convert are pruned.'''
+    with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
+        tmp_dir = pathlib.Path(tmp_dir_str).joinpath("module")
+        for project in ["module.pro", "src/src.pro", "src/corelib/corelib.pro",
+                        "tests/auto/cmake/test/test.pro", "tests/auto/other/other.pro",
+                        ".git/hooks/hooks.pro", "build/src/src.pro",
+                        "util/cmake/util.pro", "examples/examples.pro"]:
+            tmp_dir.joinpath(project).parent.mkdir(parents=True, exist_ok=True)
+            tmp_dir.joinpath(project).write_text("TEMPLATE = subdirs\n")
+        tmp_dir.joinpath(".qmake.conf").write_text("")
+        tmp_dir.joinpath("build", "CMakeCache.txt").write_text("")
+
+        monkeypatch.setattr(sys, "argv", ["qmake2cmake_all", "--exclude", "examples",
+                                          "--exclude", "util/cmake", str(tmp_dir)])
+        pro_files = find_all_pro_files(str(tmp_dir), parse_command_line())
+        assert(pro_files == [str(tmp_dir.joinpath(project)) for project in [
+            "module.pro", "src/src.pro", "src/corelib/corelib.pro",
+            "tests/auto/other/other.pro"]])
+
+
+@pytest.mark.parametrize("contents,template", [
+    ("SOURCES = main.cpp\n", "app"),
+    ("TEMPLATE = subdirs\nSUBDIRS = lib\n", "subdirs"),
+    ("TEMPLATE = \\\n    lib # comment\n", "lib"),
+    ("include(common.pri)\nwin32 {\n    CONFIG += x\n}\nTEMPLATE = subdirs\n", "subdirs"),
+    ("TEMPLATE = app\ninclude(common.pri)\n", None),
+    ("TEMPLATE = app\nwin32: TEMPLATE = lib\n", None),
+    ("TEMPLATE = app\nwin32 {\n    TEMPLATE = lib\n}\n", None),
+    ("TEMPLATE = $$PROJECT_TEMPLATE\n", None),
+])
+def test_scan_template(contents, template):
+    assert(scan_template(contents) == template)
+
+
+def test_smart_directory_filtering(monkeypatch, capsys):
+    '''The SUBDIRS project of a directory is selected, with and without a full analysis.'''
+    with TemporaryDirectory(prefix="testqmake2cmake") as tmp_dir_str:
+        tmp_dir = pathlib.Path(tmp_dir_str)
+        tmp_dir.joinpath("a.pro").write_text("TEMPLATE = app\n")
+        tmp_dir.joinpath("b.pro").write_text("include(b.pri)\n")
+        tmp_dir.joinpath("b.pri").write_text("TEMPLATE = subdirs\n")
+        tmp_dir.joinpath("c.pro").write_text("TEMPLATE = lib\n")
+
+        monkeypatch.setattr(sys, "argv", ["qmake2cmake_all", str(tmp_dir)])
+        pro_files = find_all_pro_files(str(tmp_dir), parse_command_line())
+        assert(pro_files == [str(tmp_dir.joinpath("b.pro"))])
+
+    output = capsys.readouterr().out
+    assert('Analyzing "b.pro"' in output)
+    assert('Analyzing "a.pro"' not in output)
+
+
+def test_analysis_of_found_projects_is_cached(tmp_path, monkeypatch, capsys):
+    '''The analysis made to find the SUBDIRS project is kept for the conversions.'''
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    project_dir.joinpath("a.pro").write_text("TEMPLATE = app\n")
+    project_dir.joinpath("b.pro").write_text("include(b.pri)\n")
+    project_dir.joinpath("b.pri").write_text("TEMPLATE = subdirs\n")
+    mapping_file = tmp_path / "mappings.json"
+    mapping_file.write_text('{"libraries": [{"soName": "foo", "packageName": "Foo", "targetName": "Foo::Foo"}]}')
+    try:
+        convert_all(project_dir, monkeypatch, "--engine", "pool", "--persistent-analysis-cache",
+                    "--library-mapping", str(mapping_file))
+        assert('Analyzing "b.pro"' in capsys.readouterr().out)
+        clear_project_analysis_cache()
+        analysis = lookup_project_analysis(str(project_dir / "b.pro"))
+        assert(analysis is not None and analysis.template == "subdirs")
+    finally:
+        set_persistent_analysis_cache_enabled(False)
+        clear_registered_library_mappings()
+        clear_project_analysis_cache()
@@ -2,9 +2,14 @@
 # Copyright (C) 2021 The Qt Company Ltd.
 # SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
 
-from qmake2cmake.pro2cmake import Scope, SetOperation, merge_scopes, recursive_evaluate_scope
+from qmake2cmake.conversion_context import get_conversion_context
+from qmake2cmake.qmake_fast_parser import parseProFileContentsFast
+from qmake2cmake.pro2cmake import (AddOperation, OperationLocation, Scope, SetOperation, merge_scopes,
+                                   recursive_evaluate_scope, scope_evaluation_cache_statistics,
+                                   reset_scope_evaluation_cache_statistics)
 
 import pytest
+import tracemalloc
 import typing
 
 ScopeList = typing.List[Scope]
@@ -316,3 +321,113 @@ def test_recursive_expansion():
     assert scope.get_string('B') == '$$A/Bar'
     assert scope._expand_value('$$B/Source.cpp') == ['Foo/Bar/Source.cpp']
     assert scope._expand_value('$$B') == ['Foo/Bar']
+
+
+def test_evaluation_cache_hits():
+    scope = _new_scope(test1='bar')
+    reset_scope_evaluation_cache_statistics()
+    assert scope.get('test1') == ['bar']
+    scope.get('test1').append('modified')
+    assert scope.get('test1') == ['bar']
+    assert scope_evaluation_cache_statistics == {'hits': 2, 'misses': 1}
+
+
+def test_evaluation_cache_is_invalidated_by_changes():
+    scope = _new_scope(test1='bar')
+    child = _new_scope(parent_scope=scope, test2='baz')
+    assert child.get('test1', inherit=True) == ['bar']
+    assert child.get('test2') == ['baz']
+
+    reset_scope_evaluation_cache_statistics()
+    scope._append_operation('test1', AddOperation(['foo']))
+    assert child.get('test1', inherit=True) == ['bar', 'foo']
+    # Evaluations that didn't read the changed scope are still cached.
+    assert child.get('test2') == ['baz']
+    assert scope_evaluation_cache_statistics == {'hits': 1, 'misses': 1}
+
+    include = Scope(parent_scope=None, qmake_file='file2', base_dir='.',
+                    operations=_map_to_operation(test1='included'))
+    scope.merge(include)
+    assert scope.get('test1') == ['included']
+
+    include._get_operation_at_index('test1', 0)._value.append('changed')
+    include.operations_changed()
+    assert scope.get('test1') == ['included', 'changed']
+
+
+def test_evaluation_cache_marks_keys_as_visited():
+    scope = _new_scope(test1='bar')
+    child = _new_scope(parent_scope=scope)
+    child.get('test1', inherit=True)
+    scope.reset_visited_keys()
+    child.get('test1', inherit=True)
+    assert 'test1' in scope.visited_keys
+
+
+def test_operations_of_includes_are_processed_in_line_order():
+    scope = Scope(parent_scope=None, qmake_file='file1', base_dir='.', operations={
+        'test1': [SetOperation(['a'], line_no=1), AddOperation(['d'], line_no=5)]})
+    include = Scope(parent_scope=None, qmake_file='file2', base_dir='.',
+                    operations={'test1': [AddOperation(['b'], line_no=1),
+                                          AddOperation(['c'], line_no=2)]},
+                    parent_include_line_no=3)
+    scope.merge(include)
+    assert scope.get('test1') == ['a', 'b', 'c', 'd']
+
+    late_include = Scope(parent_scope=None, qmake_file='file3', base_dir='.',
+                         operations=_map_to_operation(test1='e'), parent_include_line_no=4)
+    include.merge(late_include)
+    assert scope.get('test1') == ['e', 'd']
+
+
+def test_operation_location():
+    location = OperationLocation().append(1, 3)
+    assert location.append(2, 1) < location.append(2, 2) < OperationLocation().append(1, 4)
+    assert repr(location.append(2, 1)) == 's1:3 s2:1'
+
+
+def test_memory_per_scope(tmp_path):
+    # A SUBDIRS tree with many subprojects, each with small conditional scopes like in the
+    # Qt modules. All scopes of the tree are kept alive, as during a conversion of the whole
+    # tree. See also benchmarks/benchmark_memory.py.
+    subproject_count = 40
+    conditions_per_subproject = 25
+    subdirs = [f'sub{n}' for n in range(subproject_count)]
+    (tmp_path / 'tree.pro').write_text('TEMPLATE = subdirs\nSUBDIRS = ' + ' '.join(subdirs) + '\n')
+    for n, subdir in enumerate(subdirs):
+        (tmp_path / subdir).mkdir()
+        (tmp_path / subdir / f'{subdir}.pro').write_text(
+            f'TARGET = {subdir}\nQT = core\n' + ''.join(
+                f'qtConfig(f{n}_{i}) {{\n    SOURCES += f{i}.cpp\n'
+                f'    unix {{\n        SOURCES += u{i}.cpp\n    }} else {{\n        SOURCES += w{i}.cpp\n    }}\n'
+                f'}} else {{\n    DEFINES += NO_F{n}_{i}\n}}\n'
+                for i in range(conditions_per_subproject)))
+    project_files = [tmp_path / 'tree.pro'] + [tmp_path / subdir / f'{subdir}.pro' for subdir in subdirs]
+    parsed_projects = [(str(project_file), *parseProFileContentsFast(project_file.read_text()))
+                       for project_file in project_files]
+
+    def all_scopes(scope):
+        yield scope
+        for child in scope.children:
+            yield from all_scopes(child)
+
+    first_scope_id = get_conversion_context().next_scope_id
+    tracemalloc.start()
+    try:
+        top_scopes = []
+        for file_path, statements, massaged_contents in parsed_projects:
+            top_scope = Scope.FromDict(None, file_path, statements,
+                                       project_file_content=massaged_contents)
+            for scope in all_scopes(top_scope):
+                scope.get('SOURCES')
+                scope.get('DEFINES')
+                scope.get('QT', inherit=True)
+            top_scopes.append(top_scope)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    scope_count = get_conversion_context().next_scope_id - first_scope_id
+    assert len(top_scopes) == subproject_count + 1
+    assert scope_count == 1 + subproject_count * (1 + 4 * conditions_per_subproject)
+    # Without __slots__ and shared default operations, this was over 10000.
+    assert peak / scope_count < 7000
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+import os
+import statistics
+import subprocess
+import sys
+
+import qmake2cmake
+
+# Modules that are only imported once they are needed. Importing sympy made
+# importing qmake2cmake.pro2cmake take about 450 ms instead of 130 ms. See
+# benchmarks/benchmark_startup.py for the import time.
+_lazily_imported_modules = ['sympy', 'mpmath', 'platformdirs']
+
+# The import time of qmake2cmake.pro2cmake without its dependencies may be at
+# most this many times the import time of pyparsing. It is about 1.5 times,
+# and was about 5 times while sympy was imported eagerly.
+_relative_import_time_budget = 3.0
+
+
+def _environment():
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    src_path = os.path.dirname(os.path.dirname(os.path.abspath(qmake2cmake.__file__)))
+    env['PYTHONPATH'] = os.pathsep.join([src_path, env.get('PYTHONPATH', '')])
+    return env
+
+
+def test_startup_doesnt_import_sympy():
+    env = _environment()
+    result = subprocess.run(
+        [sys.executable, '-c',
+         'import sys, qmake2cmake.pro2cmake; '
+         f'print(" ".join(m for m in {_lazily_imported_modules!r} if m in sys.modules))'],
+        env=env, stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    assert result.stdout.split() == []
+
+
+def _import_times(pycache_path):
+    # pyparsing is imported first, so the time of qmake2cmake.pro2cmake
+    # doesn't include it, nor the standard modules both of them use.
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-X', f'pycache_prefix={pycache_path}',
+         '-c', 'import pyparsing, qmake2cmake.pro2cmake'],
+        env=_environment(), stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if line.startswith('import time:') and len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times['pyparsing'], times['qmake2cmake.pro2cmake']
+
+
+def test_import_time_relative_to_pyparsing(tmp_path):
+    # The first run writes the bytecode, so that compiling is not measured.
+    _import_times(tmp_path)
+    ratios = []
+    for _ in range(3):
+        pyparsing_time, pro2cmake_time = _import_times(tmp_path)
+        ratios.append(pro2cmake_time / pyparsing_time)
+    assert statistics.median(ratios) < _relative_import_time_budget
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# Copyright (C) 2022 The Qt Company Ltd.
+# SPDX-License-Identifier: LicenseRef-Qt-Commercial OR GPL-3.0-only WITH Qt-GPL-exception-1.0
+
+from qmake2cmake.text_merge import merge_texts
+
+import pytest
+
+
+# The expected results are the ones of "git merge".
+@pytest.mark.parametrize(
+    "base,ours,theirs,expected,has_conflicts",
+    [
+        ("a\nb\nc\nd\ne\n", "a\nB\nc\nd\ne\n", "a\nb\nc\nd\nE\n", "a\nB\nc\nd\nE\n", False),
+        ("a\nb\nc\n", "a\nX\nc\n", "a\nX\nc\n", "a\nX\nc\n", False),
+        (
+            "a\nb\nc\n",
+            "a\nX\nc\n",
+            "a\nY\nc\n",
+            "a\n<<<<<<< HEAD\nX\n=======\nY\n>>>>>>> original\nc\n",
+            True,
+        ),
+        (
+            "a\nb\nc\nd\ne\nf\ng\nh\n",
+            "a\n1\nc\nd\ne\nf\ng\n2\n",
+            "a\n3\nc\nd\ne\nf\ng\n4\n",
+            "a\n<<<<<<< HEAD\n1\n=======\n3\n>>>>>>> original\nc\nd\ne\nf\ng\n"
+            "<<<<<<< HEAD\n2\n=======\n4\n>>>>>>> original\n",
+            True,
+        ),
+        (
+            "a\nb\nc\nd\ne\n",
+            "a\n1\nc\nd\n2\n",
+            "a\n3\nc\nd\n4\n",
+            "a\n<<<<<<< HEAD\n1\nc\nd\n2\n=======\n3\nc\nd\n4\n>>>>>>> original\n",
+            True,
+        ),
+        ("a\nb\n", "a\nX", "a\nY", "a\n<<<<<<< HEAD\nX\n=======\nY\n>>>>>>> original\n", True),
+        (
+            "set(a\n)\n",
+            "set(a\n    b\n)\n",
+            "set(a\n    c # special case\n)\n",
+            "set(a\n<<<<<<< HEAD\n    b\n=======\n    c # special case\n>>>>>>> original\n)\n",
+            True,
+        ),
+    ],
+    ids=["clean", "same change", "conflict", "refined conflicts", "joined conflicts",
+         "no newline at end", "additions"],
+)
+def test_merge_texts(base, ours, theirs, expected, has_conflicts):
+    assert merge_texts(base, ours, theirs) == (expected, has_conflicts)
+
+
+def test_merge_texts_of_repeated_lines():
+    '''Lines that appear too often for the histogram diff fall back to the Myers diff.'''
+    base = "".join(f"    file{i}.cpp\n)\n\n" for i in range(100))
+    ours = base.replace("file7.cpp", "file7.cpp\n    generated.cpp")
+    theirs = base.replace("file90.cpp\n", "file90.cpp # special case\n")
+    merged, has_conflicts = merge_texts(base, ours, theirs)
+    assert not has_conflicts
+    assert merged == ours.replace("file90.cpp\n", "file90.cpp # special case\n")